@@ -112,6 +112,31 @@ resource "aws_sns_topic" "tokyo_ir_trigger_topic" {
   })
 }
 
+# Incident lock for alarm-storm coalescing: alarms within COALESCE_WINDOW_SECONDS of the
+# first one share an incident (see "Alarm-storm coalescing" in lambda/ir_reporter/handler.py).
+resource "aws_dynamodb_table" "tokyo_ir_incident_lock" {
+  name         = "${var.project_name}-tokyo-ir-incident-lock"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+
+  tags = merge(var.common_tags, {
+    Name        = "${var.project_name}-tokyo-ir-incident-lock"
+    Purpose     = "Incident report alarm coalescing"
+    Environment = "production"
+    Region      = "Tokyo"
+  })
+}
+
 # Explanation: This role is the droid brain—Lambda assumes it to collect evidence and call Bedrock.
 resource "aws_iam_role" "tokyo_ir_lambda_role" {
   name = "${var.project_name}-tokyo-ir-lambda-role"
@@ -217,14 +242,25 @@ resource "aws_iam_policy" "tokyo_ir_lambda_policy" {
         ],
         Resource = aws_sns_topic.tokyo_ir_reports_topic.arn
       },
-      # Bedrock invoke
+      # Bedrock invoke (BEDROCK_STREAM uses the response-stream API)
       {
         Effect = "Allow",
         Action = [
-          "bedrock:InvokeModel"
+          "bedrock:InvokeModel",
+          "bedrock:InvokeModelWithResponseStream"
         ],
         Resource = "*"
       },
+      # Incident lock (alarm-storm coalescing)
+      {
+        Effect = "Allow",
+        Action = [
+          "dynamodb:PutItem",
+          "dynamodb:UpdateItem",
+          "dynamodb:GetItem"
+        ],
+        Resource = aws_dynamodb_table.tokyo_ir_incident_lock.arn
+      },
       # SSM Automation document execution
       {
         Effect = "Allow",
@@ -293,15 +329,17 @@ resource "aws_lambda_function" "tokyo_ir_lambda" {
 
   environment {
     variables = {
-      REPORT_BUCKET       = aws_s3_bucket.tokyo_ir_reports_bucket.bucket          # S3 for JSON + Markdown reports
-      TRANSLATION_BUCKET  = module.tokyo_translation.input_bucket_name            # Translation integration
-      APP_LOG_GROUP       = "/aws/ec2/rdsapp"                                     # App log group (CloudWatch Agent default)
-      WAF_LOG_GROUP       = "aws-waf-logs-${var.project_name}-tokyo-regional-waf" # Regional WAF log group
-      SECRET_ID           = "${var.project_name}/rds/mysql"                       # Secrets Manager secret name/ARN
-      SSM_PARAM_PATH      = "/lab/db/"                                            # Parameter Store path for DB config
-      BEDROCK_MODEL_ID    = "mistral.mistral-large-3-675b-instruct"               # Bedrock model ID (optional)
-      SNS_TOPIC_ARN       = aws_sns_topic.tokyo_ir_reports_topic.arn              # SNS topic for "Report Ready"
-      AUTOMATION_DOC_NAME = "${var.project_name}-tokyo-incident-report"           # SSM automation document
+      REPORT_BUCKET           = aws_s3_bucket.tokyo_ir_reports_bucket.bucket          # S3 for JSON + Markdown reports
+      TRANSLATION_BUCKET      = module.tokyo_translation.input_bucket_name            # Translation integration
+      APP_LOG_GROUP           = "/aws/ec2/rdsapp"                                     # App log group (CloudWatch Agent default)
+      WAF_LOG_GROUP           = "aws-waf-logs-${var.project_name}-tokyo-regional-waf" # Regional WAF log group
+      SECRET_ID               = "${var.project_name}/rds/mysql"                       # Secrets Manager secret name/ARN
+      SSM_PARAM_PATH          = "/lab/db/"                                            # Parameter Store path for DB config
+      BEDROCK_MODEL_ID        = "mistral.mistral-large-3-675b-instruct"               # Bedrock model ID (optional)
+      SNS_TOPIC_ARN           = aws_sns_topic.tokyo_ir_reports_topic.arn              # SNS topic for "Report Ready"
+      AUTOMATION_DOC_NAME     = "${var.project_name}-tokyo-incident-report"           # SSM automation document
+      INCIDENT_LOCK_TABLE     = aws_dynamodb_table.tokyo_ir_incident_lock.name        # Alarm-storm coalescing lock
+      COALESCE_WINDOW_SECONDS = "300"                                                 # Alarms within 5 min share an incident
     }
   }
 
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+# bench_cold_start.py
+#
+# Cold-start harness for the ir_reporter Lambda: each sample is a fresh interpreter (a cold
+# container), timing `import handler` (the Lambda INIT phase), peak RSS after init, and one
+# invocation against botocore Stubber-backed clients (no network, no credentials).
+#
+#   lazy    handler.py as shipped: clients are built on first use
+#   eager   the previous layout: import boto3 and build all six clients at import time
+#
+# The invocation is the minimal deployment (REPORT_BUCKET + SNS_TOPIC_ARN, default
+# SSM_PARAM_PATH), where the lazy handler never builds logs / secretsmanager / bedrock-runtime.
+#
+# Usage:
+#   python ./lambda/ir_reporter/bench_cold_start.py
+#   python ./lambda/ir_reporter/bench_cold_start.py --runs 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = r"""
+import json, resource, sys, time
+t0 = time.perf_counter()
+if sys.argv[1] == "eager":
+    import boto3
+    eager = {n: boto3.client(n) for n in ("logs", "ssm", "secretsmanager", "s3", "sns", "bedrock-runtime")}
+import handler
+init_ms = (time.perf_counter() - t0) * 1000
+init_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+# The first invocation includes building whatever clients init did not: stubbing wraps the
+# clients the handler will use, so creating them is timed along with the call itself.
+t1 = time.perf_counter()
+import boto3
+from botocore.stub import Stubber
+if sys.argv[1] == "eager":
+    handler._CLIENTS.update(eager)
+stubs = []
+for name, op, resp in (("ssm", "get_parameters_by_path", {"Parameters": []}),
+                       ("s3", "put_object", {"ETag": '"x"'}), ("s3", "put_object", {"ETag": '"x"'}),
+                       ("sns", "publish", {"MessageId": "m"})):
+    c = handler.client(name)
+    if not any(s.client is c for s in stubs):
+        stubs.append(Stubber(c))
+        stubs[-1].activate()
+    next(s for s in stubs if s.client is c).add_response(op, resp)
+
+alarm = {"AlarmName": "lab-db-connection-errors", "NewStateValue": "ALARM", "MetricName": "DBConnectionErrors"}
+event = {"Records": [{"Sns": {"Message": json.dumps(alarm)}}]}
+handler.lambda_handler(event, None)
+invoke_ms = (time.perf_counter() - t1) * 1000
+for s in stubs:
+    s.assert_no_pending_responses()
+print(json.dumps({"init_ms": init_ms, "init_rss_mb": init_rss, "invoke_ms": invoke_ms,
+                  "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def sample(mode: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if not k.startswith(("APP_", "WAF_", "SECRET_", "BEDROCK_"))}
+    env.update({"AWS_DEFAULT_REGION": "us-east-1", "AWS_ACCESS_KEY_ID": "testing", "AWS_SECRET_ACCESS_KEY": "testing",
+                "REPORT_BUCKET": "bench-reports", "SNS_TOPIC_ARN": "arn:aws:sns:us-east-1:000000000000:bench",
+                "PYTHONDONTWRITEBYTECODE": "1"})
+    out = subprocess.run([sys.executable, "-c", CHILD, mode], cwd=HERE, env=env, check=True,
+                         capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Measure ir_reporter cold-start init time and RSS.")
+    ap.add_argument("--runs", type=int, default=10, help="Cold starts per mode (default: 10)")
+    args = ap.parse_args()
+
+    results = {}
+    for mode in ("eager", "lazy"):
+        sample(mode)  # warm the OS page cache so neither mode pays first-read disk I/O
+        results[mode] = [sample(mode) for _ in range(args.runs)]
+
+    print(f"{'mode':6s} {'init ms':>9s} {'init RSS MB':>12s} {'1st invoke ms':>14s} {'init+invoke':>12s} "
+          f"{'peak RSS MB':>12s}   (median of {args.runs})")
+    for mode, runs in results.items():
+        med = {k: statistics.median(r[k] for r in runs) for k in runs[0]}
+        total = statistics.median(r["init_ms"] + r["invoke_ms"] for r in runs)
+        print(f"{mode:6s} {med['init_ms']:9.1f} {med['init_rss_mb']:12.1f} {med['invoke_ms']:14.1f} {total:12.1f} "
+              f"{med['rss_mb']:12.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,17 +1,59 @@
+import hashlib
 import json
 import os
 import re
+import sys
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
-import boto3
 
+# Clients are built on first use and cached for the life of the container. Building all six
+# at import time put ~0.4 s and ~45 MB into every cold start (bench_cold_start.py), including
+# clients a deployment never uses when APP_LOG_GROUP / SECRET_ID / BEDROCK_MODEL_ID are unset;
+# an alarm storm pays that once per concurrent container. Tests put stand-ins into _CLIENTS.
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()  # evidence fetches build clients from worker threads
 
-logs = boto3.client("logs")
-ssm = boto3.client("ssm")
-secrets = boto3.client("secretsmanager")
-s3 = boto3.client("s3")
-sns = boto3.client("sns")
-bedrock = boto3.client("bedrock-runtime")
+# Seconds of the Lambda's remaining time kept back for Bedrock, S3 and SNS once the
+# evidence fetches are cut off.
+REPORT_RESERVE_SECONDS = float(os.environ.get("REPORT_RESERVE_SECONDS", "20"))
+LOGS_QUERY_TIMEOUT = 30.0
+
+# Per-query EMF metrics (see write_query_emf); Logs Insights bills by data scanned
+# (us-east-1 list price; most regions are close).
+EMF_NAMESPACE = "Galactus/LogsInsights"
+EMF_METRICS = [{"Name": "WallTime", "Unit": "Seconds"}, {"Name": "Polls", "Unit": "Count"},
+               {"Name": "RecordsScanned", "Unit": "Count"}, {"Name": "BytesScanned", "Unit": "Bytes"},
+               {"Name": "EstimatedCostUSD", "Unit": "None"}]
+INSIGHTS_USD_PER_GB = 0.005
+
+# With INCIDENT_LOCK_TABLE set, alarms within this many seconds of an incident's first alarm
+# join that incident and its report is republished with them (0 = one report per
+# invocation, as before).
+COALESCE_WINDOW_SECONDS = int(os.environ.get("COALESCE_WINDOW_SECONDS", "300"))
+
+# Bedrock prompt budget (estimated input tokens) and how long a summary is reused for an
+# identical prompt.
+PROMPT_TOKEN_BUDGET = int(os.environ.get("PROMPT_TOKEN_BUDGET", "6000"))
+SUMMARY_CACHE_TTL_SECONDS = int(os.environ.get("SUMMARY_CACHE_TTL_SECONDS", "3600"))
+
+# Stream the Bedrock summary (invoke_model_with_response_stream) and rewrite the partial
+# markdown report in S3 at most this often while it arrives.
+BEDROCK_STREAM = os.environ.get("BEDROCK_STREAM", "true").lower() not in ("0", "false", "no")
+PARTIAL_FLUSH_SECONDS = float(os.environ.get("PARTIAL_FLUSH_SECONDS", "2"))
+
+
+def client(name):
+    c = _CLIENTS.get(name)
+    if c is None:
+        with _CLIENTS_LOCK:
+            c = _CLIENTS.get(name)
+            if c is None:
+                import boto3  # deferred: only paid by invocations that make an AWS call
+
+                c = _CLIENTS[name] = boto3.client(name)
+    return c
 
 
 REPORT_TEMPLATE = """# Incident Report: {incident_id} -- {title}
@@ -83,9 +125,25 @@ REPORT_TEMPLATE = """# Incident Report: {incident_id} -- {title}
 """
 
 
-def run_logs_query(log_group, query, start_time, end_time, limit=100):
+SUMMARY_SECTION = """
+## 9. Summary (Amazon Bedrock)
+{summary}
+"""
+
+STREAM_INTERRUPTED = "Bedrock stream interrupted"
+
+
+def run_logs_query(log_group, query, start_time, end_time, limit=100, timeout=30.0, name=None):
+    t0 = time.monotonic()
+    status, rows, statistics, polls = _poll_logs_query(log_group, query, start_time, end_time, limit, timeout)
+    write_query_emf(name or log_group, status, time.monotonic() - t0, polls, statistics)
+    return rows
+
+
+def _poll_logs_query(log_group, query, start_time, end_time, limit, timeout):
+    """(status, rows, final statistics, polls); rows are [] unless the query completed."""
     try:
-        resp = logs.start_query(
+        resp = client("logs").start_query(
             logGroupName=log_group,
             startTime=start_time,
             endTime=end_time,
@@ -93,16 +151,57 @@ def run_logs_query(log_group, query, start_time, end_time, limit=100):
             limit=limit,
         )
     except Exception:
-        return []
+        return "Failed", [], {}, 0
     query_id = resp.get("queryId")
     if not query_id:
-        return []
-    for _ in range(20):
-        result = logs.get_query_results(queryId=query_id)
-        if result.get("status") == "Complete":
-            return result.get("results", [])
-        time.sleep(1.5)
-    return []
+        return "Failed", [], {}, 0
+    # Back off while the scan is still growing; poll again quickly once recordsScanned
+    # stops moving (only the sort/aggregation is left).
+    deadline = time.monotonic() + timeout
+    delay, scanned, polls = 0.25, None, 0
+    while True:
+        time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+        result = client("logs").get_query_results(queryId=query_id)
+        polls += 1
+        status = result.get("status")
+        statistics = result.get("statistics") or {}
+        if status == "Complete":
+            return status, result.get("results", []), statistics, polls
+        if status in ("Failed", "Cancelled", "Timeout", "Unknown"):
+            return status, [], statistics, polls
+        if time.monotonic() >= deadline:
+            break
+        now_scanned = statistics.get("recordsScanned", 0)
+        delay = 0.25 if scanned is not None and now_scanned and now_scanned == scanned else min(delay * 2, 4.0)
+        scanned = now_scanned
+    try:
+        client("logs").stop_query(queryId=query_id)
+    except Exception:
+        pass
+    return "Timeout", [], statistics, polls
+
+
+def write_query_emf(query, status, wall_s, polls, statistics, out=None):
+    """
+    One CloudWatch Embedded Metric Format line per Logs Insights query, in the same shape
+    as galactus_logsinsights_runner's QueryStats (Command=ir_reporter): Lambda stdout is
+    ingested as metrics without PutMetricData calls. Scan figures come from the last
+    get_query_results statistics, so a timed-out query reports what it scanned until then.
+    """
+    scanned = float(statistics.get("bytesScanned", 0.0))
+    line = json.dumps({
+        "_aws": {"Timestamp": int(time.time() * 1000), "CloudWatchMetrics": [
+            {"Namespace": EMF_NAMESPACE, "Dimensions": [["Command", "Query"]], "Metrics": EMF_METRICS}]},
+        "Command": "ir_reporter",
+        "Query": query,
+        "Status": status,
+        "WallTime": round(wall_s, 3),
+        "Polls": polls,
+        "RecordsScanned": int(statistics.get("recordsScanned", 0)),
+        "BytesScanned": int(scanned),
+        "EstimatedCostUSD": scanned / 1e9 * INSIGHTS_USD_PER_GB,
+    }, separators=(",", ":"))
+    (out or sys.stdout).write(line + "\n")  # one write: evidence queries run on worker threads
 
 
 def slugify(value):
@@ -111,18 +210,246 @@ def slugify(value):
 
 
 def parse_alarm_event(event):
-    alarm = None
-    if isinstance(event, dict) and "Records" in event:
-        try:
-            alarm = json.loads(event["Records"][0]["Sns"]["Message"])
-        except Exception:
-            alarm = event
-    else:
-        alarm = event
-    return alarm if isinstance(alarm, dict) else {}
+    alarms = parse_alarm_events(event)
+    return alarms[0] if alarms else {}
 
 
-def bedrock_generate_summary(model_id, prompt_text):
+def parse_alarm_events(event):
+    """Every alarm in the event: one per SNS record (a batch can carry several), else the event itself."""
+    if not (isinstance(event, dict) and "Records" in event):
+        return [event] if isinstance(event, dict) else [{}]
+    alarms = []
+    for record in event.get("Records") or []:
+        try:
+            alarm = json.loads(record["Sns"]["Message"])
+        except Exception:
+            continue
+        if isinstance(alarm, dict):
+            alarms.append(alarm)
+    return alarms or [event]
+
+
+# ---------------------------
+# Alarm-storm coalescing
+# ---------------------------
+#
+# A cascading failure fires dozens of alarms, each its own invocation. Alarms within
+# COALESCE_WINDOW_SECONDS of the first one share an incident, tracked by one lock item that
+# lives for the window. The first alarm creates it (a conditional write) and owns the
+# incident: it collects evidence once and makes the one Bedrock call. Invocations that
+# arrive while an owner is building the report add their alarm names to the item (bumping
+# its `joins` counter) and return. When the owner has published it gives up ownership,
+# conditioned on `joins` being what it last read: if someone joined in between, it re-reads,
+# republishes the report naming them, and tries again. An alarm that arrives later in the
+# window, when nobody owns the incident, takes it over and republishes the report ("Report
+# Updated") with every alarm so far. So every alarm ends up in a published report.
+#
+# The item records its owner's token (the SNS MessageId, see owner_token): Lambda's retry
+# of a failed owner carries the same MessageId and takes the incident back instead of
+# joining it. An owner that fails with an exception gives up ownership before re-raising,
+# so the retry (or the next alarm) picks the incident up with the alarms that joined it.
+
+def _conditional_check_failed(exc):
+    return getattr(exc, "response", {}).get("Error", {}).get("Code") == "ConditionalCheckFailedException"
+
+
+def owner_token(event, context, default):
+    """Identity that survives Lambda's retries of this event: its SNS MessageIds, else the request id."""
+    if isinstance(event, dict):
+        ids = [r.get("Sns", {}).get("MessageId") for r in event.get("Records") or [] if isinstance(r, dict)]
+        if ids and all(ids):
+            return ",".join(ids)
+    return getattr(context, "aws_request_id", None) or default
+
+
+class MemoryIncidentLock:
+    """In-process stand-in for DynamoIncidentLock, for tests: it only coalesces within one container."""
+
+    def __init__(self):
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key, incident_id, owner, alarm_names, now, window):
+        """
+        (owned, incident_id): open a new incident if there is none in the window, else add
+        our alarms to it -- and own it when nobody does or `owner` already does (a retry).
+        """
+        with self._lock:
+            item = self.items.get(key)
+            if item is None or item["expires_at"] < now:
+                self.items[key] = {"incident_id": incident_id, "owner": owner, "alarms": set(alarm_names),
+                                   "joins": 0, "reported": False, "expires_at": now + window}
+                return True, incident_id
+            item["alarms"].update(alarm_names)
+            item["joins"] += 1
+            if item["owner"] in (None, owner):
+                item["owner"] = owner
+                return True, item["incident_id"]
+            return False, item["incident_id"]
+
+    def members(self, key, incident_id, owner):
+        """(alarm names, joins, reported before) while `owner` owns `incident_id`, else None."""
+        with self._lock:
+            item = self.items.get(key)
+            if not item or (item["incident_id"], item["owner"]) != (incident_id, owner):
+                return None
+            return sorted(item["alarms"]), item["joins"], item["reported"]
+
+    def release(self, key, incident_id, owner, joins):
+        """
+        Give up ownership after publishing, if nobody joined since `joins` was read. False
+        otherwise; members() then tells a new joiner (republish) from a lost lock (stop).
+        """
+        with self._lock:
+            item = self.items.get(key)
+            if not item or (item["incident_id"], item["owner"], item["joins"]) != (incident_id, owner, joins):
+                return False
+            item["owner"], item["reported"] = None, True
+            return True
+
+    def abandon(self, key, incident_id, owner):
+        """Give up ownership without publishing: the owner failed."""
+        with self._lock:
+            item = self.items.get(key)
+            if item and (item["incident_id"], item["owner"]) == (incident_id, owner):
+                item["owner"] = None
+
+
+class DynamoIncidentLock:
+    """
+    Lock items in a DynamoDB table with partition key `pk` (string). Enable TTL on
+    `expires_at` to have expired items cleaned up; an expired item is replaced either way.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def acquire(self, key, incident_id, owner, alarm_names, now, window):
+        ddb = client("dynamodb")
+        for _ in range(3):
+            try:
+                ddb.put_item(
+                    TableName=self.table,
+                    Item={
+                        "pk": {"S": key},
+                        "incident_id": {"S": incident_id},
+                        "owner_token": {"S": owner},
+                        "alarms": {"SS": sorted(alarm_names)},
+                        "joins": {"N": "0"},
+                        "expires_at": {"N": str(now + window)},
+                    },
+                    ConditionExpression="attribute_not_exists(pk) OR expires_at < :now",
+                    ExpressionAttributeValues={":now": {"N": str(now)}},
+                )
+                return True, incident_id
+            except Exception as exc:
+                if not _conditional_check_failed(exc):
+                    raise
+            try:
+                item = ddb.update_item(
+                    TableName=self.table,
+                    Key={"pk": {"S": key}},
+                    UpdateExpression="ADD alarms :a, joins :one",
+                    ConditionExpression="attribute_exists(pk) AND expires_at >= :now",
+                    ExpressionAttributeValues={":a": {"SS": sorted(alarm_names)}, ":one": {"N": "1"},
+                                               ":now": {"N": str(now)}},
+                    ReturnValues="ALL_NEW",
+                )["Attributes"]
+            except Exception as exc:
+                if not _conditional_check_failed(exc):
+                    raise
+                continue  # expired between our put and update: try to open a new incident
+            current = item["incident_id"]["S"]
+            holder = item.get("owner_token", {}).get("S")
+            if holder is not None:
+                return holder == owner, current
+            try:
+                ddb.update_item(
+                    TableName=self.table,
+                    Key={"pk": {"S": key}},
+                    UpdateExpression="SET owner_token = :owner",
+                    ConditionExpression="incident_id = :id AND attribute_not_exists(owner_token)",
+                    ExpressionAttributeValues={":owner": {"S": owner}, ":id": {"S": current}},
+                )
+                return True, current
+            except Exception as exc:
+                if not _conditional_check_failed(exc):
+                    raise
+                # Someone else took it first; our alarms are in and our join makes them republish.
+                return False, current
+        raise RuntimeError(f"incident lock {key} kept changing hands")
+
+    def members(self, key, incident_id, owner):
+        item = client("dynamodb").get_item(
+            TableName=self.table, Key={"pk": {"S": key}}, ConsistentRead=True
+        ).get("Item")
+        if not item or item["incident_id"]["S"] != incident_id or item.get("owner_token", {}).get("S") != owner:
+            return None
+        return sorted(item["alarms"]["SS"]), int(item["joins"]["N"]), item.get("reported", {}).get("BOOL", False)
+
+    def _disown(self, key, update, condition, values):
+        try:
+            client("dynamodb").update_item(
+                TableName=self.table, Key={"pk": {"S": key}}, UpdateExpression=update,
+                ConditionExpression=condition, ExpressionAttributeValues=values,
+            )
+            return True
+        except Exception as exc:
+            if _conditional_check_failed(exc):
+                return False
+            raise
+
+    def release(self, key, incident_id, owner, joins):
+        return self._disown(key, "REMOVE owner_token SET reported = :t",
+                            "incident_id = :id AND owner_token = :owner AND joins = :joins",
+                            {":id": {"S": incident_id}, ":owner": {"S": owner}, ":joins": {"N": str(joins)},
+                             ":t": {"BOOL": True}})
+
+    def abandon(self, key, incident_id, owner):
+        self._disown(key, "REMOVE owner_token", "incident_id = :id AND owner_token = :owner",
+                     {":id": {"S": incident_id}, ":owner": {"S": owner}})
+
+
+def incident_lock():
+    """The DynamoDB lock when INCIDENT_LOCK_TABLE is set; without a shared table there is no coalescing."""
+    table = os.environ.get("INCIDENT_LOCK_TABLE")
+    return DynamoIncidentLock(table) if table else None
+
+
+ANTHROPIC_STREAM_EVENTS = ("message_start", "content_block_start", "content_block_stop", "message_delta",
+                           "message_stop", "ping")
+
+
+def chunk_text(data):
+    """Text carried by one decoded stream chunk, "" for a known non-text event; unknown shapes raise."""
+    if data.get("type") == "content_block_delta":
+        return data.get("delta", {}).get("text", "")
+    if data.get("type") in ANTHROPIC_STREAM_EVENTS:
+        return ""
+    if "outputText" in data:  # Titan
+        return data["outputText"] or ""
+    if "outputs" in data:  # Mistral text completion
+        return "".join(o.get("text") or "" for o in data["outputs"])
+    if "choices" in data:  # Mistral chat
+        return "".join((c.get("delta") or c.get("message") or {}).get("content") or "" for c in data["choices"])
+    if "generation" in data:  # Llama
+        return data["generation"] or ""
+    raise RuntimeError(f"unsupported stream chunk: {sorted(data)}")
+
+
+def stream_text(events):
+    """Text deltas from an invoke_model_with_response_stream body (Anthropic, Titan, Mistral or Llama chunks)."""
+    for event in events:
+        if "chunk" not in event:
+            name = next(iter(event), "unknown")  # modelStreamErrorException, throttlingException, ...
+            raise RuntimeError(f"{name}: {(event.get(name) or {}).get('message', '')}")
+        text = chunk_text(json.loads(event["chunk"]["bytes"]))
+        if text:
+            yield text
+
+
+def bedrock_generate_summary(model_id, prompt_text, on_text=None):
+    """The model's summary; with on_text, the response is streamed and on_text(delta) called as text arrives."""
     if not model_id:
         return "Bedrock not configured."
 
@@ -138,8 +465,30 @@ def bedrock_generate_summary(model_id, prompt_text):
     else:
         payload = {"inputText": prompt_text}
 
+    if on_text is not None:
+        parts = []
+        try:
+            resp = client("bedrock-runtime").invoke_model_with_response_stream(
+                modelId=model_id,
+                contentType="application/json",
+                accept="application/json",
+                body=json.dumps(payload),
+            )
+            for delta in stream_text(resp.get("body") or []):
+                parts.append(delta)
+                on_text(delta)
+        except Exception as exc:
+            if parts:
+                return "".join(parts) + f"\n\n_({STREAM_INTERRUPTED}: {exc})_"
+            # Nothing arrived (no stream permission, unsupported model, ...): ask once, unstreamed.
+            print(f"Bedrock stream failed before any text, falling back to invoke_model: {exc}")
+        else:
+            if parts:
+                return "".join(parts)
+            print("Bedrock stream ended without text, falling back to invoke_model")
+
     try:
-        resp = bedrock.invoke_model(
+        resp = client("bedrock-runtime").invoke_model(
             modelId=model_id,
             contentType="application/json",
             accept="application/json",
@@ -156,6 +505,264 @@ def bedrock_generate_summary(model_id, prompt_text):
         return f"Bedrock invocation failed: {exc}"
 
 
+# ---------------------------
+# Bedrock prompt budget and summary cache
+# ---------------------------
+
+MESSAGE_CHARS = 400
+# Per-firing alarm fields: they change on every notification, so they are left out of the
+# prompt (the report keeps the full alarm) and repeated alarms over unchanged evidence
+# produce the same prompt -- and hit the summary cache.
+VOLATILE_ALARM_FIELDS = ("StateChangeTime", "NewStateReason", "OldStateValue", "AlarmConfigurationUpdatedTimestamp")
+
+
+def estimate_tokens(text):
+    """Rough input-token count (~4 characters per token for English and JSON)."""
+    return len(text) // 4 + 1
+
+
+def _rows(results):
+    # Logs Insights rows ([{field, value}, ...]) as flat dicts, without the opaque @ptr.
+    rows = []
+    for row in results:
+        if isinstance(row, list):
+            row = {x.get("field"): x.get("value") for x in row if x.get("field") != "@ptr"}
+        rows.append({k: (v[:MESSAGE_CHARS] + "...") if isinstance(v, str) and len(v) > MESSAGE_CHARS else v
+                     for k, v in row.items()})
+    return rows
+
+
+def compact_evidence(prompt):
+    """The prompt document without fields the model does not need; SecureString values are never sent."""
+    incident = {k: v for k, v in (prompt.get("incident") or {}).items() if k not in VOLATILE_ALARM_FIELDS}
+    return {
+        "incident": incident,
+        "related_alarms": sorted({a.get("AlarmName", "unknown") for a in prompt.get("related_alarms") or []}),
+        "app_logs": _rows(prompt.get("app_logs") or []),
+        "waf_logs": _rows(prompt.get("waf_logs") or []),
+        "ssm_params": [
+            {"name": p.get("Name"), "value": "<redacted>" if p.get("Type") == "SecureString" else p.get("Value")}
+            for p in prompt.get("ssm_params") or []
+        ],
+        "secret_meta": prompt.get("secret_meta"),
+    }
+
+
+def fit_prompt(prompt, budget=PROMPT_TOKEN_BUDGET):
+    """
+    (prompt_text, tokens, trimmed): compact JSON of the evidence, with the longest list
+    halved (newest log lines / top WAF rows are kept) until the estimate fits `budget`.
+    `trimmed` maps each cut section to "kept X of Y", and is also put in the prompt.
+    """
+    doc = compact_evidence(prompt)
+    sizes = {k: len(v) for k, v in doc.items() if isinstance(v, list)}
+    trimmed = {}
+    while True:
+        if trimmed:
+            doc["trimmed"] = {k: f"kept {len(doc[k])} of {sizes[k]}" for k in trimmed}
+        text = json.dumps(doc, separators=(",", ":"), default=str)
+        tokens = estimate_tokens(text)
+        longest = max(sizes, key=lambda k: len(doc[k]))
+        if tokens <= budget or not doc[longest]:
+            return text, tokens, {k: doc["trimmed"][k] for k in trimmed}
+        doc[longest] = doc[longest][:len(doc[longest]) // 2]
+        trimmed[longest] = True
+
+
+class MemorySummaryCache:
+    """In-process stand-in for S3SummaryCache (tests, and deployments without a bucket)."""
+
+    def __init__(self, ttl=SUMMARY_CACHE_TTL_SECONDS):
+        self.ttl = ttl
+        self.items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, now):
+        with self._lock:
+            hit = self.items.get(key)
+        return hit[1] if hit and hit[0] > now else None
+
+    def put(self, key, summary, now):
+        with self._lock:
+            self.items[key] = (now + self.ttl, summary)
+
+
+class S3SummaryCache:
+    """Summaries stored as s3://bucket/prefix<sha256>.json; warm containers also keep them in memory."""
+
+    def __init__(self, bucket, prefix="cache/bedrock/", ttl=SUMMARY_CACHE_TTL_SECONDS):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.ttl = ttl
+        self.local = MemorySummaryCache(ttl)
+
+    def get(self, key, now):
+        summary = self.local.get(key, now)
+        if summary is not None:
+            return summary
+        try:
+            body = client("s3").get_object(Bucket=self.bucket, Key=f"{self.prefix}{key}.json")["Body"].read()
+            item = json.loads(body.decode("utf-8"))
+        except Exception:
+            return None  # NoSuchKey, or no read access: a miss either way
+        if item.get("expires_at", 0) <= now:
+            return None
+        self.local.put(key, item["summary"], now)
+        return item["summary"]
+
+    def put(self, key, summary, now):
+        self.local.put(key, summary, now)
+        try:
+            client("s3").put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{key}.json",
+                Body=json.dumps({"summary": summary, "created_at": now, "expires_at": now + self.ttl}),
+                ContentType="application/json",
+            )
+        except Exception as exc:
+            print(f"summary cache write failed: {exc}")
+
+
+_MEMORY_SUMMARY_CACHE = MemorySummaryCache()
+
+
+class PartialReport:
+    """The markdown report in S3, rewritten while the summary streams in; a no-op without a bucket."""
+
+    def __init__(self, bucket, key, render):
+        self.bucket = bucket
+        self.key = key
+        self.render = render
+        self.parts = []
+        self.flushed_at = 0.0
+        self.writes = 0
+
+    def write(self, summary):
+        if not self.bucket:
+            return
+        try:
+            client("s3").put_object(Bucket=self.bucket, Key=self.key, Body=self.render(summary),
+                                    ContentType="text/markdown")
+            self.writes += 1
+        except Exception as exc:
+            print(f"partial report write failed: {exc}")  # best effort; the final write still happens
+
+    def on_text(self, delta):
+        self.parts.append(delta)
+        now = time.monotonic()
+        if now - self.flushed_at >= PARTIAL_FLUSH_SECONDS:
+            self.flushed_at = now
+            self.write("".join(self.parts) + "\n\n_(summary still generating...)_")
+
+
+def summary_cache():
+    bucket = os.environ.get("SUMMARY_CACHE_BUCKET") or os.environ.get("REPORT_BUCKET")
+    return S3SummaryCache(bucket) if bucket else _MEMORY_SUMMARY_CACHE
+
+
+def summarize(model_id, prompt, cache=None, budget=PROMPT_TOKEN_BUDGET, on_text=None):
+    """
+    (summary, meta): Bedrock summary of the evidence, fitted to `budget`, served from
+    `cache` when the prompt repeats. on_text streams the response (see bedrock_generate_summary);
+    a cached summary is returned whole.
+    """
+    text, tokens, trimmed = fit_prompt(prompt, budget)
+    meta = {"prompt_tokens_estimated": tokens, "trimmed": trimmed, "cached": False}
+    if not model_id:
+        return bedrock_generate_summary(model_id, text), meta
+    key = hashlib.sha256(f"{model_id}\n{text}".encode("utf-8")).hexdigest()
+    meta["cache_key"] = key
+    now = int(time.time())
+    cached = cache.get(key, now) if cache else None
+    if cached is not None:
+        meta["cached"] = True
+        return cached, meta
+    summary = bedrock_generate_summary(model_id, text, on_text)
+    if cache and summary.strip() \
+            and not summary.startswith(("Bedrock invocation failed", "Bedrock response body missing")) \
+            and STREAM_INTERRUPTED not in summary:
+        cache.put(key, summary, now)
+    return summary, meta
+
+
+def fetch_ssm_params(path):
+    try:
+        return client("ssm").get_parameters_by_path(
+            Path=path, WithDecryption=True, Recursive=True
+        ).get("Parameters", [])
+    except Exception:
+        return []
+
+
+def fetch_secret_meta(secret_id):
+    try:
+        sec = client("secretsmanager").describe_secret(SecretId=secret_id)
+        return {
+            "arn": sec.get("ARN"),
+            "name": sec.get("Name"),
+        }
+    except Exception:
+        return None
+
+
+def remaining_seconds(context, default=LOGS_QUERY_TIMEOUT + REPORT_RESERVE_SECONDS):
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    return get_remaining() / 1000.0 if get_remaining else default
+
+
+def gather(fetches, budget):
+    """
+    Run independent fetches concurrently: fetches is {name: (fn, default)}. Returns
+    {name: value} after at most `budget` seconds; a fetch that failed or is still running
+    then gets its default (Logs Insights fetches stop their own query at the same deadline).
+    """
+    results = {name: default for name, (_, default) in fetches.items()}
+    if not fetches:
+        return results
+    pool = ThreadPoolExecutor(max_workers=len(fetches))
+    futures = {pool.submit(fn): name for name, (fn, _) in fetches.items()}
+    done, _ = wait(futures, timeout=max(0.0, budget))
+    pool.shutdown(wait=False)
+    for future in done:
+        if future.exception() is None:
+            results[futures[future]] = future.result()
+    return results
+
+
+def collect_evidence(app_log_group, waf_log_group, ssm_param_path, secret_id, start, end, budget):
+    """App/WAF queries, SSM parameters and secret metadata, fetched in parallel within budget seconds."""
+    query_timeout = max(1.0, min(LOGS_QUERY_TIMEOUT, budget))
+    fetches = {}
+    # Same text as app_recent / waf_top_talkers in python/galactus_queries.py (the Lambda
+    # zip only carries this file, so the strings are kept inline here).
+    if app_log_group:
+        fetches["app_logs"] = (lambda: run_logs_query(
+            app_log_group,
+            "fields @timestamp, @message | sort @timestamp desc | limit 50",
+            start,
+            end,
+            timeout=query_timeout,
+            name="app_recent",
+        ), [])
+    if waf_log_group:
+        fetches["waf_logs"] = (lambda: run_logs_query(
+            waf_log_group,
+            "fields @timestamp, action, httpRequest.clientIp as clientIp, httpRequest.uri as uri "
+            "| stats count() as hits by action, clientIp, uri | sort hits desc | limit 25",
+            start,
+            end,
+            timeout=query_timeout,
+            name="waf_top_talkers",
+        ), [])
+    if ssm_param_path:
+        fetches["ssm_params"] = (lambda: fetch_ssm_params(ssm_param_path), [])
+    if secret_id:
+        fetches["secret_meta"] = (lambda: fetch_secret_meta(secret_id), None)
+    evidence = {"app_logs": [], "waf_logs": [], "ssm_params": [], "secret_meta": None}
+    evidence.update(gather(fetches, budget))
+    return evidence
+
+
 def lambda_handler(event, context):
     report_bucket = os.environ.get("REPORT_BUCKET")
     app_log_group = os.environ.get("APP_LOG_GROUP")
@@ -168,145 +775,186 @@ def lambda_handler(event, context):
 
     now = int(time.time())
     start = now - logs_time_window
-    alarm = parse_alarm_event(event)
-
-    app_logs = run_logs_query(
-        app_log_group,
-        "fields @timestamp, @message | sort @timestamp desc | limit 50",
-        start,
-        now,
-    ) if app_log_group else []
-
-    waf_logs = run_logs_query(
-        waf_log_group,
-        "fields @timestamp, action, httpRequest.clientIp as clientIp, httpRequest.uri as uri "
-        "| stats count() as hits by action, clientIp, uri | sort hits desc | limit 25",
-        start,
-        now,
-    ) if waf_log_group else []
-
-    ssm_params = []
-    if ssm_param_path:
-        try:
-            ssm_params = ssm.get_parameters_by_path(
-                Path=ssm_param_path, WithDecryption=True, Recursive=True
-            ).get("Parameters", [])
-        except Exception:
-            ssm_params = []
-
-    secret_meta = None
-    if secret_id:
+    alarms = parse_alarm_events(event)
+    alarm = alarms[0]
+    alarm_names = sorted({a.get("AlarmName", "unknown") for a in alarms})
+    incident_id = slugify(f"{alarm.get('AlarmName', 'incident')}-{now}")
+
+    lock_key = os.environ.get("COALESCE_KEY", "ir_reporter")
+    owner = owner_token(event, context, incident_id)
+    lock = incident_lock() if COALESCE_WINDOW_SECONDS > 0 else None
+    if lock is not None:
         try:
-            sec = secrets.describe_secret(SecretId=secret_id)
-            secret_meta = {
-                "arn": sec.get("ARN"),
-                "name": sec.get("Name"),
-            }
-        except Exception:
-            secret_meta = None
-
-    prompt = {
-        "incident": alarm,
-        "app_logs": app_logs,
-        "waf_logs": waf_logs,
-        "ssm_params": ssm_params,
-        "secret_meta": secret_meta,
-    }
-    bedrock_summary = bedrock_generate_summary(
-        bedrock_model_id, json.dumps(prompt, indent=2, default=str)
-    )
-
-    incident_id = f"{alarm.get('AlarmName', 'incident')}-{now}"
-    incident_id = slugify(incident_id)
-    alarm_name = alarm.get("AlarmName", "unknown")
-    alarm_state = alarm.get("NewStateValue", alarm.get("State", "unknown"))
-    alarm_time = alarm.get("StateChangeTime", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
-
-    report = {
-        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-        "incident_id": incident_id,
-        "alarm": alarm,
-        "app_logs": app_logs,
-        "waf_logs": waf_logs,
-        "ssm_params": ssm_params,
-        "secret_meta": secret_meta,
-        "bedrock_summary": bedrock_summary,
-    }
+            owned, incident_id = lock.acquire(lock_key, incident_id, owner, alarm_names, now,
+                                              COALESCE_WINDOW_SECONDS)
+        except Exception as exc:
+            # A broken lock must not cost the report: a duplicate beats none.
+            print(f"incident lock unavailable, reporting alone: {exc}")
+            owned, lock = True, None
+        if not owned:
+            return {"ok": True, "coalesced": True, "incident_id": incident_id, "alarms": alarm_names}
 
-    report_key = f"reports/ir-{incident_id}.json"
-    md_key = f"reports/ir-{incident_id}.md"
-
-    markdown = REPORT_TEMPLATE.format(
-        incident_id=incident_id,
-        title=alarm_name,
-        impact="TBD",
-        symptoms="TBD",
-        detection="CloudWatch Alarm",
-        severity="TBD",
-        start_time="TBD",
-        end_time="TBD",
-        duration="TBD",
-        alarm_time=alarm_time,
-        first_error_time="TBD",
-        triage_time="TBD",
-        rca_time="TBD",
-        fix_time="TBD",
-        restore_time="TBD",
-        alarm_clear_time="TBD",
-        components="TBD",
-        entry_point="ALB/WAF",
-        downstream="RDS",
-        regions="us-west-2",
-        alarm_name=alarm_name,
-        alarm_metric=alarm.get("MetricName", "unknown"),
-        alarm_threshold=alarm.get("Threshold", "unknown"),
-        alarm_state=alarm_state,
-        app_log_summary=f"{len(app_logs)} records (last {logs_time_window}s)",
-        waf_log_summary=f"{len(waf_logs)} records (last {logs_time_window}s)",
-        ssm_path=ssm_param_path,
-        secret_name=secret_meta["name"] if secret_meta else "unknown",
-        drift_notes="TBD",
-        root_cause_category="TBD",
-        failure_mechanism="TBD",
-        why_not_prevented="TBD",
-        contributing_factors="TBD",
-        actions_taken="TBD",
-        validation_checks="TBD",
-        recovery_evidence="TBD",
-        prevent_immediate="TBD",
-        prevent_short="TBD",
-        prevent_long="TBD",
-        cli_commands="TBD",
-        queries_used="See evidence bundle",
-        model_id=bedrock_model_id or "not configured",
-    )
-
-    if report_bucket:
-        s3.put_object(
-            Bucket=report_bucket,
-            Key=report_key,
-            Body=json.dumps(report, indent=2, default=str),
-            ContentType="application/json",
-        )
-        s3.put_object(
-            Bucket=report_bucket,
-            Key=md_key,
-            Body=markdown,
-            ContentType="text/markdown",
+    try:
+        # Evidence sources are independent: the slowest one, not their sum, sets the pace, and
+        # whatever is still running when the budget is spent is left out of the report.
+        evidence = collect_evidence(
+            app_log_group, waf_log_group, ssm_param_path, secret_id, start, now,
+            remaining_seconds(context) - REPORT_RESERVE_SECONDS,
         )
+        app_logs = evidence["app_logs"]
+        waf_logs = evidence["waf_logs"]
+        ssm_params = evidence["ssm_params"]
+        secret_meta = evidence["secret_meta"]
+
+        prompt = {
+            "incident": alarm,
+            "related_alarms": alarms[1:],
+            "app_logs": app_logs,
+            "waf_logs": waf_logs,
+            "ssm_params": ssm_params,
+            "secret_meta": secret_meta,
+        }
 
-    if sns_topic_arn:
-        sns.publish(
-            TopicArn=sns_topic_arn,
-            Subject="Report Ready",
-            Message=json.dumps(
-                {
-                    "bucket": report_bucket,
-                    "json_key": report_key,
-                    "markdown_key": md_key,
-                    "incident_id": incident_id,
-                }
-            ),
+        alarm_name = alarm.get("AlarmName", "unknown")
+        alarm_state = alarm.get("NewStateValue", alarm.get("State", "unknown"))
+        alarm_time = alarm.get("StateChangeTime", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+
+        report_key = f"reports/ir-{incident_id}.json"
+        md_key = f"reports/ir-{incident_id}.md"
+
+        def render_markdown(summary):
+            return REPORT_TEMPLATE.format(
+                incident_id=incident_id,
+                title=alarm_name,
+                impact="TBD",
+                symptoms="TBD",
+                detection="CloudWatch Alarm" + (
+                    f" ({len(alarm_names)} alarms coalesced: {', '.join(alarm_names)})" if len(alarm_names) > 1 else ""
+                ),
+                severity="TBD",
+                start_time="TBD",
+                end_time="TBD",
+                duration="TBD",
+                alarm_time=alarm_time,
+                first_error_time="TBD",
+                triage_time="TBD",
+                rca_time="TBD",
+                fix_time="TBD",
+                restore_time="TBD",
+                alarm_clear_time="TBD",
+                components="TBD",
+                entry_point="ALB/WAF",
+                downstream="RDS",
+                regions="us-west-2",
+                alarm_name=alarm_name,
+                alarm_metric=alarm.get("MetricName", "unknown"),
+                alarm_threshold=alarm.get("Threshold", "unknown"),
+                alarm_state=alarm_state,
+                app_log_summary=f"{len(app_logs)} records (last {logs_time_window}s)",
+                waf_log_summary=f"{len(waf_logs)} records (last {logs_time_window}s)",
+                ssm_path=ssm_param_path,
+                secret_name=secret_meta["name"] if secret_meta else "unknown",
+                drift_notes="TBD",
+                root_cause_category="TBD",
+                failure_mechanism="TBD",
+                why_not_prevented="TBD",
+                contributing_factors="TBD",
+                actions_taken="TBD",
+                validation_checks="TBD",
+                recovery_evidence="TBD",
+                prevent_immediate="TBD",
+                prevent_short="TBD",
+                prevent_long="TBD",
+                cli_commands="TBD",
+                queries_used="See evidence bundle",
+                model_id=bedrock_model_id or "not configured",
+            ) + SUMMARY_SECTION.format(summary=summary)
+
+        # The markdown report is in S3 as soon as the evidence is, and is rewritten while the
+        # summary streams in: responders can open it before the model has finished.
+        partial = PartialReport(report_bucket, md_key, render_markdown)
+        if bedrock_model_id:
+            partial.write("_Generating summary with Amazon Bedrock..._")
+        bedrock_summary, bedrock_meta = summarize(
+            bedrock_model_id, prompt, summary_cache(), on_text=partial.on_text if BEDROCK_STREAM else None
         )
-
-    return {"ok": True, "report_key": report_key, "markdown_key": md_key}
+        bedrock_meta["partial_writes"] = partial.writes
+
+        def publish(subject):
+            report = {
+                "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "incident_id": incident_id,
+                "alarm": alarm,
+                "alarms": alarm_names,
+                "app_logs": app_logs,
+                "waf_logs": waf_logs,
+                "ssm_params": ssm_params,
+                "secret_meta": secret_meta,
+                "bedrock_summary": bedrock_summary,
+                "bedrock": bedrock_meta,
+            }
+            markdown = render_markdown(bedrock_summary)
+
+            if report_bucket:
+                client("s3").put_object(
+                    Bucket=report_bucket,
+                    Key=report_key,
+                    Body=json.dumps(report, indent=2, default=str),
+                    ContentType="application/json",
+                )
+                client("s3").put_object(
+                    Bucket=report_bucket,
+                    Key=md_key,
+                    Body=markdown,
+                    ContentType="text/markdown",
+                )
+
+            if sns_topic_arn:
+                client("sns").publish(
+                    TopicArn=sns_topic_arn,
+                    Subject=subject,
+                    Message=json.dumps(
+                        {
+                            "bucket": report_bucket,
+                            "json_key": report_key,
+                            "markdown_key": md_key,
+                            "incident_id": incident_id,
+                            "alarms": alarm_names,
+                        }
+                    ),
+                )
+
+        # Publish, then release the lock; alarms that joined meanwhile get the report republished
+        # with their names (see "Alarm-storm coalescing").
+        published = None
+        while True:
+            state = None
+            if lock is not None:
+                try:
+                    state = lock.members(lock_key, incident_id, owner)
+                except Exception as exc:
+                    print(f"incident lock read failed: {exc}")
+            if state:
+                alarm_names = sorted(set(alarm_names) | set(state[0]))
+            if alarm_names != published:
+                # A takeover republishes an incident someone already reported.
+                publish("Report Updated" if published is not None or state and state[2] else "Report Ready")
+                published = alarm_names
+            try:
+                if not state or lock.release(lock_key, incident_id, owner, state[1]):
+                    break
+            except Exception as exc:
+                print(f"incident lock release failed, it expires with the window: {exc}")
+                break
+
+        return {"ok": True, "incident_id": incident_id, "alarms": alarm_names,
+                "report_key": report_key, "markdown_key": md_key}
+    except Exception:
+        # Without this the incident would stay owned by a dead invocation and every later
+        # alarm in the window would join it without ever being reported.
+        if lock is not None:
+            try:
+                lock.abandon(lock_key, incident_id, owner)
+            except Exception as exc:
+                print(f"incident lock abandon failed, it expires with the window: {exc}")
+        raise
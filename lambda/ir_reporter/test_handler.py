@@ -0,0 +1,399 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import boto3
+import pytest
+
+import handler
+
+
+def test_clients_are_built_on_first_use_and_cached(monkeypatch):
+    built = []
+    monkeypatch.setattr(boto3, "client", lambda name: built.append(name) or object())
+    monkeypatch.setattr(handler, "_CLIENTS", {})
+
+    first = handler.client("s3")
+    assert handler.client("s3") is first
+    handler.client("sns")
+    assert built == ["s3", "sns"]
+
+
+class SlowLogs:
+    """start_query/get_query_results stand-in: every query completes `delay` seconds after it starts."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.started = {}
+        self.stopped = []
+
+    def start_query(self, **kwargs):
+        qid = f"q{len(self.started)}"
+        self.started[qid] = time.monotonic()
+        return {"queryId": qid}
+
+    def get_query_results(self, queryId):
+        if time.monotonic() - self.started[queryId] < self.delay:
+            return {"status": "Running", "statistics": {"recordsScanned": 0}}
+        return {"status": "Complete", "results": [[{"field": "q", "value": queryId}]]}
+
+    def stop_query(self, queryId):
+        self.stopped.append(queryId)
+
+
+class Stub:
+    def __init__(self, delay=0.0, **responses):
+        self.delay = delay
+        for op, resp in responses.items():
+            setattr(self, op, lambda resp=resp, **kw: time.sleep(self.delay) or resp)
+
+
+def fake_clients(monkeypatch, logs_delay, ssm_delay=0.0):
+    clients = {
+        "logs": SlowLogs(logs_delay),
+        "ssm": Stub(ssm_delay, get_parameters_by_path={"Parameters": [{"Name": "/lab/db/port", "Value": "3306"}]}),
+        "secretsmanager": Stub(describe_secret={"ARN": "arn:secret", "Name": "lab/db"}),
+    }
+    monkeypatch.setattr(handler, "_CLIENTS", clients)
+    return clients
+
+
+def test_evidence_sources_are_fetched_concurrently(monkeypatch):
+    fake_clients(monkeypatch, logs_delay=0.6, ssm_delay=0.6)
+
+    t0 = time.monotonic()
+    evidence = handler.collect_evidence("/app", "/waf", "/lab/db/", "lab/db", 0, 60, budget=10)
+    elapsed = time.monotonic() - t0
+
+    assert elapsed < 1.5  # ~max(query) + one poll interval, not the ~2 s sum
+    assert len(evidence["app_logs"]) == 1 and len(evidence["waf_logs"]) == 1
+    assert evidence["ssm_params"][0]["Name"] == "/lab/db/port"
+    assert evidence["secret_meta"] == {"arn": "arn:secret", "name": "lab/db"}
+
+
+def test_each_logs_query_writes_one_emf_line(monkeypatch, capsys):
+    stats = {"recordsScanned": 1200.0, "recordsMatched": 50.0, "bytesScanned": 2e9}
+    polls = iter([{"status": "Running", "statistics": {"recordsScanned": 600.0}},
+                  {"status": "Complete", "statistics": stats, "results": [[{"field": "n", "value": "1"}]]}])
+    logs = Stub(start_query={"queryId": "q0"})
+    logs.get_query_results = lambda queryId: next(polls)
+    monkeypatch.setattr(handler, "_CLIENTS", {"logs": logs})
+    monkeypatch.setattr(handler.time, "sleep", lambda _s: None)
+
+    rows = handler.run_logs_query("/app", "fields @message", 0, 60, name="app_recent")
+    emf = json.loads(capsys.readouterr().out)
+    assert rows == [[{"field": "n", "value": "1"}]]
+    assert emf["_aws"]["CloudWatchMetrics"][0]["Namespace"] == handler.EMF_NAMESPACE
+    assert (emf["Command"], emf["Query"], emf["Status"], emf["Polls"]) == ("ir_reporter", "app_recent", "Complete", 2)
+    assert emf["RecordsScanned"] == 1200 and emf["BytesScanned"] == 2_000_000_000
+    assert emf["EstimatedCostUSD"] == pytest.approx(0.01)
+
+
+def test_evidence_budget_follows_remaining_lambda_time(monkeypatch):
+    clients = fake_clients(monkeypatch, logs_delay=30)
+    context = SimpleNamespace(get_remaining_time_in_millis=lambda: (handler.REPORT_RESERVE_SECONDS + 1) * 1000)
+
+    t0 = time.monotonic()
+    evidence = handler.collect_evidence("/app", None, "/lab/db/", None, 0, 60,
+                                        budget=handler.remaining_seconds(context) - handler.REPORT_RESERVE_SECONDS)
+
+    assert time.monotonic() - t0 < 1.5
+    assert evidence["app_logs"] == [] and evidence["ssm_params"]
+    time.sleep(0.5)  # the query's own deadline matches the budget, so it is stopped rather than left running
+    assert clients["logs"].stopped == ["q0"]
+
+
+class Bedrock:
+    def __init__(self, deltas=("sum", "mary"), fail_after=None):
+        self.calls = 0
+        self.deltas = deltas
+        self.fail_after = fail_after
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        time.sleep(0.2)
+        return {"body": io.BytesIO(json.dumps({"content": [{"text": "".join(self.deltas)}]}).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.calls += 1
+
+        def events():
+            yield {"chunk": {"bytes": json.dumps({"type": "message_start"}).encode("utf-8")}}
+            for i, text in enumerate(self.deltas):
+                if i == self.fail_after:
+                    yield {"modelStreamErrorException": {"message": "stream reset"}}
+                    return
+                time.sleep(0.05)
+                yield {"chunk": {"bytes": json.dumps({"type": "content_block_delta",
+                                                      "delta": {"type": "text_delta", "text": text}}).encode("utf-8")}}
+        return {"body": events()}
+
+
+def sns_event(*names):
+    return {"Records": [{"Sns": {"MessageId": f"msg-{n}",
+                                 "Message": json.dumps({"AlarmName": n, "NewStateValue": "ALARM"})}} for n in names]}
+
+
+def storm_clients(monkeypatch, lock):
+    clients = fake_clients(monkeypatch, logs_delay=0.4)
+    clients.update({"bedrock-runtime": Bedrock(), "s3": Stub(put_object={}), "sns": Stub(publish={})})
+    puts, published = [], []
+    clients["s3"].put_object = lambda **kw: puts.append(kw["Key"])
+    clients["sns"].publish = lambda **kw: published.append((kw["Subject"], json.loads(kw["Message"])["alarms"]))
+    for k, v in {"APP_LOG_GROUP": "/app", "BEDROCK_MODEL_ID": "anthropic.test", "REPORT_BUCKET": "reports",
+                 "SNS_TOPIC_ARN": "arn:topic"}.items():
+        monkeypatch.setenv(k, v)
+    monkeypatch.setattr(handler, "incident_lock", lambda: lock)
+    return clients, puts, published
+
+
+def test_alarm_storm_is_coalesced_into_one_incident(monkeypatch):
+    lock = handler.MemoryIncidentLock()
+    clients, puts, published = storm_clients(monkeypatch, lock)
+
+    with ThreadPoolExecutor(4) as pool:
+        owner = pool.submit(handler.lambda_handler, sns_event("db-errors", "5xx-rate", "db-errors"), None)
+        time.sleep(0.1)  # the owner is collecting evidence
+        joined = list(pool.map(lambda n: handler.lambda_handler(sns_event(n), None), ["waf-blocks", "latency-p99"]))
+        first = owner.result()
+
+    assert len(clients["logs"].started) == 1 and clients["bedrock-runtime"].calls == 1
+    assert not first.get("coalesced")
+    assert all(r["coalesced"] and r["incident_id"] == first["incident_id"] for r in joined)
+    assert first["alarms"] == ["5xx-rate", "db-errors", "latency-p99", "waf-blocks"]
+    assert published == [("Report Ready", first["alarms"])]
+    assert puts[-2:] == [first["report_key"], first["markdown_key"]]
+    assert lock.items["ir_reporter"]["owner"] is None  # nobody owns it once the report is out
+
+    # Later in the window the next alarm takes the incident over and republishes it...
+    later = handler.lambda_handler(sns_event("disk-full"), None)
+    assert not later.get("coalesced") and later["incident_id"] == first["incident_id"]
+    assert published[-1] == ("Report Updated", sorted(first["alarms"] + ["disk-full"]))
+
+    # ...and once the window is over a new alarm opens a new incident.
+    lock.items["ir_reporter"]["expires_at"] = 0
+    after = handler.lambda_handler(sns_event("cpu-high"), None)
+    assert after["incident_id"] != first["incident_id"] and published[-1] == ("Report Ready", ["cpu-high"])
+
+
+def test_alarm_joining_while_owner_publishes_gets_the_report_republished(monkeypatch):
+    class RacyLock(handler.MemoryIncidentLock):
+        def release(self, key, incident_id, owner, joins):
+            if not self.raced:
+                self.raced = True
+                assert self.acquire(key, "other", "msg-late", ["late-alarm"], int(time.time()), 300) == (
+                    False, incident_id)
+            return super().release(key, incident_id, owner, joins)
+
+    lock = RacyLock()
+    lock.raced = False
+    _, _, published = storm_clients(monkeypatch, lock)
+
+    result = handler.lambda_handler(sns_event("db-errors"), None)
+
+    assert published == [("Report Ready", ["db-errors"]), ("Report Updated", ["db-errors", "late-alarm"])]
+    assert result["alarms"] == ["db-errors", "late-alarm"] and lock.items["ir_reporter"]["owner"] is None
+
+
+def test_failed_owner_abandons_the_lock_and_its_retry_reports(monkeypatch):
+    lock = handler.MemoryIncidentLock()
+    clients, puts, published = storm_clients(monkeypatch, lock)
+    put_object = clients["s3"].put_object
+
+    def flaky_put(**kw):
+        if kw["Key"].startswith("reports/") and kw["Key"].endswith(".json") and not hasattr(flaky_put, "failed"):
+            flaky_put.failed = True
+            raise RuntimeError("S3 unavailable")
+        put_object(**kw)
+    clients["s3"].put_object = flaky_put
+
+    with pytest.raises(RuntimeError):
+        handler.lambda_handler(sns_event("db-errors"), None)
+    assert lock.items["ir_reporter"]["owner"] is None and published == []
+
+    retry = handler.lambda_handler(sns_event("db-errors"), None)  # Lambda's async retry
+    assert not retry.get("coalesced") and published == [("Report Ready", ["db-errors"])]
+
+
+def test_retry_of_a_dead_owner_takes_its_incident_back(monkeypatch):
+    lock = handler.MemoryIncidentLock()
+    _, _, published = storm_clients(monkeypatch, lock)
+    # The owner timed out mid-report (nothing ran to abandon the lock); another alarm joined.
+    lock.acquire("ir_reporter", "db-errors-1", "msg-db-errors", ["db-errors"], int(time.time()), 300)
+    assert handler.lambda_handler(sns_event("5xx-rate"), None)["coalesced"]
+
+    retry = handler.lambda_handler(sns_event("db-errors"), None)
+
+    assert not retry.get("coalesced") and retry["incident_id"] == "db-errors-1"
+    assert published == [("Report Ready", ["5xx-rate", "db-errors"])]
+
+
+def test_no_coalescing_without_a_lock_table(monkeypatch):
+    monkeypatch.delenv("INCIDENT_LOCK_TABLE", raising=False)
+    assert handler.incident_lock() is None
+    monkeypatch.setenv("INCIDENT_LOCK_TABLE", "incidents")
+    assert isinstance(handler.incident_lock(), handler.DynamoIncidentLock)
+
+
+def test_dynamo_lock_uses_conditional_writes(monkeypatch):
+    class ConditionFailed(Exception):
+        response = {"Error": {"Code": "ConditionalCheckFailedException"}}
+
+    class Dynamo:
+        """Applies the lock's four update shapes to one item, checking their conditions."""
+        item = None
+
+        def put_item(self, Item, ConditionExpression, ExpressionAttributeValues, **kw):
+            assert ConditionExpression == "attribute_not_exists(pk) OR expires_at < :now"
+            if self.item and int(self.item["expires_at"]["N"]) >= int(ExpressionAttributeValues[":now"]["N"]):
+                raise ConditionFailed()
+            self.item = dict(Item)
+
+        def update_item(self, UpdateExpression, ConditionExpression, ExpressionAttributeValues, **kw):
+            item, v = self.item, ExpressionAttributeValues
+            holder = item.get("owner_token", {}).get("S")
+            if UpdateExpression == "ADD alarms :a, joins :one":
+                item["alarms"] = {"SS": sorted(set(item["alarms"]["SS"]) | set(v[":a"]["SS"]))}
+                item["joins"] = {"N": str(int(item["joins"]["N"]) + 1)}
+                return {"Attributes": dict(item)}
+            if v[":id"]["S"] != item["incident_id"]["S"]:
+                raise ConditionFailed()
+            if UpdateExpression == "SET owner_token = :owner":
+                assert "attribute_not_exists(owner_token)" in ConditionExpression
+                if holder is not None:
+                    raise ConditionFailed()
+                item["owner_token"] = v[":owner"]
+                return {}
+            if holder != v[":owner"]["S"] or (":joins" in v and v[":joins"]["N"] != item["joins"]["N"]):
+                raise ConditionFailed()
+            del item["owner_token"]
+            if ":t" in v:
+                item["reported"] = v[":t"]
+            return {}
+
+        def get_item(self, **kw):
+            return {"Item": self.item} if self.item else {}
+
+    monkeypatch.setattr(handler, "_CLIENTS", {"dynamodb": Dynamo()})
+    lock = handler.DynamoIncidentLock("incidents")
+    assert lock.acquire("k", "inc-1", "m1", ["a"], 100, 300) == (True, "inc-1")
+    assert lock.members("k", "inc-1", "m1") == (["a"], 0, False)
+    assert lock.acquire("k", "inc-2", "m2", ["b"], 110, 300) == (False, "inc-1")
+    assert not lock.release("k", "inc-1", "m1", 0)  # b joined after the owner's read
+    assert lock.members("k", "inc-1", "m1") == (["a", "b"], 1, False) and lock.members("k", "inc-2", "m2") is None
+    assert lock.release("k", "inc-1", "m1", 1)
+    assert lock.acquire("k", "inc-3", "m3", ["c"], 120, 300) == (True, "inc-1")  # later in the window: take over
+    assert lock.members("k", "inc-1", "m3") == (["a", "b", "c"], 2, True)
+    assert lock.acquire("k", "inc-4", "m3", ["c"], 130, 300) == (True, "inc-1")  # m3 retried: taken back
+    lock.abandon("k", "inc-1", "m2")
+    assert lock.members("k", "inc-1", "m3")
+    lock.abandon("k", "inc-1", "m3")
+    assert lock.members("k", "inc-1", "m3") is None
+    assert lock.acquire("k", "inc-5", "m5", ["e"], 500, 300) == (True, "inc-5")  # window over: new incident
+
+
+def test_prompt_is_trimmed_to_budget_and_redacts_secure_strings():
+    prompt = {
+        "incident": {"AlarmName": "db-errors", "StateChangeTime": "2026-10-18T10:00:00Z"},
+        "app_logs": [[{"field": "@message", "value": "ERROR " + "x" * 2000}, {"field": "@ptr", "value": "p"}]] * 50,
+        "waf_logs": [[{"field": "hits", "value": "9"}]] * 25,
+        "ssm_params": [{"Name": "/lab/db/password", "Type": "SecureString", "Value": "hunter2"},
+                       {"Name": "/lab/db/port", "Type": "String", "Value": "3306"}],
+    }
+    text, tokens, trimmed = handler.fit_prompt(prompt, budget=1500)
+    doc = json.loads(text)
+
+    assert tokens <= 1500 and tokens == handler.estimate_tokens(text)
+    assert trimmed["app_logs"] == f"kept {len(doc['app_logs'])} of 50" and doc["trimmed"] == trimmed
+    assert len(doc["app_logs"][0]["@message"]) == handler.MESSAGE_CHARS + 3 and "@ptr" not in doc["app_logs"][0]
+    assert "hunter2" not in text and "StateChangeTime" not in text
+
+
+def test_repeated_alarm_with_unchanged_evidence_reuses_the_summary(monkeypatch):
+    bedrock = Bedrock()
+    monkeypatch.setattr(handler, "_CLIENTS", {"bedrock-runtime": bedrock})
+    cache = handler.MemorySummaryCache()
+    evidence = {"app_logs": [[{"field": "@message", "value": "ERROR db"}]], "ssm_params": []}
+
+    first, meta1 = handler.summarize("anthropic.test", dict(evidence, incident={"AlarmName": "a", "StateChangeTime": "t1"}), cache)
+    again, meta2 = handler.summarize("anthropic.test", dict(evidence, incident={"AlarmName": "a", "StateChangeTime": "t2"}), cache)
+    changed, meta3 = handler.summarize("anthropic.test", dict(evidence, incident={"AlarmName": "b"}), cache)
+
+    assert first == again == "summary" and bedrock.calls == 2
+    assert (meta1["cached"], meta2["cached"], meta3["cached"]) == (False, True, False)
+
+
+def test_streamed_summary_rewrites_partial_markdown_then_finalizes(monkeypatch):
+    bedrock = Bedrock(deltas=("Root cause: ", "RDS ", "connection ", "exhaustion."))
+    bodies = []
+    clients = {"bedrock-runtime": bedrock, "s3": Stub(put_object={}), "ssm": Stub(get_parameters_by_path={"Parameters": []})}
+    clients["s3"].put_object = lambda **kw: bodies.append((kw["Key"], kw["Body"]))
+    monkeypatch.setattr(handler, "_CLIENTS", clients)
+    monkeypatch.setattr(handler, "_MEMORY_SUMMARY_CACHE", handler.MemorySummaryCache())
+    monkeypatch.setattr(handler, "PARTIAL_FLUSH_SECONDS", 0.0)
+    monkeypatch.setenv("BEDROCK_MODEL_ID", "anthropic.test")
+    monkeypatch.setenv("SUMMARY_CACHE_BUCKET", "")
+    monkeypatch.setenv("REPORT_BUCKET", "reports")
+
+    result = handler.lambda_handler(sns_event("db-errors"), None)
+    markdown = [body for key, body in bodies if key == result["markdown_key"]]
+
+    assert "Generating summary" in markdown[0]
+    assert "Root cause: RDS" in markdown[2] and "still generating" in markdown[2]
+    assert markdown[-1].rstrip().endswith("Root cause: RDS connection exhaustion.")
+    assert len(markdown) == 1 + 4 + 1  # placeholder, one rewrite per delta, final
+
+
+def test_interrupted_stream_keeps_partial_text_and_is_not_cached(monkeypatch):
+    monkeypatch.setattr(handler, "_CLIENTS", {"bedrock-runtime": Bedrock(deltas=("a", "b", "c"), fail_after=2)})
+    cache = handler.MemorySummaryCache()
+    seen = []
+
+    summary, _ = handler.summarize("anthropic.test", {"incident": {"AlarmName": "x"}}, cache, on_text=seen.append)
+
+    assert seen == ["a", "b"] and summary.startswith("ab") and "stream reset" in summary
+    assert cache.items == {}
+
+
+def test_stream_denied_falls_back_to_invoke_model(monkeypatch):
+    bedrock = Bedrock(deltas=("sum", "mary"))
+
+    def denied(**kwargs):
+        raise RuntimeError("AccessDeniedException: not authorized to perform InvokeModelWithResponseStream")
+    bedrock.invoke_model_with_response_stream = denied
+    monkeypatch.setattr(handler, "_CLIENTS", {"bedrock-runtime": bedrock})
+    cache = handler.MemorySummaryCache()
+
+    summary, _ = handler.summarize("anthropic.test", {"incident": {"AlarmName": "x"}}, cache, on_text=[].append)
+
+    assert summary == "summary" and bedrock.calls == 1
+    assert [s for _, s in cache.items.values()] == ["summary"]
+
+
+def chunk_events(*chunks):
+    return {"body": iter([{"chunk": {"bytes": json.dumps(c).encode("utf-8")}} for c in chunks])}
+
+
+def test_stream_text_reads_mistral_chunks_and_rejects_unknown_shapes():
+    mistral = chunk_events({"outputs": [{"text": "sum", "stop_reason": None}]},
+                           {"choices": [{"index": 0, "message": {"role": "assistant", "content": "mary"}}]})
+    assert "".join(handler.stream_text(mistral["body"])) == "summary"
+
+    with pytest.raises(RuntimeError, match="unsupported stream chunk"):
+        list(handler.stream_text(chunk_events({"generated": "x"})["body"]))
+
+
+def test_unknown_stream_falls_back_and_empty_summary_is_not_cached(monkeypatch):
+    bedrock = Bedrock(deltas=("sum", "mary"))
+    bedrock.invoke_model_with_response_stream = lambda **kw: chunk_events({"generated": "x"})
+    monkeypatch.setattr(handler, "_CLIENTS", {"bedrock-runtime": bedrock})
+    cache = handler.MemorySummaryCache()
+
+    summary, _ = handler.summarize("anthropic.test", {"incident": {"AlarmName": "x"}}, cache, on_text=[].append)
+    assert summary == "summary"
+
+    bedrock.deltas = ("",)
+    summary, _ = handler.summarize("anthropic.test", {"incident": {"AlarmName": "y"}}, cache, on_text=[].append)
+    assert summary == "" and len(cache.items) == 1
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+# bench_cloudfront_log_parser.py
+#
+# Micro-benchmark: the original per-line get_field parser vs the compiled column fast path
+# in galactus_cloudfront_log_explainer.count_standard_log_files.
+#
+# The sample log in LAB3-DELIVERABLES is only a couple of lines, so it is replicated into a
+# synthetic log of --size-mb uncompressed bytes (default 1024 = 1 GB) before timing.
+#
+# Usage:
+#   python ./python/bench_cloudfront_log_parser.py                    # 1 GB, gzip
+#   python ./python/bench_cloudfront_log_parser.py --size-mb 64 --plain
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from galactus_cloudfront_log_explainer import TARGETS, count_standard_log_files, open_maybe_gzip
+
+DEFAULT_SAMPLE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "LAB3-DELIVERABLES",
+    "E2T6L4WML8KX93.2026-02-09-07.faa4e6a8.gz",
+)
+
+
+def reference_count(file_paths: List[str]) -> Dict[str, int]:
+    """The parser as it was before the fast path (full split + get_field closure per line)."""
+    counts = Counter()
+    other = Counter()
+
+    for path in file_paths:
+        field_index: Optional[Dict[str, int]] = None
+
+        with open_maybe_gzip(path) as f:
+            for line in f:
+                if line.startswith("#Fields:"):
+                    _, fields_str = line.split(":", 1)
+                    fields = fields_str.strip().split()
+                    field_index = {name: idx for idx, name in enumerate(fields)}
+                    continue
+
+                if not line or line.startswith("#"):
+                    continue
+
+                if not field_index:
+                    other["(missing_fields_header)"] += 1
+                    continue
+
+                parts = line.rstrip("\n").split("\t")
+
+                def get_field(name: str) -> str:
+                    idx = field_index.get(name)
+                    if idx is None:
+                        return ""
+                    if idx >= len(parts):
+                        return ""
+                    return parts[idx]
+
+                rt = get_field("x-edge-result-type")
+                rrt = get_field("x-edge-response-result-type")
+                outcome = rt or rrt
+
+                if not outcome:
+                    other["(missing_outcome)"] += 1
+                elif outcome in TARGETS:
+                    counts[outcome] += 1
+                else:
+                    other[outcome] += 1
+
+    for k, v in other.items():
+        counts[f"Other:{k}"] += v
+
+    return dict(counts)
+
+
+def build_replica(sample: str, size_mb: int, dest: str, plain: bool) -> int:
+    """Write header lines once, then repeat the sample's data lines until size_mb is reached."""
+    with open_maybe_gzip(sample) as f:
+        lines = f.readlines()
+    header = "".join(l for l in lines if l.startswith("#"))
+    data = "".join(l for l in lines if not l.startswith("#"))
+    if not data:
+        raise SystemExit(f"No data lines in sample: {sample}")
+
+    target = size_mb * 1024 * 1024
+    block = (data * max(1, (4 * 1024 * 1024) // len(data))).encode("utf-8")
+
+    raw = open(dest, "wb") if plain else gzip.open(dest, "wb", compresslevel=1)
+    written = 0
+    with raw as out:
+        out.write(header.encode("utf-8"))
+        written += len(header)
+        while written < target:
+            out.write(block)
+            written += len(block)
+    return written
+
+
+def timed(fn, path: str):
+    t0 = time.perf_counter()
+    result = fn([path])
+    return result, time.perf_counter() - t0
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark CloudFront standard-log parsers.")
+    ap.add_argument("--sample", default=DEFAULT_SAMPLE, help="Sample CloudFront log (.gz or plain)")
+    ap.add_argument("--size-mb", type=int, default=1024, help="Uncompressed size of the replica (default: 1024)")
+    ap.add_argument("--plain", action="store_true", help="Write the replica uncompressed (isolates parse cost from gunzip)")
+    ap.add_argument("--workdir", default=None, help="Where to write the replica (default: system temp dir)")
+    ap.add_argument("--keep", action="store_true", help="Keep the replica file")
+    args = ap.parse_args()
+
+    suffix = ".log" if args.plain else ".gz"
+    fd, path = tempfile.mkstemp(prefix="galactus_cf_bench_", suffix=suffix, dir=args.workdir)
+    os.close(fd)
+
+    try:
+        print(f"[bench] building {args.size_mb} MB replica of {os.path.basename(args.sample)} -> {path}")
+        size = build_replica(args.sample, args.size_mb, path, args.plain)
+        mb = size / (1024 * 1024)
+
+        ref, t_ref = timed(reference_count, path)
+        fast, t_fast = timed(count_standard_log_files, path)
+        if ref != fast:
+            print(f"[bench] MISMATCH\n  reference={ref}\n  fast     ={fast}", file=sys.stderr)
+            return 1
+
+        lines = sum(ref.values())
+        print(f"\n{'parser':12s} {'seconds':>9s} {'MB/s':>9s} {'lines/s':>12s}")
+        for name, t in (("reference", t_ref), ("fast-path", t_fast)):
+            print(f"{name:12s} {t:9.2f} {mb / t:9.1f} {lines / t:12,.0f}")
+        print(f"\nspeedup: {t_ref / t_fast:.2f}x over {lines:,} lines ({mb:,.0f} MB uncompressed)")
+        print(f"counts:  {fast}")
+        return 0
+    finally:
+        if args.keep:
+            print(f"[bench] kept replica: {path}")
+        else:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+# bench_evidence_pipeline.py
+#
+# End-to-end benchmark of `galactus_cli collect-evidence` against the local emulator
+# (galactus_logs_emulator): the original serial collector (one call after another, Logs
+# Insights polled every 1 s) vs the concurrent evidence graph in sub_implementation.
+#
+# Both paths run against the same recorded incident with the same simulated latencies;
+# the report is wall time plus API calls per operation. Bundles are compared section by
+# section so a speedup never hides a behaviour change. The other two consumers of the same
+# evidence are timed on that incident too: one ir_reporter Lambda invocation (no Bedrock
+# model; the report lands in the emulator's S3 and SNS) and galactus_waf_summary.
+#
+# The app log group replays the real app log recorded in LAB1 (rdsapp_cloudwatch.log);
+# --synthetic-app-log uses python/fixtures/app_logs.jsonl instead.
+#
+# Usage:
+#   python ./python/bench_evidence_pipeline.py
+#   python ./python/bench_evidence_pipeline.py --query-base 3 --api-latency 0.05 --repeat 20
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+from typing import Dict
+
+import galactus_queries
+import galactus_waf_summary
+from galactus_logs_emulator import APP_LOG_GROUP, RDSAPP_LOG, SECRET_ID, WAF_LOG_GROUP, Emulator
+from galactus_logsinsights_runner import epoch, utc_now
+from sub_implementation import EVIDENCE_QUERIES, collect_evidence
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "ir_reporter")
+
+
+def reference_run_logs_query(logs, log_group, query, minutes, limit=50):
+    """collect-evidence's query helper as it was: fixed 1 s polling, up to 30 polls."""
+    end = epoch(utc_now())
+    start = epoch(utc_now() - timedelta(minutes=minutes))
+    qid = logs.start_query(logGroupName=log_group, startTime=start, endTime=end, queryString=query,
+                           limit=limit)["queryId"]
+    for _ in range(30):
+        r = logs.get_query_results(queryId=qid)
+        if r["status"] == "Complete":
+            return [{x["field"]: x["value"] for x in row} for row in r.get("results", [])]
+        if r["status"] in ("Failed", "Cancelled", "Timeout"):
+            raise RuntimeError(f"Query failed: {r['status']}")
+        time.sleep(1)
+    raise TimeoutError("Logs query timed out")
+
+def reference_collect(args, clients) -> Dict[str, object]:
+    """The serial collector: alarms, each query in turn, SSM pages, then the secret."""
+    cw, logs, ssm, secrets = (clients[k] for k in ("cloudwatch", "logs", "ssm", "secretsmanager"))
+    evidence = {"alarms": [{"name": a["AlarmName"], "metric": a.get("MetricName"), "namespace": a.get("Namespace"),
+                            "reason": a.get("StateReason"), "updated": str(a.get("StateUpdatedTimestamp"))}
+                           for a in cw.describe_alarms(StateValue="ALARM", MaxRecords=25).get("MetricAlarms", [])],
+                "logs": {}}
+    groups = {"app": args.app_log_group, "waf": args.waf_log_group}
+    for source, queries in EVIDENCE_QUERIES.items():
+        for name, query in queries.items():
+            evidence["logs"][name] = reference_run_logs_query(logs, groups[source], query, args.minutes)
+    ssm_meta, token = {}, None
+    while True:
+        kwargs = {"Path": args.ssm_path, "Recursive": True, "WithDecryption": False}
+        if token:
+            kwargs["NextToken"] = token
+        r = ssm.get_parameters_by_path(**kwargs)
+        for p in r.get("Parameters", []):
+            ssm_meta[p["Name"]] = {"type": p["Type"]}
+        token = r.get("NextToken")
+        if not token:
+            break
+    sec = secrets.get_secret_value(SecretId=args.secret_id)
+    evidence["config_sources"] = {"ssm_meta": ssm_meta, "secrets_meta": {
+        "secret_id": args.secret_id, "has_rotation": bool(sec.get("RotationEnabled"))}}
+    return evidence
+
+def concurrent_collect(args, clients) -> Dict[str, object]:
+    collect_evidence(args, clients, log=lambda m: None)
+    with open(args.out, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def lambda_report(args, clients) -> Dict[str, object]:
+    """
+    One ir_reporter invocation for the emulator's DB alarm, with the emulator's clients in
+    the handler's client cache. Returns the handler's result plus the per-query EMF lines
+    it printed.
+    """
+    if LAMBDA_DIR not in sys.path:
+        sys.path.insert(0, LAMBDA_DIR)
+    import handler  # ships alone in the Lambda zip, so it is not importable from python/ otherwise
+
+    env = {"REPORT_BUCKET": "ir-reports", "SNS_TOPIC_ARN": "arn:aws:sns:local:000000000000:ir",
+           "APP_LOG_GROUP": args.app_log_group, "WAF_LOG_GROUP": args.waf_log_group,
+           "SSM_PARAM_PATH": args.ssm_path, "SECRET_ID": args.secret_id,
+           "LOGS_TIME_WINDOW_SECONDS": str(args.minutes * 60), "BEDROCK_MODEL_ID": ""}
+    saved_env = {k: os.environ.get(k) for k in env}
+    saved_clients = handler._CLIENTS
+    event = {"Records": [{"Sns": {"MessageId": "bench-1", "Message": json.dumps(
+        {"AlarmName": "lab-db-connection-errors", "NewStateValue": "ALARM", "MetricName": "DBConnectionErrors"})}}]}
+    context = SimpleNamespace(aws_request_id="bench", get_remaining_time_in_millis=lambda: 900_000)
+    os.environ.update(env)
+    handler._CLIENTS = dict(clients)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            result = handler.lambda_handler(event, context)
+    finally:
+        handler._CLIENTS = saved_clients
+        for k, v in saved_env.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    result["emf"] = [json.loads(line) for line in out.getvalue().splitlines() if line.startswith('{"_aws"')]
+    return result
+
+def waf_summary(args, clients) -> Dict[str, object]:
+    return galactus_waf_summary.run(clients["logs"], args.waf_log_group, {
+        "actions": galactus_queries.render("waf_actions"),
+        "top_ips": galactus_queries.render("waf_top_ips", {"limit": 10}),
+    }, args.minutes)
+
+
+def _rows(rows):
+    # Stats rows are compared as sets (order of equal-count groups is unspecified); @ptr differs per run.
+    return sorted(json.dumps({k: v for k, v in r.items() if k != "@ptr"}, sort_keys=True) for r in rows)
+
+def compare(ref: Dict[str, object], new: Dict[str, object]) -> list:
+    diffs = []
+    if [a["name"] for a in ref["alarms"]] != [a["name"] for a in new.get("alarms", [])]:
+        diffs.append("alarms")
+    for name, rows in ref["logs"].items():
+        if _rows(rows) != _rows(new.get("logs", {}).get(name, [])):
+            diffs.append(f"logs.{name}")
+    if ref["config_sources"]["ssm_meta"] != new.get("config_sources", {}).get("ssm_meta"):
+        diffs.append("ssm_meta")
+    # The secret's rotation flag is one of the fixes: get_secret_value never carried RotationEnabled.
+    return diffs
+
+def timed(fn, args, emu: Emulator):
+    emu.calls.clear()
+    t0 = time.perf_counter()
+    result = fn(args, emu.clients())
+    return result, time.perf_counter() - t0, Counter(emu.calls)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Benchmark serial vs concurrent evidence collection against the local emulator.")
+    ap.add_argument("--query-base", type=float, default=2.0, help="Seconds every Logs Insights query takes before scanning (default: 2.0)")
+    ap.add_argument("--scan-rate", type=float, default=50000.0, help="Emulated records scanned per second (default: 50000)")
+    ap.add_argument("--api-latency", type=float, default=0.03, help="Seconds per API round trip (default: 0.03)")
+    ap.add_argument("--repeat", type=int, default=1, help="Replay the fixtures N times back to back (more records to scan)")
+    ap.add_argument("--ssm-params", type=int, default=35, help="Parameters under the SSM path (10 per page)")
+    ap.add_argument("--minutes", type=int, default=60, help="Evidence window (default: 60)")
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent path worker threads (default: 8)")
+    ap.add_argument("--synthetic-app-log", action="store_true",
+                    help="Replay fixtures/app_logs.jsonl as the app log group instead of the recorded rdsapp log")
+    args = ap.parse_args()
+
+    emu = Emulator(query_base=args.query_base, scan_rate=args.scan_rate, api_latency=args.api_latency,
+                   repeat=args.repeat, ssm_params=args.ssm_params,
+                   app_log=None if args.synthetic_app_log else RDSAPP_LOG)
+    fd, out = tempfile.mkstemp(prefix="galactus_evidence_bench_", suffix=".json")
+    os.close(fd)
+    run_args = SimpleNamespace(incident_id="IR-BENCH", minutes=args.minutes, region=None, app_log_group=APP_LOG_GROUP,
+                               waf_log_group=WAF_LOG_GROUP, ssm_path="/lab/db/", secret_id=SECRET_ID, out=out,
+                               format="json", task_timeout=60.0, retries=1, workers=args.workers, cache=None)
+    records = sum(len(g.records) for g in emu.logs.groups.values())
+    print(f"[bench] emulator: {records:,} log records "
+          f"({'synthetic' if args.synthetic_app_log else 'recorded'} app log), query_base={args.query_base}s, "
+          f"api_latency={args.api_latency}s, {args.ssm_params} SSM params")
+
+    try:
+        ref, t_ref, c_ref = timed(reference_collect, run_args, emu)
+        new, t_new, c_new = timed(concurrent_collect, run_args, emu)
+    finally:
+        try:
+            os.remove(out)
+        except OSError:
+            pass
+    report, t_lambda, c_lambda = timed(lambda_report, run_args, emu)
+    summary, t_waf, c_waf = timed(waf_summary, run_args, emu)
+
+    diffs = compare(ref, new)
+    if not report.get("ok") or ("ir-reports", report.get("report_key")) not in emu.s3.objects or not emu.sns.messages:
+        diffs.append("ir_reporter report")
+    if not summary["actions"] or not summary["top_ips"]:
+        diffs.append("waf_summary")
+    if diffs:
+        print(f"[bench] MISMATCH in: {', '.join(diffs)}", file=sys.stderr)
+        return 1
+
+    print(f"\n{'path':12s} {'seconds':>9s} {'api calls':>10s}")
+    for name, t, c in (("serial", t_ref, c_ref), ("concurrent", t_new, c_new)):
+        print(f"{name:12s} {t:9.2f} {sum(c.values()):10d}")
+    print(f"\nspeedup: {t_ref / t_new:.2f}x\n")
+    print(f"{'operation':36s} {'serial':>8s} {'concurrent':>11s}")
+    for op in sorted(set(c_ref) | set(c_new)):
+        print(f"{op:36s} {c_ref[op]:8d} {c_new[op]:11d}")
+
+    print(f"\n{'path':12s} {'seconds':>9s} {'api calls':>10s}")
+    for name, t, c in (("ir_reporter", t_lambda, c_lambda), ("waf_summary", t_waf, c_waf)):
+        print(f"{name:12s} {t:9.2f} {sum(c.values()):10d}")
+    for m in report["emf"]:
+        print(f"  ir_reporter {m['Query']}: {m['Status']}, {m['WallTime']:.2f}s, {m['Polls']} polls, "
+              f"{m['RecordsScanned']:,} records scanned")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -18,10 +18,18 @@ import json
 import os
 import sys
 import time
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 
 import boto3
 
+import galactus_queries
+from galactus_logsinsights_runner import (
+    OUTPUT_FORMATS, InsightsQuery, LogsClients, QueryStats, add_cache_args, add_stats_args, aligned_window,
+    cache_from_args, open_row_writer, parse_target, report_query_stats, rows_to_dicts, run_fanout, run_sharded,
+    stream_queries, target_label, window,
+)
+from sub_implementation import cmd_collect_evidence
+
 try:
     import requests  # used only for cf-probe / cloak-test
 except Exception:
@@ -89,32 +97,73 @@ def cmd_triage(args):
 # ---------------------------
 
 def cmd_insights(args):
-    logs = boto3.client("logs", region_name=args.region) if args.region else boto3.client("logs")
-
-    end = epoch(utc_now())
-    start = epoch(utc_now() - timedelta(minutes=args.minutes))
-
-    qid = logs.start_query(
-        logGroupName=args.log_group,
-        startTime=start,
-        endTime=end,
-        queryString=args.query,
-        limit=args.limit
-    )["queryId"]
-
-    # poll
-    for _ in range(args.poll_seconds):
-        r = logs.get_query_results(queryId=qid)
-        status = r.get("status")
-        if status == "Complete":
-            print(f"\n[GALACTUS] Logs Insights results ({args.log_group})\nQuery:\n{args.query}\n")
-            safe_print_kv_list(r.get("results", []))
+    if args.named:
+        try:
+            args.query = galactus_queries.render(args.named, galactus_queries.parse_params(args.param))
+        except ValueError as e:
+            die(str(e))
+    elif args.param:
+        die("--param only applies to --named queries")
+
+    targets = [parse_target(t, args.region) for t in args.log_group]
+    cache = cache_from_args(args)
+    start, end = aligned_window(args.minutes) if cache else window(args.minutes)
+    fmt = args.format or ("table" if len(targets) > 1 else "json")
+    labels = ", ".join(target_label(r, g) for r, g in targets)
+
+    # Keep stdout machine-readable for ndjson/csv and when rows go to a file.
+    banner = sys.stdout if fmt in ("json", "table") and not args.out else sys.stderr
+    print(f"\n[GALACTUS] Logs Insights results ({labels})\nQuery:\n{args.query}\n", file=banner)
+
+    writer = open_row_writer(fmt, args.out)
+    try:
+        if len(targets) > 1:
+            try:
+                rows, batch = run_fanout(LogsClients(args.region), targets, args.query, start, end,
+                                         shards=args.shards, limit=args.limit, timeout=args.poll_seconds,
+                                         cache=cache)
+            except (ValueError, RuntimeError, TimeoutError) as e:
+                die(str(e))
+            writer.write_all(rows)
+            print(f"[GALACTUS] {len(rows)} rows from {len(targets)} log groups ({len(batch)} queries)",
+                  file=sys.stderr)
+            return
+
+        region, log_group = targets[0]
+        logs = boto3.client("logs", region_name=region) if region else boto3.client("logs")
+
+        if args.shards > 1 or cache:
+            # Shard results can only be merged once every shard is in, so nothing streams here.
+            # With a cache the window's whole minutes are served from / stored in it and only the
+            # open tail up to now is queried fresh (see window_queries).
+            try:
+                rows, batch = run_sharded(logs, "insights", log_group, args.query, start, end,
+                                          shards=args.shards, limit=args.limit, timeout=args.poll_seconds,
+                                          cache=cache, region=region)
+            except (ValueError, RuntimeError, TimeoutError) as e:
+                die(str(e))
+            writer.write_all(rows)
+            cached = sum(1 for q in batch if q.cached)
+            print(f"[GALACTUS] merged {len(batch)} shards ({cached} from cache)", file=sys.stderr)
             return
-        if status in ("Failed", "Cancelled", "Timeout"):
-            die(f"Logs Insights query ended: {status}")
-        time.sleep(1)
 
-    die("Logs Insights query timed out")
+        q = InsightsQuery("insights", log_group, args.query, start, end, limit=args.limit, region=region)
+        # Rows are written as they arrive; stats rows and sorted/limited results only once the query completes.
+        for _, rows in stream_queries(logs, [q], timeout=args.poll_seconds):
+            writer.write_all(rows_to_dicts(rows))
+            if q.status == "Running":
+                st = q.statistics
+                print(f"[GALACTUS] running: {st.get('recordsScanned', 0):,.0f} records scanned "
+                      f"({q.scan_rate:,.0f}/s), {st.get('recordsMatched', 0):,.0f} matched", file=sys.stderr)
+
+        if q.status == "Timeout":
+            die("Logs Insights query timed out")
+        if not q.ok:
+            die(f"Logs Insights query ended: {q.status}")
+    finally:
+        writer.close()
+        if cache:
+            cache.close()
 
 
 # ---------------------------
@@ -327,21 +376,68 @@ def cmd_bedrock_report(args):
         "messages": [{"role": "user", "content": [{"type": "text", "text": user}]}],
     }
 
-    resp = br.invoke_model(
+    if not args.stream:
+        resp = br.invoke_model(
+            modelId=args.model_id,
+            contentType="application/json",
+            accept="application/json",
+            body=json.dumps(body),
+        )
+        payload = json.loads(resp["body"].read())
+        text = "\n".join([p.get("text", "") for p in payload.get("content", []) if p.get("type") == "text"])
+
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text)
+            print(f"[MALGUS] Wrote report: {args.out}")
+        else:
+            print(text)
+        return
+
+    # Streamed: text is printed (and appended to --out, flushed) as the model produces it,
+    # so the first sections are readable long before the whole report is done.
+    resp = br.invoke_model_with_response_stream(
         modelId=args.model_id,
         contentType="application/json",
         accept="application/json",
         body=json.dumps(body),
     )
-    payload = json.loads(resp["body"].read())
-    text = "\n".join([p.get("text", "") for p in payload.get("content", []) if p.get("type") == "text"])
-
+    sinks = [sys.stdout] if not args.out else [sys.stderr, open(args.out, "w", encoding="utf-8")]
+    error = None
+    try:
+        for delta in iter_stream_text(resp["body"]):
+            for f in sinks:
+                f.write(delta)
+                f.flush()
+    except Exception as e:  # error events arrive mid-stream (botocore raises EventStreamError)
+        error = e
+    finally:
+        for f in sinks:
+            f.write("\n")
+            if f not in (sys.stdout, sys.stderr):
+                f.close()
+    if error:
+        die(f"Bedrock stream failed: {error}" + (f" (partial report kept in {args.out})" if args.out else ""), code=1)
     if args.out:
-        with open(args.out, "w", encoding="utf-8") as f:
-            f.write(text)
         print(f"[MALGUS] Wrote report: {args.out}")
-    else:
-        print(text)
+
+
+def iter_stream_text(events):
+    """
+    Text deltas from an invoke_model_with_response_stream body (Anthropic messages events);
+    raises RuntimeError on a stream error event or a chunk of any other shape, rather than
+    silently producing an empty report.
+    """
+    for event in events:
+        if "chunk" not in event:
+            name = next(iter(event), "unknown")  # modelStreamErrorException, throttlingException, ...
+            raise RuntimeError(f"{name}: {(event.get(name) or {}).get('message', '')}")
+        data = json.loads(event["chunk"]["bytes"])
+        if data.get("type") == "content_block_delta":
+            yield data.get("delta", {}).get("text", "")
+        elif data.get("type") not in ("message_start", "content_block_start", "content_block_stop",
+                                      "message_delta", "message_stop", "ping"):
+            raise RuntimeError(f"unsupported stream chunk (not an Anthropic messages event): {sorted(data)}")
 
 
 # ---------------------------
@@ -399,14 +495,50 @@ def build_parser():
 
     # insights
     i = sub.add_parser("insights", help="Run a CloudWatch Logs Insights query")
-    i.add_argument("--log-group", required=True)
-    i.add_argument("--query", required=True)
+    i.add_argument("--log-group", required=True, action="append",
+                   help="Log group, or REGION:LOG_GROUP to query another region. Repeat to query several "
+                        "concurrently; results are merged into one table with a source column")
+    iq = i.add_mutually_exclusive_group(required=True)
+    iq.add_argument("--query")
+    iq.add_argument("--named", choices=sorted(galactus_queries.QUERIES),
+                    help="Run a query from galactus_queries.py (list them: python galactus_queries.py)")
+    i.add_argument("--param", action="append", default=[], metavar="NAME=VALUE",
+                   help="Parameter for --named, e.g. --param limit=5 (repeatable)")
     i.add_argument("--minutes", type=int, default=15)
     i.add_argument("--limit", type=int, default=25)
-    i.add_argument("--poll-seconds", type=int, default=30)
+    i.add_argument("--poll-seconds", type=int, default=30, help="Give up (and stop the query) after this many seconds")
+    i.add_argument("--shards", type=int, default=1,
+                   help="Split the window into N sub-ranges queried in parallel and merged locally "
+                        "(beats the 10k-row cap; stats must use count/sum/min/max)")
+    add_cache_args(i)
+    add_stats_args(i)
+    i.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                   help="json (pretty, one object per row; default for one log group), ndjson, csv, "
+                        "or table (default for several). ndjson/csv stream row by row")
+    i.add_argument("--out", default=None, help="Write rows to this file instead of stdout")
     i.add_argument("--region", default=None)
     i.set_defaults(func=cmd_insights)
 
+    # collect-evidence
+    e = sub.add_parser("collect-evidence", help="Collect standardized IR evidence bundle")
+    e.add_argument("--incident-id", default=None)
+    e.add_argument("--minutes", type=int, default=15)
+    e.add_argument("--app-log-group", default=None)
+    e.add_argument("--waf-log-group", default=None)
+    e.add_argument("--ssm-path", default="/lab/db/")
+    e.add_argument("--secret-id", required=True)
+    e.add_argument("--out", default="evidence.json")
+    e.add_argument("--region", default=None)
+    add_cache_args(e)
+    add_stats_args(e)
+    e.add_argument("--workers", type=int, default=8, help="Evidence sources fetched concurrently (1 = one at a time)")
+    e.add_argument("--task-timeout", type=float, default=60.0,
+                   help="Per-source budget in seconds, retries included (default: 60)")
+    e.add_argument("--retries", type=int, default=1, help="Retries per failed source (Logs Insights queries excluded)")
+    e.add_argument("--format", choices=["json", "ndjson"], default="json",
+                   help="json: one document (default); ndjson: one line per row, appended as each source completes")
+    e.set_defaults(func=cmd_collect_evidence)
+
     # cf-probe
     c = sub.add_parser("cf-probe", help="Probe CloudFront caching headers (x-cache, age, etc.)")
     c.add_argument("url")
@@ -437,6 +569,8 @@ def build_parser():
     b.add_argument("--temperature", type=float, default=0.2)
     b.add_argument("--region", default=None)
     b.add_argument("--out", default=None)
+    b.add_argument("--no-stream", dest="stream", action="store_false",
+                   help="Wait for the whole report (invoke_model) instead of printing it as it streams")
     b.set_defaults(func=cmd_bedrock_report)
 
     # invalidate
@@ -452,7 +586,11 @@ def build_parser():
 def main():
     parser = build_parser()
     args = parser.parse_args()
-    args.func(args)
+    stats = QueryStats(args.cmd).install()
+    try:
+        args.func(args)
+    finally:
+        report_query_stats(stats, args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -18,17 +18,52 @@
 """
 
 import argparse
+import base64
+import csv
 import gzip
+import hashlib
 import io
+import json
+import math
+import mmap
 import os
+import re
+import shutil
+import sqlite3
 import subprocess
 import sys
 import tempfile
+import time
+from array import array
 from collections import Counter
-from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+try:
+    import boto3  # in-process S3 streaming (default); aws-cli path needs only the CLI
+    from botocore.config import Config
+    from botocore.exceptions import BotoCoreError, ClientError
+    AWS_ERRORS = (BotoCoreError, ClientError)
+except Exception:
+    boto3 = None
+    AWS_ERRORS = ()
+
+try:
+    import numpy as np  # optional: vectorized queries over the columnar cache
+except Exception:
+    np = None
 
 TARGETS = {"Hit", "Miss", "RefreshHit"}
 
+# Standard log object name: DISTID.YYYY-MM-DD-HH.unique-id.gz
+LOG_KEY_RE = re.compile(r"(?P<dist>[A-Z0-9]+)\.(?P<hour>\d{4}-\d{2}-\d{2}-\d{2})\.")
+
+# A log source is either a local path (.gz or plain) or an already-open text stream.
+LogSource = Union[str, io.TextIOBase]
+
 def run(cmd: List[str]) -> str:
     """Run a command and return stdout; raise with clear error if it fails."""
     try:
@@ -68,6 +103,31 @@ def pick_latest(keys: List[str], n: int) -> List[str]:
         return []
     return keys[-n:] if len(keys) > n else keys
 
+def parse_time_arg(value: str, now: Optional[datetime] = None) -> datetime:
+    """
+    Accept ISO-8601 ('2026-02-09T07:00', '2026-02-09 07:00Z'; naive = UTC) or a relative
+    age such as '90m', '6h', '2d' (meaning that long before now).
+    """
+    now = now or datetime.now(timezone.utc)
+    m = re.fullmatch(r"(\d+)([mhd])", value.strip())
+    if m:
+        unit = {"m": "minutes", "h": "hours", "d": "days"}[m.group(2)]
+        return now - timedelta(**{unit: int(m.group(1))})
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+def hour_prefixes(prefix: str, distribution_id: str, since: datetime, until: datetime) -> List[str]:
+    """
+    CloudFront standard log keys are '<prefix><DISTID>.YYYY-MM-DD-HH.<unique>.gz', so every
+    hour in [since, until] maps to one exact listing prefix.
+    """
+    hour = since.replace(minute=0, second=0, microsecond=0)
+    out = []
+    while hour <= until:
+        out.append(f"{prefix}{distribution_id}.{hour:%Y-%m-%d-%H}.")
+        hour += timedelta(hours=1)
+    return out
+
 def aws_s3_cp(bucket: str, key: str, dest_path: str) -> None:
     run(["aws", "s3", "cp", f"s3://{bucket}/{key}", dest_path])
 
@@ -76,54 +136,195 @@ def open_maybe_gzip(path: str) -> io.TextIOBase:
         return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8", errors="replace")
     return open(path, "r", encoding="utf-8", errors="replace")
 
-def count_standard_log_files(file_paths: List[str]) -> Dict[str, int]:
+# ---------------------------
+# In-process S3 access (boto3)
+# ---------------------------
+
+def require_boto3() -> None:
+    if boto3 is None:
+        raise RuntimeError("boto3 is required for streaming mode. Install: pip install boto3 (or pass --use-aws-cli)")
+
+def s3_client(region: Optional[str] = None, max_pool_connections: int = 10):
+    """One client is shared by all fetch threads; size its HTTP pool to match --workers."""
+    require_boto3()
+    config = Config(max_pool_connections=max(10, max_pool_connections))
+    return boto3.client("s3", region_name=region, config=config) if region else boto3.client("s3", config=config)
+
+def s3_list_objects(s3, bucket: str, prefix: str) -> List[Dict[str, str]]:
+    """
+    List {"Key", "ETag"} for every object under prefix via the list_objects_v2 paginator
+    (keys come back in lexicographic order, 1000 per page).
+    """
+    objects = []
+    paginator = s3.get_paginator("list_objects_v2")
+    kwargs = {"Bucket": bucket}
+    if prefix:
+        kwargs["Prefix"] = prefix
+    for page in paginator.paginate(**kwargs):
+        for obj in page.get("Contents", []):
+            key = obj["Key"]
+            if key.endswith("/"):
+                continue
+            objects.append({"Key": key, "ETag": obj.get("ETag", "").strip('"')})
+    return objects
+
+def sniff_distribution_id(s3, bucket: str, prefix: str) -> Optional[str]:
+    """Read the DISTID from the first key under prefix (one MaxKeys=1 call, not a full listing)."""
+    resp = s3.list_objects_v2(Bucket=bucket, Prefix=prefix, MaxKeys=1)
+    for obj in resp.get("Contents", []):
+        m = LOG_KEY_RE.match(obj["Key"][len(prefix):])
+        if m:
+            return m.group("dist")
+    return None
+
+def s3_list_time_range(s3, bucket: str, prefix: str, distribution_id: str,
+                       since: datetime, until: datetime, workers: int = 8) -> List[Dict[str, str]]:
+    """List only the hour prefixes covering [since, until], one paginated call per hour, in parallel."""
+    prefixes = hour_prefixes(prefix, distribution_id, since, until)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        per_hour = list(pool.map(lambda p: s3_list_objects(s3, bucket, p), prefixes))
+    # Hour prefixes are chronological and each listing is sorted, so the concatenation is too.
+    return [obj for objs in per_hour for obj in objs]
+
+def s3_list_keys(s3, bucket: str, prefix: str) -> List[str]:
+    """Same contract as aws_s3_ls_recursive, without the subprocess."""
+    return [o["Key"] for o in s3_list_objects(s3, bucket, prefix)]
+
+def open_s3_log(s3, bucket: str, key: str) -> io.TextIOBase:
+    """
+    Stream an object straight out of get_object. The body is read (and gunzipped)
+    incrementally as lines are consumed: nothing is written to disk and the whole
+    object is never held in memory.
+    """
+    body = s3.get_object(Bucket=bucket, Key=key)["Body"]
+    raw = gzip.GzipFile(fileobj=body, mode="rb") if key.endswith(".gz") else body
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+
+def iter_s3_logs(s3, bucket: str, keys: Iterable[str]) -> Iterable[io.TextIOBase]:
+    """Lazily open each key so only one response body is in flight at a time."""
+    for key in keys:
+        yield open_s3_log(s3, bucket, key)
+
+def open_source(src: LogSource) -> io.TextIOBase:
+    return open_maybe_gzip(src) if isinstance(src, str) else src
+
+# ---------------------------
+# Column resolution (compiled once per '#Fields:' header)
+# ---------------------------
+
+OUTCOME_FIELDS = ("x-edge-result-type", "x-edge-response-result-type")
+SKETCH_FIELDS = ("c-ip", "cs-uri-stem")
+
+def resolve_columns(fields_line: str, names: Tuple[str, ...]) -> Optional[Tuple[Callable, int, bool]]:
+    """
+    Compile a '#Fields:' header into a row extractor for just `names`.
+
+    Returns (getter, maxsplit, has_missing) or None if the header lists no fields:
+      - getter:   operator.itemgetter over the split parts, always returning a tuple
+      - maxsplit: split('\t', maxsplit) stops right after the last wanted column, so the
+                  ~30 columns we never read are left as one unsplit tail
+      - has_missing: some names are not in this header; they read index -1, which
+                  split_row sets to "" (matches the old get_field behaviour)
+    """
+    _, fields_str = fields_line.split(":", 1)
+    fields = fields_str.strip().split()
+    if not fields:
+        return None
+    index = {name: idx for idx, name in enumerate(fields)}
+    idxs = [index.get(n, -1) for n in names]
+    present = [i for i in idxs if i >= 0]
+    maxsplit = (max(present) + 1) if present else 0
+    has_missing = len(present) < len(idxs)
+    getter = itemgetter(*idxs) if len(idxs) > 1 else (lambda parts, _i=idxs[0]: (parts[_i],))
+    return getter, maxsplit, has_missing
+
+def split_row(line: str, maxsplit: int, has_missing: bool) -> List[str]:
+    parts = line.split("\t", maxsplit)
+    if len(parts) <= maxsplit:
+        # Line ended at (or before) the last wanted column: drop the newline, pad short rows.
+        parts[-1] = parts[-1].rstrip("\n")
+        parts.extend([""] * (maxsplit - len(parts) + 1))
+    if has_missing:
+        parts.append("")
+    return parts
+
+def iter_log_rows(f: io.TextIOBase, names: Tuple[str, ...], notes: Counter) -> Iterator[Tuple[str, ...]]:
+    """Yield a tuple of the requested columns per data line; header-less lines are noted and skipped."""
+    compiled = None
+    for line in f:
+        if line.startswith("#"):
+            if line.startswith("#Fields:"):
+                compiled = resolve_columns(line, names)
+            continue
+        if compiled is None:
+            notes["(missing_fields_header)"] += 1
+            continue
+        getter, maxsplit, has_missing = compiled
+        yield getter(split_row(line, maxsplit, has_missing))
+
+def count_outcomes(f: io.TextIOBase, seen: Counter, other: Counter, sketches: Optional["TrafficSketches"] = None) -> None:
+    """
+    Tally raw outcome values (rt or rrt) into `seen`. When the stream has a binary buffer
+    (files, gzip, S3 bodies) lines are split as bytes and never decoded; only the handful
+    of distinct outcome values are decoded afterwards. With `sketches`, c-ip and
+    cs-uri-stem are read from the same split and fed to the bounded-memory sketches.
+    """
+    names = OUTCOME_FIELDS + SKETCH_FIELDS if sketches is not None else OUTCOME_FIELDS
+    raw = getattr(f, "buffer", None)
+    if raw is None:
+        for values in iter_log_rows(f, names, other):
+            seen[values[0] or values[1]] += 1
+            if sketches is not None:
+                sketches.add(values[2], values[3])
+        return
+
+    compiled = None
+    for line in raw:
+        if line[:1] == b"#":
+            if line.startswith(b"#Fields:"):
+                compiled = resolve_columns(line.decode("utf-8", "replace"), names)
+            continue
+        if compiled is None:
+            other["(missing_fields_header)"] += 1
+            continue
+        getter, maxsplit, has_missing = compiled
+        parts = line.split(b"\t", maxsplit)
+        if len(parts) <= maxsplit or has_missing:
+            # Rare: short row / absent column. Take the text path for exact old semantics.
+            parts = split_row(line.decode("utf-8", "replace"), maxsplit, has_missing)
+        values = getter(parts)
+        seen[values[0] or values[1]] += 1
+        if sketches is not None:
+            sketches.add(values[2], values[3])
+
+def count_standard_log_files(sources: Iterable[LogSource], sketches: Optional["TrafficSketches"] = None) -> Dict[str, int]:
     """
     Parse CloudFront standard logs. Uses '#Fields:' header to map columns.
     Counts x-edge-result-type primarily, falls back to x-edge-response-result-type.
+    Each source is a local path or an open text stream (e.g. from open_s3_log).
+    Pass a TrafficSketches to also collect top URIs / clients and distinct client IPs.
     """
-    counts = Counter()
     other = Counter()
+    seen = Counter()
+
+    for src in sources:
+        with open_source(src) as f:
+            count_outcomes(f, seen, other, sketches)
 
-    for path in file_paths:
-        field_index: Optional[Dict[str, int]] = None
-
-        with open_maybe_gzip(path) as f:
-            for line in f:
-                if line.startswith("#Fields:"):
-                    # Example: "#Fields: date time x-edge-location ... x-edge-result-type x-edge-response-result-type ..."
-                    _, fields_str = line.split(":", 1)
-                    fields = fields_str.strip().split()
-                    field_index = {name: idx for idx, name in enumerate(fields)}
-                    continue
-
-                if not line or line.startswith("#"):
-                    continue
-
-                if not field_index:
-                    # If no header was found, skip safely (standard logs almost always include it).
-                    other["(missing_fields_header)"] += 1
-                    continue
-
-                parts = line.rstrip("\n").split("\t")
-
-                def get_field(name: str) -> str:
-                    idx = field_index.get(name)
-                    if idx is None:
-                        return ""
-                    if idx >= len(parts):
-                        return ""
-                    return parts[idx]
-
-                rt = get_field("x-edge-result-type")
-                rrt = get_field("x-edge-response-result-type")
-                outcome = rt or rrt
-
-                if not outcome:
-                    other["(missing_outcome)"] += 1
-                elif outcome in TARGETS:
-                    counts[outcome] += 1
-                else:
-                    other[outcome] += 1
+    return rollup_outcomes(seen, other)
+
+def rollup_outcomes(seen: Dict, other: Counter) -> Dict[str, int]:
+    """Turn raw outcome tallies (+ parsing notes) into the Hit/Miss/RefreshHit/Other:* report dict."""
+    counts = Counter()
+    for outcome, n in seen.items():
+        if isinstance(outcome, bytes):
+            outcome = outcome.decode("utf-8", "replace")
+        if not outcome:
+            other["(missing_outcome)"] += n
+        elif outcome in TARGETS:
+            counts[outcome] += n
+        else:
+            other[outcome] += n
 
     # roll up other outcomes
     for k, v in other.items():
@@ -131,6 +332,1073 @@ def count_standard_log_files(file_paths: List[str]) -> Dict[str, int]:
 
     return dict(counts)
 
+def count_log_stream(f: io.TextIOBase) -> Dict[str, int]:
+    return count_standard_log_files([f])
+
+# ---------------------------
+# Concurrent fetch + parse pipeline
+# ---------------------------
+
+def open_log_blob(key: str, data: bytes) -> io.TextIOBase:
+    raw = gzip.GzipFile(fileobj=io.BytesIO(data), mode="rb") if key.endswith(".gz") else io.BytesIO(data)
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+
+def parse_log_blob(parse_fn: Callable, key: str, data: bytes):
+    """Process-pool entry point: must stay top-level so it pickles."""
+    with open_log_blob(key, data) as f:
+        return parse_fn(f)
+
+def run_pipeline(s3, bucket: str, keys: List[str], parse_fn: Callable = count_log_stream,
+                 workers: int = 8, parse_procs: int = 0) -> Iterator[Tuple[str, object]]:
+    """
+    Fetch objects on a thread pool and parse them with parse_fn (TextIO -> partial result),
+    yielding (key, partial) as each object finishes. Callers merge the partials.
+
+    parse_procs == 0: each fetch thread streams and parses its own object (fine for a handful
+                      of objects; parsing is GIL-bound).
+    parse_procs  > 0: threads download the compressed body and hand the bytes to a process
+                      pool. A thread waits on its parse before taking the next key, so at most
+                      `workers` bodies are held in memory at any time.
+    """
+    procs = ProcessPoolExecutor(max_workers=parse_procs) if parse_procs > 0 else None
+
+    def job(key: str):
+        if procs is None:
+            with open_s3_log(s3, bucket, key) as f:
+                return parse_fn(f)
+        data = s3.get_object(Bucket=bucket, Key=key)["Body"].read()
+        return procs.submit(parse_log_blob, parse_fn, key, data).result()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = {pool.submit(job, k): k for k in keys}
+            for fut in as_completed(futures):
+                yield futures[fut], fut.result()
+    finally:
+        if procs is not None:
+            procs.shutdown(cancel_futures=True)
+
+def merge_partial(total, partial):
+    """Fold one per-object result into the running total (count dicts add; aggregators .merge())."""
+    if total is None:
+        return partial
+    if isinstance(total, dict):
+        merged = Counter(total)
+        merged.update(partial)
+        return dict(merged)
+    total.merge(partial)
+    return total
+
+def analyze_s3_keys(s3, bucket: str, keys: List[str], workers: int = 8, parse_procs: int = 0,
+                    parse_fn: Callable = count_log_stream):
+    total = None
+    for _, partial in run_pipeline(s3, bucket, keys, parse_fn, workers, parse_procs):
+        total = merge_partial(total, partial)
+    return total if total is not None else parse_fn(io.StringIO(""))
+
+# ---------------------------
+# Group-by aggregation (edge / URI / status / result / minute)
+# ---------------------------
+
+# Dimension name -> log columns it is derived from.
+GROUP_DIMENSIONS = {
+    "edge": ("x-edge-location",),
+    "uri": ("cs-uri-stem",),
+    "status": ("sc-status",),
+    "result": ("x-edge-result-type",),
+    "response_result": ("x-edge-response-result-type",),
+    "minute": ("date", "time"),
+}
+METRIC_FIELDS = ("time-taken", "sc-bytes")
+OVERFLOW_GROUP = "(other)"
+
+class LogHistogram:
+    """
+    Sparse log-bucketed histogram: bucket i holds values in (growth**(i-1), growth**i].
+    Relative error of any percentile is bounded by `growth` (5% by default) and the
+    bucket count is logarithmic in the value range, so per-group memory stays tiny
+    no matter how many requests land in it. Histograms with the same growth merge by
+    adding bucket counts.
+    """
+
+    __slots__ = ("growth", "_log_growth", "buckets", "zeros", "count", "min", "max")
+
+    def __init__(self, growth: float = 1.05):
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        self.buckets: Dict[int, int] = {}
+        self.zeros = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float, n: int = 1) -> None:
+        self.count += n
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zeros += n
+            return
+        idx = math.ceil(math.log(value) / self._log_growth)
+        self.buckets[idx] = self.buckets.get(idx, 0) + n
+
+    def merge(self, other: "LogHistogram") -> None:
+        if other.growth != self.growth:
+            raise ValueError("Cannot merge histograms with different growth factors")
+        for idx, n in other.buckets.items():
+            self.buckets[idx] = self.buckets.get(idx, 0) + n
+        self.zeros += other.zeros
+        self.count += other.count
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        if other.max is not None and (self.max is None or other.max > self.max):
+            self.max = other.max
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Upper bound of the bucket holding the p-th percentile, clamped to the observed max."""
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(self.count * p / 100.0))
+        seen = self.zeros
+        if seen >= rank:
+            return 0.0
+        for idx in sorted(self.buckets):
+            seen += self.buckets[idx]
+            if seen >= rank:
+                return min(self.growth ** idx, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "growth": self.growth,
+            "buckets": {str(i): n for i, n in self.buckets.items()},
+            "zeros": self.zeros,
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "LogHistogram":
+        h = cls(d["growth"])
+        h.buckets = {int(i): n for i, n in d["buckets"].items()}
+        h.zeros, h.count, h.min, h.max = d["zeros"], d["count"], d["min"], d["max"]
+        return h
+
+    def __getstate__(self):
+        return {k: getattr(self, k) for k in self.__slots__}
+
+    def __setstate__(self, state):
+        for k, v in state.items():
+            setattr(self, k, v)
+
+def parse_dimensions(spec: str) -> Tuple[str, ...]:
+    dims = tuple(d.strip() for d in spec.split(",") if d.strip())
+    unknown = [d for d in dims if d not in GROUP_DIMENSIONS]
+    if not dims or unknown:
+        raise ValueError(f"--group-by expects a comma list of {', '.join(GROUP_DIMENSIONS)} (got: {spec!r})")
+    return dims
+
+def _to_number(value: str, cast: Callable) -> Optional[float]:
+    if not value or value == "-":
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        return None
+
+class GroupByAggregator:
+    """
+    Group requests by `dims` and keep, per group: request count, sum of time-taken and
+    sc-bytes, and a LogHistogram of each for percentiles. Raw values are never stored.
+    At most `max_groups` distinct groups are tracked; once full, new keys are folded into
+    a single "(other)" group so memory stays bounded on high-cardinality URIs.
+    """
+
+    def __init__(self, dims: Tuple[str, ...], max_groups: int = 10000, growth: float = 1.05):
+        self.dims = dims
+        self.max_groups = max_groups
+        self.growth = growth
+        self.groups: Dict[Tuple[str, ...], list] = {}
+        self.notes = Counter()
+
+        names: List[str] = []
+        for d in dims:
+            for col in GROUP_DIMENSIONS[d]:
+                if col not in names:
+                    names.append(col)
+        for col in METRIC_FIELDS:
+            if col not in names:
+                names.append(col)
+        self.columns = tuple(names)
+
+    def _slot(self, key: Tuple[str, ...]) -> list:
+        slot = self.groups.get(key)
+        if slot is None:
+            if len(self.groups) >= self.max_groups:
+                key = (OVERFLOW_GROUP,) * len(self.dims)
+                slot = self.groups.get(key)
+            if slot is None:
+                slot = [0, 0.0, 0, LogHistogram(self.growth), LogHistogram(self.growth)]
+                self.groups[key] = slot
+        return slot
+
+    def key_for(self, row: Dict[str, str]) -> Tuple[str, ...]:
+        key = []
+        for d in self.dims:
+            if d == "minute":
+                key.append(f"{row['date']}T{row['time'][:5]}:00Z" if row["date"] else "")
+            else:
+                key.append(row[GROUP_DIMENSIONS[d][0]])
+        return tuple(key)
+
+    def consume(self, f: io.TextIOBase) -> None:
+        cols = self.columns
+        for values in iter_log_rows(f, cols, self.notes):
+            row = dict(zip(cols, values))
+            self.add(self.key_for(row), row["time-taken"], row["sc-bytes"])
+
+    def add(self, key: Tuple[str, ...], time_taken: str, sc_bytes: str) -> None:
+        self.add_values(key, _to_number(time_taken, float), _to_number(sc_bytes, int))
+
+    def add_values(self, key: Tuple[str, ...], t: Optional[float], b: Optional[int]) -> None:
+        slot = self._slot(key)
+        slot[0] += 1
+        if t is not None:
+            slot[1] += t
+            slot[3].add(t)
+        if b is not None:
+            slot[2] += b
+            slot[4].add(b)
+
+    def merge(self, other: "GroupByAggregator") -> None:
+        for key, (n, t_sum, b_sum, t_hist, b_hist) in other.groups.items():
+            slot = self._slot(key)
+            slot[0] += n
+            slot[1] += t_sum
+            slot[2] += b_sum
+            slot[3].merge(t_hist)
+            slot[4].merge(b_hist)
+        self.notes.update(other.notes)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "dims": list(self.dims),
+            "max_groups": self.max_groups,
+            "growth": self.growth,
+            "groups": [
+                [list(key), n, t_sum, b_sum, t_hist.to_dict(), b_hist.to_dict()]
+                for key, (n, t_sum, b_sum, t_hist, b_hist) in self.groups.items()
+            ],
+            "notes": dict(self.notes),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "GroupByAggregator":
+        agg = cls(tuple(d["dims"]), d["max_groups"], d.get("growth", 1.05))
+        for key, n, t_sum, b_sum, t_hist, b_hist in d["groups"]:
+            agg.groups[tuple(key)] = [n, t_sum, b_sum, LogHistogram.from_dict(t_hist), LogHistogram.from_dict(b_hist)]
+        agg.notes.update(d["notes"])
+        return agg
+
+    def rows(self, percentiles: Tuple[float, ...] = (50, 90, 99)) -> List[Dict[str, object]]:
+        """Flat, dashboard-ready rows (one per group), busiest groups first."""
+        out = []
+        for key, (n, t_sum, b_sum, t_hist, b_hist) in self.groups.items():
+            row: Dict[str, object] = dict(zip(self.dims, key))
+            row["requests"] = n
+            row["time_taken_sum"] = round(t_sum, 3)
+            for p in percentiles:
+                v = t_hist.percentile(p)
+                row[f"time_taken_p{p:g}"] = None if v is None else round(v, 3)
+            row["sc_bytes_sum"] = b_sum
+            for p in percentiles:
+                v = b_hist.percentile(p)
+                row[f"sc_bytes_p{p:g}"] = None if v is None else int(round(v))
+            out.append(row)
+        out.sort(key=lambda r: (-r["requests"], tuple(str(r[d]) for d in self.dims)))
+        return out
+
+def aggregate_log_stream(dims: Tuple[str, ...], max_groups: int, f: io.TextIOBase,
+                         growth: float = 1.05) -> GroupByAggregator:
+    agg = GroupByAggregator(dims, max_groups, growth)
+    agg.consume(f)
+    return agg
+
+# ---------------------------
+# Latency distribution (time-taken by cache outcome and edge)
+# ---------------------------
+
+LATENCY_DIMS = ("response_result", "edge")
+LATENCY_PERCENTILES = (50, 90, 99, 99.9)
+# 1% relative error per bucket (HDR-style ~2 significant digits); 1 ms .. 60 s spans <1,200 buckets.
+LATENCY_GROWTH = 1.01
+ALL_EDGES = "(all)"
+
+def latency_rows(agg: GroupByAggregator) -> List[Dict[str, object]]:
+    """
+    One row per (outcome, edge) plus an '(all)' edge rollup per outcome, with time-taken
+    percentiles in milliseconds. The rollups are merged histograms, not averaged percentiles.
+    """
+    per_outcome: Dict[str, LogHistogram] = {}
+    rows = []
+
+    def row(outcome: str, edge: str, h: LogHistogram) -> Dict[str, object]:
+        r: Dict[str, object] = {"outcome": outcome or "(none)", "edge": edge, "requests": h.count}
+        for p in LATENCY_PERCENTILES:
+            v = h.percentile(p)
+            r[f"p{p:g}_ms".replace(".", "_")] = None if v is None else round(v * 1000, 1)
+        r["max_ms"] = None if h.max is None else round(h.max * 1000, 1)
+        return r
+
+    for (outcome, edge), slot in agg.groups.items():
+        t_hist = slot[3]
+        if outcome not in per_outcome:
+            per_outcome[outcome] = LogHistogram(t_hist.growth)
+        per_outcome[outcome].merge(t_hist)
+        rows.append(row(outcome, edge, t_hist))
+    rows.extend(row(outcome, ALL_EDGES, h) for outcome, h in per_outcome.items())
+    rows.sort(key=lambda r: (str(r["outcome"]), r["edge"] != ALL_EDGES, -r["requests"], r["edge"]))
+    return rows
+
+def write_rows(rows: List[Dict[str, object]], fmt: str, out: io.TextIOBase, top: int = 0) -> None:
+    """Write aggregate rows as an aligned table, a JSON array, or CSV."""
+    if fmt == "json":
+        json.dump(rows, out, indent=2)
+        out.write("\n")
+        return
+    if not rows:
+        out.write("(no rows)\n")
+        return
+    columns = list(rows[0].keys())
+    if fmt == "csv":
+        w = csv.DictWriter(out, fieldnames=columns)
+        w.writeheader()
+        w.writerows(rows)
+        return
+    shown = rows[:top] if top > 0 else rows
+    cells = [[("" if r[c] is None else str(r[c])) for c in columns] for r in shown]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+    out.write("  ".join(c.ljust(widths[i]) for i, c in enumerate(columns)).rstrip() + "\n")
+    out.write("  ".join("-" * w for w in widths) + "\n")
+    for row in cells:
+        out.write("  ".join(v.ljust(widths[i]) for i, v in enumerate(row)).rstrip() + "\n")
+    if len(shown) < len(rows):
+        out.write(f"... {len(rows) - len(shown)} more groups (use --top 0 or --format csv/json for all)\n")
+
+# ---------------------------
+# Bounded-memory sketches (top-K, distinct count)
+# ---------------------------
+
+def _as_bytes(value) -> bytes:
+    return value if isinstance(value, bytes) else value.encode("utf-8")
+
+def _as_text(value) -> str:
+    return value.decode("utf-8", "replace") if isinstance(value, bytes) else value
+
+class SpaceSaving:
+    """
+    Heavy-hitter counter (Space-Saving with batched eviction). Tracks at most 2*capacity
+    items; when full, it keeps the top `capacity` and remembers the largest evicted count
+    as `floor`. A newly seen item starts at floor+1 with error=floor, so every reported
+    count is an overestimate by at most its error. Any item whose true count is above
+    floor is guaranteed to be present.
+
+    Two sketches merge by adding counts (an item missing from one side is charged that
+    side's floor), which keeps the same guarantee across files and processes.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[bytes, int] = {}
+        self.errors: Dict[bytes, int] = {}
+        self.floor = 0
+
+    def add(self, item: bytes, n: int = 1) -> None:
+        counts = self.counts
+        c = counts.get(item)
+        if c is not None:
+            counts[item] = c + n
+            return
+        if len(counts) >= 2 * self.capacity:
+            self._prune()
+        counts[item] = self.floor + n
+        if self.floor:
+            self.errors[item] = self.floor
+
+    def _prune(self) -> None:
+        ranked = sorted(self.counts.items(), key=lambda kv: -kv[1])
+        keep, drop = ranked[:self.capacity], ranked[self.capacity:]
+        if drop:
+            self.floor = max(self.floor, drop[0][1])
+        self.counts = dict(keep)
+        self.errors = {k: e for k, e in self.errors.items() if k in self.counts}
+
+    def merge(self, other: "SpaceSaving") -> None:
+        merged_counts: Dict[bytes, int] = {}
+        merged_errors: Dict[bytes, int] = {}
+        for k in set(self.counts) | set(other.counts):
+            c1 = self.counts.get(k)
+            c2 = other.counts.get(k)
+            e1 = self.errors.get(k, 0) if c1 is not None else self.floor
+            e2 = other.errors.get(k, 0) if c2 is not None else other.floor
+            merged_counts[k] = (self.floor if c1 is None else c1) + (other.floor if c2 is None else c2)
+            if e1 + e2:
+                merged_errors[k] = e1 + e2
+        self.counts, self.errors = merged_counts, merged_errors
+        self.floor += other.floor
+        if len(self.counts) > 2 * self.capacity:
+            self._prune()
+
+    def top(self, k: int) -> List[Tuple[str, int, int]]:
+        """[(item, estimated count, max overestimate)] for the k largest counts."""
+        ranked = sorted(self.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:k]
+        return [(_as_text(item), c, self.errors.get(item, 0)) for item, c in ranked]
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "capacity": self.capacity,
+            "floor": self.floor,
+            "counts": {_as_text(k): c for k, c in self.counts.items()},
+            "errors": {_as_text(k): e for k, e in self.errors.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "SpaceSaving":
+        ss = cls(d["capacity"])
+        ss.floor = d["floor"]
+        ss.counts = {_as_bytes(k): c for k, c in d["counts"].items()}
+        ss.errors = {_as_bytes(k): e for k, e in d["errors"].items()}
+        return ss
+
+class HyperLogLog:
+    """
+    Distinct-count estimator with 2**p one-byte registers (16 KB at p=14, ~0.8% std error).
+    Hashing uses blake2b rather than hash() so registers agree across worker processes;
+    merge is a register-wise max.
+
+    A sketch starts sparse ({register: rank}) and only becomes the dense array once more
+    than m/4 registers are set. One log object sees a few hundred client IPs, so its partial
+    pickles back from a parse process, sits in the manifest and merges as a few hundred
+    entries instead of 16 KB. Dense merges use numpy when it is installed.
+    """
+
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be 4..16")  # sparse form packs 2-byte indexes
+        self.p = p
+        self.m = 1 << p
+        self.sparse: Optional[Dict[int, int]] = {}
+        self.registers: Optional[bytearray] = None
+
+    def add(self, item: bytes) -> None:
+        x = int.from_bytes(hashlib.blake2b(item, digest_size=8).digest(), "big")
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if self.registers is not None:
+            if rank > self.registers[idx]:
+                self.registers[idx] = rank
+        elif rank > self.sparse.get(idx, 0):
+            self.sparse[idx] = rank
+            if len(self.sparse) > self.m // 4:
+                self._densify()
+
+    def _densify(self) -> None:
+        registers = bytearray(self.m)
+        for idx, rank in self.sparse.items():
+            registers[idx] = rank
+        self.registers, self.sparse = registers, None
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError("Cannot merge HyperLogLogs with different precision")
+        if other.registers is not None:
+            if self.registers is None:
+                entries, self.registers, self.sparse = self.sparse, bytearray(other.registers), None
+                self._merge_entries(entries)
+            elif np is not None:
+                a, b = np.frombuffer(self.registers, np.uint8), np.frombuffer(other.registers, np.uint8)
+                self.registers = bytearray(np.maximum(a, b).tobytes())
+            else:
+                self.registers = bytearray(map(max, self.registers, other.registers))
+        else:
+            self._merge_entries(other.sparse)
+
+    def _merge_entries(self, entries: Dict[int, int]) -> None:
+        if self.registers is not None:
+            registers = self.registers
+            for idx, rank in entries.items():
+                if rank > registers[idx]:
+                    registers[idx] = rank
+            return
+        sparse = self.sparse
+        for idx, rank in entries.items():
+            if rank > sparse.get(idx, 0):
+                sparse[idx] = rank
+        if len(sparse) > self.m // 4:
+            self._densify()
+
+    def estimate(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        if self.registers is not None:
+            zeros = self.registers.count(0)
+            total = sum(2.0 ** -r for r in self.registers)
+        else:
+            zeros = m - len(self.sparse)
+            total = zeros + sum(2.0 ** -r for r in self.sparse.values())
+        est = alpha * m * m / total
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(est))
+
+    def to_dict(self) -> Dict[str, object]:
+        if self.registers is not None:
+            return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+        packed = bytes(b for idx, rank in sorted(self.sparse.items()) for b in (idx >> 8, idx & 0xFF, rank))
+        return {"p": self.p, "sparse": base64.b64encode(packed).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "HyperLogLog":
+        h = cls(d["p"])
+        if "registers" in d:
+            h.registers, h.sparse = bytearray(base64.b64decode(d["registers"])), None
+        else:
+            packed = base64.b64decode(d["sparse"])
+            h.sparse = {(packed[i] << 8) | packed[i + 1]: packed[i + 2] for i in range(0, len(packed), 3)}
+        return h
+
+class TrafficSketches:
+    """Hit/Miss counts plus top URIs, top client IPs and distinct client IPs, all mergeable."""
+
+    def __init__(self, capacity: int = 1000):
+        self.counts: Dict[str, int] = {}
+        self.uris = SpaceSaving(capacity)
+        self.clients = SpaceSaving(capacity)
+        self.ips = HyperLogLog()
+
+    def add(self, client_ip, uri) -> None:
+        if not isinstance(client_ip, bytes):  # text path / short-row fallback
+            client_ip, uri = _as_bytes(client_ip), _as_bytes(uri)
+        if client_ip:
+            self.clients.add(client_ip)
+            self.ips.add(client_ip)
+        if uri:
+            self.uris.add(uri)
+
+    def merge(self, other: "TrafficSketches") -> None:
+        self.counts = merge_partial(self.counts, other.counts)
+        self.uris.merge(other.uris)
+        self.clients.merge(other.clients)
+        self.ips.merge(other.ips)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "counts": self.counts,
+            "uris": self.uris.to_dict(),
+            "clients": self.clients.to_dict(),
+            "ips": self.ips.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, object]) -> "TrafficSketches":
+        sk = cls()
+        sk.counts = d["counts"]
+        sk.uris = SpaceSaving.from_dict(d["uris"])
+        sk.clients = SpaceSaving.from_dict(d["clients"])
+        sk.ips = HyperLogLog.from_dict(d["ips"])
+        return sk
+
+def sketch_log_stream(capacity: int, f: io.TextIOBase) -> TrafficSketches:
+    sk = TrafficSketches(capacity)
+    sk.counts = count_standard_log_files([f], sketches=sk)
+    return sk
+
+def print_sketch_report(sk: TrafficSketches, top_uris: int, top_clients: int, distinct_ips: bool) -> None:
+    def show(title: str, ss: SpaceSaving, k: int) -> None:
+        print(f"{title} (top {k}; count is an upper bound, '±' = max overestimate):")
+        for item, c, err in ss.top(k):
+            bound = f"  ±{err}" if err else ""
+            print(f"  {c:10d}{bound:10s} {item}")
+        print("")
+
+    print("=== Traffic Sketches (bounded memory) ===")
+    if top_uris:
+        show("Top URIs (cs-uri-stem)", sk.uris, top_uris)
+    if top_clients:
+        show("Top clients (c-ip)", sk.clients, top_clients)
+    if distinct_ips:
+        print(f"Distinct client IPs (HyperLogLog, ~0.8% error): {sk.ips.estimate()}\n")
+
+# ---------------------------
+# Columnar cache (convert once, query many times)
+# ---------------------------
+
+# Dictionary-encoded columns (uint32 codes + a JSON list of values) -> log fields they come from.
+# edge/uri/status/result/minute match the --group-by dimension names.
+CACHE_DICT_COLUMNS = {
+    "edge": ("x-edge-location",),
+    "uri": ("cs-uri-stem",),
+    "status": ("sc-status",),
+    "result": ("x-edge-result-type",),
+    "response_result": ("x-edge-response-result-type",),
+    "outcome": OUTCOME_FIELDS,
+    "client": ("c-ip",),
+    "minute": ("date", "time"),
+}
+# Numeric columns -> (log field, array typecode, missing-value sentinel).
+CACHE_NUM_COLUMNS = {
+    "time_taken": ("time-taken", "d", float("nan")),
+    "sc_bytes": ("sc-bytes", "q", -1),
+}
+CACHE_FORMAT = 2
+
+class ColumnChunk:
+    """One object's rows in columnar form, with object-local dictionaries (merged by CacheWriter)."""
+
+    def __init__(self):
+        self.values: Dict[str, List[str]] = {c: [] for c in CACHE_DICT_COLUMNS}
+        self.codes = {c: array("I") for c in CACHE_DICT_COLUMNS}
+        self.nums = {c: array(tc) for c, (_, tc, _) in CACHE_NUM_COLUMNS.items()}
+        self.notes = Counter()
+        self.rows = 0
+
+def columnar_log_stream(f: io.TextIOBase) -> ColumnChunk:
+    names: List[str] = []
+    for fields in list(CACHE_DICT_COLUMNS.values()) + [(fld,) for fld, _, _ in CACHE_NUM_COLUMNS.values()]:
+        for fld in fields:
+            if fld not in names:
+                names.append(fld)
+    pos = {n: i for i, n in enumerate(names)}
+    i_rt, i_rrt = pos[OUTCOME_FIELDS[0]], pos[OUTCOME_FIELDS[1]]
+    i_date, i_time = pos["date"], pos["time"]
+    plain = [(c, pos[fields[0]]) for c, fields in CACHE_DICT_COLUMNS.items() if c not in ("outcome", "minute")]
+
+    chunk = ColumnChunk()
+    local = {c: {} for c in CACHE_DICT_COLUMNS}
+
+    def encode(col: str, value: str) -> None:
+        d = local[col]
+        code = d.get(value)
+        if code is None:
+            code = d[value] = len(d)
+            chunk.values[col].append(value)
+        chunk.codes[col].append(code)
+
+    for row in iter_log_rows(f, tuple(names), chunk.notes):
+        for col, i in plain:
+            encode(col, row[i])
+        encode("outcome", row[i_rt] or row[i_rrt])
+        encode("minute", f"{row[i_date]}T{row[i_time][:5]}:00Z" if row[i_date] else "")
+        for col, (fld, _, missing) in CACHE_NUM_COLUMNS.items():
+            v = _to_number(row[pos[fld]], float if col == "time_taken" else int)
+            chunk.nums[col].append(missing if v is None else v)
+        chunk.rows += 1
+    return chunk
+
+class CacheWriter:
+    """
+    Append ColumnChunks to per-column files, remapping object-local dictionary codes to one
+    global dictionary per column. Writes into '<dir>.tmp' and swaps it in on close(), so a
+    failed convert never leaves a half-written cache behind.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp = f"{path}.tmp"
+        if os.path.isdir(self.tmp):
+            shutil.rmtree(self.tmp)
+        os.makedirs(self.tmp)
+        self.dicts = {c: {} for c in CACHE_DICT_COLUMNS}
+        self.files = {c: open(os.path.join(self.tmp, f"{c}.u32"), "wb") for c in CACHE_DICT_COLUMNS}
+        for c, (_, tc, _) in CACHE_NUM_COLUMNS.items():
+            self.files[c] = open(os.path.join(self.tmp, f"{c}.{tc}"), "wb")
+        self.rows = 0
+        self.notes = Counter()
+        self.sources: List[str] = []
+
+    def add(self, source: str, chunk: ColumnChunk) -> None:
+        for col, codes in chunk.codes.items():
+            gd = self.dicts[col]
+            remap = [gd.setdefault(v, len(gd)) for v in chunk.values[col]]
+            if np is not None:
+                out = np.asarray(remap, dtype=np.uint32)[np.frombuffer(codes, dtype=np.uint32)]
+                out.tofile(self.files[col])
+            else:
+                array("I", (remap[c] for c in codes)).tofile(self.files[col])
+        for col, values in chunk.nums.items():
+            values.tofile(self.files[col])
+        self.rows += chunk.rows
+        self.notes.update(chunk.notes)
+        self.sources.append(source)
+
+    def close(self) -> None:
+        for fh in self.files.values():
+            fh.close()
+        for col, d in self.dicts.items():
+            with open(os.path.join(self.tmp, f"{col}.dict.json"), "w", encoding="utf-8") as fh:
+                json.dump(list(d), fh)
+        meta = {
+            "format": CACHE_FORMAT,
+            "byteorder": sys.byteorder,
+            "rows": self.rows,
+            "notes": dict(self.notes),
+            "sources": self.sources,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+        with open(os.path.join(self.tmp, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(meta, fh, indent=2)
+        if os.path.isdir(self.path):
+            if not os.path.exists(os.path.join(self.path, "meta.json")):
+                raise RuntimeError(f"Refusing to replace {self.path}: not a log cache directory")
+            shutil.rmtree(self.path)
+        os.replace(self.tmp, self.path)
+
+class ColumnarCache:
+    """
+    Read side of the cache. Columns are memory-mapped: numpy.memmap when numpy is installed
+    (vectorized bincount/unique), otherwise a typed memoryview over mmap (pure-Python loops,
+    still no gunzip or tokenizing).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            self.meta = json.load(fh)
+        if self.meta.get("format") != CACHE_FORMAT or self.meta.get("byteorder") != sys.byteorder:
+            raise RuntimeError(f"{path}: cache format/byte order mismatch; re-run convert")
+        self.rows = self.meta["rows"]
+        self._dicts: Dict[str, List[str]] = {}
+        self._maps = []
+
+    def dictionary(self, col: str) -> List[str]:
+        if col not in self._dicts:
+            with open(os.path.join(self.path, f"{col}.dict.json"), encoding="utf-8") as fh:
+                self._dicts[col] = json.load(fh)
+        return self._dicts[col]
+
+    def column(self, col: str):
+        if col in CACHE_DICT_COLUMNS:
+            fname, tc = f"{col}.u32", "I"
+        else:
+            tc = CACHE_NUM_COLUMNS[col][1]
+            fname = f"{col}.{tc}"
+        path = os.path.join(self.path, fname)
+        if np is not None:
+            dtype = {"I": np.uint32, "d": np.float64, "q": np.int64}[tc]
+            return np.memmap(path, dtype=dtype, mode="r", shape=(self.rows,)) if self.rows else np.empty(0, dtype=dtype)
+        if not self.rows:
+            return memoryview(array(tc))
+        with open(path, "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mm)
+        return memoryview(mm).cast(tc)
+
+def cache_counts(cache: ColumnarCache) -> Dict[str, int]:
+    """Same result as count_standard_log_files over the converted objects."""
+    labels = cache.dictionary("outcome")
+    codes = cache.column("outcome")
+    if np is not None:
+        per_code = np.bincount(codes, minlength=len(labels)).tolist()
+        seen = {labels[i]: n for i, n in enumerate(per_code) if n}
+    else:
+        seen = {labels[i]: n for i, n in Counter(codes).items()}
+    return rollup_outcomes(seen, Counter(cache.meta["notes"]))
+
+def _histograms_np(gid, values, n_groups: int, growth: float = 1.05) -> List[LogHistogram]:
+    """Build one LogHistogram per group from parallel (group id, value) arrays in a few vector passes."""
+    hists = [LogHistogram(growth) for _ in range(n_groups)]
+    if not len(values):
+        return hists
+    log_growth = hists[0]._log_growth
+    counts = np.bincount(gid, minlength=n_groups)
+    mins = np.full(n_groups, np.inf)
+    maxs = np.full(n_groups, -np.inf)
+    np.minimum.at(mins, gid, values)
+    np.maximum.at(maxs, gid, values)
+    pos = values > 0
+    zeros = np.bincount(gid[~pos], minlength=n_groups)
+    if pos.any():
+        buckets = np.ceil(np.log(values[pos]) / log_growth).astype(np.int64)
+        bmin = int(buckets.min())
+        span = int(buckets.max()) - bmin + 1
+        pairs, pair_counts = np.unique(gid[pos].astype(np.int64) * span + (buckets - bmin), return_counts=True)
+        for pair, n in zip(pairs.tolist(), pair_counts.tolist()):
+            hists[pair // span].buckets[pair % span + bmin] = n
+    for g in np.nonzero(counts)[0].tolist():
+        h = hists[g]
+        h.count, h.zeros = int(counts[g]), int(zeros[g])
+        h.min, h.max = float(mins[g]), float(maxs[g])
+    return hists
+
+def cache_group_by(cache: ColumnarCache, dims: Tuple[str, ...], max_groups: int = 10000,
+                   growth: float = 1.05) -> GroupByAggregator:
+    """Group-by over memory-mapped columns; same rows() output as the streaming GroupByAggregator."""
+    dictionaries = [cache.dictionary(d) for d in dims]
+    cols = [cache.column(d) for d in dims]
+    t_col, b_col = cache.column("time_taken"), cache.column("sc_bytes")
+    full = GroupByAggregator(dims, max_groups=max(max_groups, cache.rows + 1), growth=growth)
+
+    if np is not None and cache.rows:
+        key = np.zeros(cache.rows, dtype=np.int64)
+        for col, d in zip(cols, dictionaries):
+            key = key * max(1, len(d)) + col.astype(np.int64)
+        _, first, gid = np.unique(key, return_index=True, return_inverse=True)
+        n_groups = len(first)
+        counts = np.bincount(gid, minlength=n_groups)
+
+        t = np.asarray(t_col, dtype=np.float64)
+        t_ok = ~np.isnan(t)
+        t_sum = np.bincount(gid[t_ok], weights=t[t_ok], minlength=n_groups)
+        t_hists = _histograms_np(gid[t_ok], t[t_ok], n_groups, growth)
+        b = np.asarray(b_col)
+        b_ok = b >= 0
+        b_sum = np.bincount(gid[b_ok], weights=b[b_ok].astype(np.float64), minlength=n_groups)
+        b_hists = _histograms_np(gid[b_ok], b[b_ok].astype(np.float64), n_groups, growth)
+
+        for g, row in enumerate(first.tolist()):
+            label = tuple(d[int(col[row])] for col, d in zip(cols, dictionaries))
+            full.groups[label] = [int(counts[g]), float(t_sum[g]), int(b_sum[g]), t_hists[g], b_hists[g]]
+    else:
+        for i in range(cache.rows):
+            t = t_col[i]
+            b = b_col[i]
+            full.add_values(tuple(d[col[i]] for col, d in zip(cols, dictionaries)),
+                            None if math.isnan(t) else t, None if b < 0 else b)
+
+    # Apply the group cap busiest-first (the streaming path caps first-come).
+    agg = GroupByAggregator(dims, max_groups, growth)
+    ordered = GroupByAggregator(dims, max_groups=len(full.groups) + 1, growth=growth)
+    ordered.groups = dict(sorted(full.groups.items(), key=lambda kv: -kv[1][0]))
+    agg.merge(ordered)
+    agg.notes.update(cache.meta["notes"])
+    return agg
+
+# ---------------------------
+# Follow mode (rolling windows over newly delivered objects)
+# ---------------------------
+
+FOLLOW_WINDOWS = (5, 15, 60)
+FOLLOW_OUTCOMES = ("Hit", "Miss", "RefreshHit", "Other")
+
+def minute_outcomes_log_stream(f: io.TextIOBase) -> Dict[str, int]:
+    """Per-minute outcome counts as a flat {'YYYY-MM-DDTHH:MM:00Z|Hit': n} dict (merges like the count dicts)."""
+    notes = Counter()
+    seen = Counter()
+    for date, t, rt, rrt in iter_log_rows(f, ("date", "time") + OUTCOME_FIELDS, notes):
+        if not date:
+            continue
+        outcome = rt or rrt
+        seen[f"{date}T{t[:5]}:00Z|{outcome if outcome in TARGETS else 'Other'}"] += 1
+    return dict(seen)
+
+class RollingOutcomes:
+    """
+    Per-minute Hit/Miss/RefreshHit/Other buckets keyed by log timestamp. Windows end at the
+    newest minute seen in the logs (not wall clock), because CloudFront delivers standard
+    logs minutes late. Buckets older than the largest window are dropped.
+    """
+
+    def __init__(self, windows: Tuple[int, ...] = FOLLOW_WINDOWS):
+        self.windows = windows
+        self.minutes: Dict[datetime, Counter] = {}
+        self.last: Dict[int, Dict[str, int]] = {}
+
+    def add(self, partial: Dict[str, int]) -> None:
+        for k, n in partial.items():
+            minute, outcome = k.split("|", 1)
+            dt = datetime.fromisoformat(minute.replace("Z", "+00:00"))
+            self.minutes.setdefault(dt, Counter())[outcome] += n
+        if self.minutes:
+            horizon = max(self.minutes) - timedelta(minutes=max(self.windows))
+            for dt in [d for d in self.minutes if d <= horizon]:
+                del self.minutes[dt]
+
+    def snapshot(self) -> Dict[int, Dict[str, int]]:
+        if not self.minutes:
+            return {}
+        end = max(self.minutes)
+        out = {}
+        for w in self.windows:
+            c = Counter()
+            for dt, counts in self.minutes.items():
+                if dt > end - timedelta(minutes=w):
+                    c.update(counts)
+            out[w] = {k: c.get(k, 0) for k in FOLLOW_OUTCOMES}
+        return out
+
+    def deltas(self) -> List[Dict[str, object]]:
+        """Windows whose counts changed since the previous call, with per-outcome deltas."""
+        changed = []
+        snap = self.snapshot()
+        for w, counts in snap.items():
+            prev = self.last.get(w, {k: 0 for k in FOLLOW_OUTCOMES})
+            if counts == prev:
+                continue
+            core = counts["Hit"] + counts["Miss"] + counts["RefreshHit"]
+            prev_core = prev["Hit"] + prev["Miss"] + prev["RefreshHit"]
+            ratio = counts["Hit"] * 100.0 / core if core else 0.0
+            prev_ratio = prev["Hit"] * 100.0 / prev_core if prev_core else 0.0
+            changed.append({
+                "window": f"{w}m",
+                "counts": counts,
+                "delta": {k: counts[k] - prev[k] for k in FOLLOW_OUTCOMES},
+                "hit_pct": round(ratio, 1),
+                "hit_pct_delta": round(ratio - prev_ratio, 1),
+            })
+        self.last = snap
+        return changed
+
+def print_follow_deltas(as_of: datetime, new_objects: int, changes: List[Dict[str, object]], fmt: str) -> None:
+    if fmt == "json":
+        print(json.dumps({"as_of": as_of.isoformat(), "new_objects": new_objects, "windows": changes}), flush=True)
+        return
+    stamp = as_of.strftime("%Y-%m-%dT%H:%M:%SZ")
+    for c in changes:
+        parts = "  ".join(f"{k} {c['counts'][k]} ({c['delta'][k]:+d})" for k in FOLLOW_OUTCOMES)
+        print(f"[{stamp}] +{new_objects} objects  {c['window']:>3s}: {parts}  "
+              f"hit {c['hit_pct']:.1f}% ({c['hit_pct_delta']:+.1f}pp)", flush=True)
+
+def follow(s3, bucket: str, prefix: str, distribution_id: str, lookback_minutes: int, interval: float,
+           iterations: int = 0, workers: int = 8, parse_procs: int = 0, fmt: str = "table") -> None:
+    """
+    Poll the hour prefixes covering the last `lookback_minutes`, parse only keys not seen
+    before, fold them into RollingOutcomes and print what changed. `seen` only keeps keys
+    that are still inside the listed hours, so it never grows past a few hours of objects.
+    An S3 error only skips the rest of that poll: keys not parsed yet stay out of `seen` and
+    are fetched again on the next one.
+    """
+    rolling = RollingOutcomes()
+    seen: set = set()
+    n = 0
+    while True:
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(minutes=lookback_minutes)
+        new_keys: List[str] = []
+        try:
+            objects = s3_list_time_range(s3, bucket, prefix, distribution_id, since, now, workers)
+            listed = {o["Key"] for o in objects}
+            new_keys = [o["Key"] for o in objects if o["Key"] not in seen]
+            for key, part in run_pipeline(s3, bucket, new_keys, minute_outcomes_log_stream, workers, parse_procs):
+                rolling.add(part)
+                seen.add(key)
+            seen &= listed
+        except AWS_ERRORS as e:
+            print(f"{now:%H:%M:%S} poll failed, retrying in {interval:g}s: {e}", file=sys.stderr)
+
+        changes = rolling.deltas()
+        if changes:
+            print_follow_deltas(now, len(new_keys), changes, fmt)
+
+        n += 1
+        if iterations and n >= iterations:
+            return
+        time.sleep(interval)
+
+# ---------------------------
+# Processed-object manifest (incremental runs)
+# ---------------------------
+
+class Manifest:
+    """
+    SQLite journal of per-object partial results, keyed by (bucket, key, analysis).
+
+    The stored ETag is compared with the current listing: an unchanged object is served
+    from its cached partial, a new or rewritten one is fetched and parsed again. The
+    `analysis` column keeps Hit/Miss counts and each --group-by shape apart, because
+    their partials are not interchangeable.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS objects (
+            bucket       TEXT NOT NULL,
+            key          TEXT NOT NULL,
+            analysis     TEXT NOT NULL,
+            etag         TEXT NOT NULL,
+            partial      TEXT NOT NULL,
+            processed_at TEXT NOT NULL,
+            PRIMARY KEY (bucket, key, analysis)
+        )
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(self.SCHEMA)
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    def lookup(self, bucket: str, analysis: str, objects: List[Dict[str, str]]) -> Tuple[Dict[str, str], List[Dict[str, str]]]:
+        """Split objects into ({key: cached partial JSON} for ETag matches, [objects still to process])."""
+        cached: Dict[str, str] = {}
+        todo: List[Dict[str, str]] = []
+        cur = self.db.cursor()
+        for obj in objects:
+            row = cur.execute(
+                "SELECT etag, partial FROM objects WHERE bucket = ? AND key = ? AND analysis = ?",
+                (bucket, obj["Key"], analysis),
+            ).fetchone()
+            if row and obj.get("ETag") and row[0] == obj["ETag"]:
+                cached[obj["Key"]] = row[1]
+            else:
+                todo.append(obj)
+        return cached, todo
+
+    def record(self, bucket: str, analysis: str, key: str, etag: str, partial_json: str) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO objects (bucket, key, analysis, etag, partial, processed_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (bucket, key, analysis, etag, partial_json, datetime.now(timezone.utc).isoformat()),
+        )
+
+def analysis_name(dims: Optional[Tuple[str, ...]], max_groups: int, sketch_capacity: int = 0,
+                  growth: float = 1.05) -> str:
+    if dims:
+        return f"group-by:{','.join(dims)}:{max_groups}:{growth:g}"
+    return f"sketch:{sketch_capacity}" if sketch_capacity else "counts"
+
+def partial_to_json(partial) -> str:
+    return json.dumps(partial if isinstance(partial, dict) else partial.to_dict(), separators=(",", ":"))
+
+def partial_from_json(analysis: str, data: str):
+    d = json.loads(data)
+    if analysis.startswith("group-by:"):
+        return GroupByAggregator.from_dict(d)
+    if analysis.startswith("sketch:"):
+        return TrafficSketches.from_dict(d)
+    return d
+
+def analyze_incremental(s3, bucket: str, objects: List[Dict[str, str]], manifest: Manifest, analysis: str,
+                        parse_fn: Callable, workers: int = 8, parse_procs: int = 0):
+    """
+    Merge cached partials for unchanged objects and only fetch/parse the rest, journaling
+    each new partial as it completes (so an interrupted run keeps its progress).
+    Returns (result, cached_count, processed_count).
+    """
+    cached, todo = manifest.lookup(bucket, analysis, objects)
+    total = None
+    for data in cached.values():
+        total = merge_partial(total, partial_from_json(analysis, data))
+
+    etags = {o["Key"]: o.get("ETag", "") for o in todo}
+    done = 0
+    for key, partial in run_pipeline(s3, bucket, list(etags), parse_fn, workers, parse_procs):
+        # Journal before merging: merge_partial may mutate an aggregator in place.
+        manifest.record(bucket, analysis, key, etags[key], partial_to_json(partial))
+        total = merge_partial(total, partial)
+        done += 1
+        if done % 100 == 0:
+            manifest.db.commit()
+    manifest.db.commit()
+
+    if total is None:
+        total = parse_fn(io.StringIO(""))
+    return total, len(cached), len(todo)
+
 def print_report(counts: Dict[str, int]) -> None:
     core = {k: counts.get(k, 0) for k in ["Hit", "Miss", "RefreshHit"]}
     others = {k: v for k, v in counts.items() if k not in core}
@@ -162,30 +1430,241 @@ def print_report(counts: Dict[str, int]) -> None:
     print("  • RefreshHit means CloudFront revalidated with origin and served cached content (often good).")
     print("=======================================================\n")
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Count Hit/Miss/RefreshHit from CloudFront standard logs in S3.")
+def add_source_args(ap: argparse.ArgumentParser) -> None:
+    """Options that pick which S3 log objects to read (shared by analyze and convert)."""
     ap.add_argument("--bucket", default="Class_Lab3", help="S3 bucket name (default: Class_Lab3)")
     ap.add_argument("--prefix", default="", help="Optional S3 prefix (folder) where logs live, e.g. cloudfront-logs/")
-    ap.add_argument("--latest", type=int, default=3, help="Download and analyze the latest N log objects (default: 3)")
-    ap.add_argument("--keep", action="store_true", help="Keep downloaded files (default: delete temp files)")
-    args = ap.parse_args()
-
-    # 1) List objects
-    keys = aws_s3_ls_recursive(args.bucket, args.prefix)
-    if not keys:
-        print(f"No objects found in s3://{args.bucket}/{args.prefix}")
-        print("Tip: verify prefix with: aws s3 ls s3://Class_Lab3/ --recursive | head")
-        return 2
-
-    latest_keys = pick_latest(keys, args.latest)
-    print(f"Found {len(keys)} objects. Analyzing latest {len(latest_keys)}:")
-    for k in latest_keys:
-        print(f"  - s3://{args.bucket}/{k}")
-
-    # 2) Download into temp dir
-    tmpdir = tempfile.mkdtemp(prefix="malgus_cf_")
-    downloaded = []
+    ap.add_argument("--latest", type=int, default=None,
+                    help="Download and analyze the latest N log objects (0 = all; default: 3, or all in range with --since)")
+    ap.add_argument("--since", default=None,
+                    help="Only list hours from this time (ISO-8601 UTC, or relative like 90m / 6h / 2d)")
+    ap.add_argument("--until", default=None, help="Only list hours up to this time (default: now)")
+    ap.add_argument("--distribution-id", default=None,
+                    help="CloudFront distribution ID in the log key names (default: read from the first key under --prefix)")
+    ap.add_argument("--region", default=None, help="S3 client region (default: from AWS config)")
+    ap.add_argument("--workers", type=int, default=8, help="Concurrent S3 fetch threads (default: 8)")
+    ap.add_argument("--parse-procs", type=int, default=0,
+                    help="Parse in N worker processes (default: 0 = parse in the fetch threads). "
+                         "Use ~CPU count for thousands of objects.")
+
+def resolve_time_args(ap: argparse.ArgumentParser, args) -> Tuple[Optional[datetime], datetime]:
+    if args.until and not args.since:
+        ap.error("--until needs --since")
+    try:
+        since = parse_time_arg(args.since) if args.since else None
+        until = parse_time_arg(args.until) if args.until else datetime.now(timezone.utc)
+    except ValueError as e:
+        ap.error(f"bad --since/--until: {e}")
+    if args.latest is None:
+        args.latest = 0 if since else 3
+    return since, until
+
+def list_source_objects(s3, args, since: Optional[datetime], until: datetime) -> List[Dict[str, str]]:
+    if since:
+        dist_id = args.distribution_id or sniff_distribution_id(s3, args.bucket, args.prefix)
+        if not dist_id:
+            raise RuntimeError(f"Could not read a DISTID.YYYY-MM-DD-HH key under s3://{args.bucket}/{args.prefix}; "
+                               "pass --distribution-id")
+        return s3_list_time_range(s3, args.bucket, args.prefix, dist_id, since, until, args.workers)
+    return s3_list_objects(s3, args.bucket, args.prefix)
+
+def main_convert(argv: List[str]) -> int:
+    ap = argparse.ArgumentParser(
+        prog="galactus_cloudfront_log_explainer.py convert",
+        description="Parse CloudFront standard logs from S3 once into a local columnar cache "
+                    "(dictionary-encoded, memory-mappable). Query it later with --cache DIR.",
+    )
+    add_source_args(ap)
+    ap.add_argument("--cache", required=True, help="Cache directory to (re)write")
+    args = ap.parse_args(argv)
+    since, until = resolve_time_args(ap, args)
+
+    try:
+        s3 = s3_client(args.region, max_pool_connections=args.workers)
+        keys = [o["Key"] for o in list_source_objects(s3, args, since, until)]
+        keys = pick_latest(keys, args.latest) if args.latest > 0 else keys
+        if not keys:
+            print(f"No objects found in s3://{args.bucket}/{args.prefix}")
+            return 2
+
+        print(f"Converting {len(keys)} objects from s3://{args.bucket}/{args.prefix} -> {args.cache}")
+        writer = CacheWriter(args.cache)
+        for key, chunk in run_pipeline(s3, args.bucket, keys, columnar_log_stream, args.workers, args.parse_procs):
+            writer.add(key, chunk)
+        writer.close()
+        print(f"Wrote {writer.rows} rows ({len(writer.sources)} objects). "
+              f"Query with: --cache {args.cache} [--group-by ...]")
+        return 0
+    except (RuntimeError,) + AWS_ERRORS as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "convert":
+        return main_convert(argv[1:])
+
+    ap = argparse.ArgumentParser(
+        description="Count Hit/Miss/RefreshHit from CloudFront standard logs in S3.",
+        epilog="Subcommand: 'convert --cache DIR ...' parses logs once into a columnar cache for fast repeat queries.",
+    )
+    add_source_args(ap)
+    ap.add_argument("--group-by", default=None,
+                    help="Aggregate by a comma list of edge,uri,status,result,minute "
+                         "(count + sum/p50/p90/p99 of time-taken and sc-bytes) instead of the Hit/Miss report")
+    ap.add_argument("--max-groups", type=int, default=10000,
+                    help="Group cap for --group-by; overflow is folded into '(other)' (default: 10000)")
+    ap.add_argument("--format", default="table", choices=["table", "json", "csv"], help="--group-by/--latency output format")
+    ap.add_argument("--top", type=int, default=50, help="Rows shown in --format table (0 = all; default: 50)")
+    ap.add_argument("--out", default=None, help="Write --group-by/--latency output to this file instead of stdout")
+    ap.add_argument("--latency", action="store_true",
+                    help="Report time-taken p50/p90/p99/p99.9 by x-edge-response-result-type and edge "
+                         "(mergeable log-bucketed histograms, 1%% relative error)")
+    ap.add_argument("--top-uris", type=int, default=0, help="Also report the N busiest cs-uri-stem values (Space-Saving sketch)")
+    ap.add_argument("--top-clients", type=int, default=0, help="Also report the N busiest c-ip values (Space-Saving sketch)")
+    ap.add_argument("--distinct-ips", action="store_true", help="Also estimate distinct c-ip values (HyperLogLog)")
+    ap.add_argument("--manifest", default=None,
+                    help="SQLite manifest of processed objects (key + ETag -> partial result). "
+                         "Repeat runs only fetch new/changed objects and merge cached partials.")
+    ap.add_argument("--follow", action="store_true",
+                    help="Keep polling for newly delivered objects and print rolling 5m/15m/60m Hit/Miss/RefreshHit deltas")
+    ap.add_argument("--interval", type=float, default=60, help="--follow poll interval in seconds (default: 60)")
+    ap.add_argument("--lookback", type=int, default=120,
+                    help="--follow lists hour prefixes covering this many minutes back (default: 120; covers late delivery)")
+    ap.add_argument("--iterations", type=int, default=0, help="--follow: stop after N polls (default: 0 = until Ctrl-C)")
+    ap.add_argument("--cache", default=None,
+                    help="Query a local cache written by 'convert' instead of reading S3 (counts and --group-by)")
+    ap.add_argument("--use-aws-cli", action="store_true",
+                    help="Legacy mode: list/copy with the aws CLI into a temp dir instead of streaming via boto3")
+    ap.add_argument("--keep", action="store_true", help="Keep downloaded files (--use-aws-cli only; default: delete temp files)")
+    args = ap.parse_args(argv)
+
+    if args.manifest and args.use_aws_cli:
+        ap.error("--manifest needs object ETags from the boto3 listing; drop --use-aws-cli")
+    if args.since and args.use_aws_cli:
+        ap.error("--since/--until use targeted list_objects_v2 calls; drop --use-aws-cli")
+    since, until = resolve_time_args(ap, args)
+
+    want_sketches = bool(args.top_uris or args.top_clients or args.distinct_ips)
+    if want_sketches and (args.group_by or args.latency):
+        ap.error("--top-uris/--top-clients/--distinct-ips extend the Hit/Miss report; run them without --group-by/--latency")
+    if args.latency and args.group_by:
+        ap.error("--latency is a fixed grouping (outcome, edge); drop --group-by")
+    # Tracked items per sketch: generous headroom over the requested K keeps the top-K exact in practice.
+    sketch_capacity = max(1000, 20 * max(args.top_uris, args.top_clients)) if want_sketches else 0
+
+    dims = None
+    growth = LATENCY_GROWTH if args.latency else 1.05
+    if args.latency:
+        dims = LATENCY_DIMS
+        parse_fn = partial(aggregate_log_stream, dims, args.max_groups, growth=growth)
+    elif args.group_by:
+        try:
+            dims = parse_dimensions(args.group_by)
+        except ValueError as e:
+            ap.error(str(e))
+        parse_fn = partial(aggregate_log_stream, dims, args.max_groups)
+    elif want_sketches:
+        parse_fn = partial(sketch_log_stream, sketch_capacity)
+    else:
+        parse_fn = count_log_stream
+
+    def report(result) -> None:
+        if isinstance(result, TrafficSketches):
+            print_report(result.counts)
+            print_sketch_report(result, args.top_uris, args.top_clients, args.distinct_ips)
+            return
+        if dims is None:
+            print_report(result)
+            return
+        rows = latency_rows(result) if args.latency else result.rows()
+        if args.out:
+            with open(args.out, "w", encoding="utf-8", newline="") as f:
+                write_rows(rows, args.format, f)
+            print(f"Wrote {len(rows)} groups ({args.format}) to {args.out}")
+        else:
+            write_rows(rows, args.format, sys.stdout, args.top)
+
+    if args.follow:
+        if dims or want_sketches or args.manifest or args.cache or args.use_aws_cli or args.since:
+            ap.error("--follow runs on its own: drop --group-by/--latency/sketches/--manifest/--cache/--use-aws-cli/--since")
+        fmt = "json" if args.format == "json" else "table"
+        try:
+            s3 = s3_client(args.region, max_pool_connections=args.workers)
+            dist_id = args.distribution_id or sniff_distribution_id(s3, args.bucket, args.prefix)
+            if not dist_id:
+                raise RuntimeError(f"Could not read a DISTID.YYYY-MM-DD-HH key under s3://{args.bucket}/{args.prefix}; "
+                                   "pass --distribution-id")
+            print(f"Following s3://{args.bucket}/{args.prefix}{dist_id}.* every {args.interval:g}s "
+                  f"(windows: {', '.join(f'{w}m' for w in FOLLOW_WINDOWS)}). Ctrl-C to stop.", file=sys.stderr)
+            follow(s3, args.bucket, args.prefix, dist_id, args.lookback, args.interval, args.iterations,
+                   args.workers, args.parse_procs, fmt)
+            return 0
+        except KeyboardInterrupt:
+            return 0
+        except (RuntimeError,) + AWS_ERRORS as e:
+            print(str(e), file=sys.stderr)
+            return 1
+
+    if args.cache:
+        if want_sketches:
+            ap.error("--top-uris/--top-clients/--distinct-ips are not available with --cache")
+        try:
+            cache = ColumnarCache(args.cache)
+        except (OSError, ValueError, RuntimeError) as e:
+            print(f"Cannot open cache {args.cache}: {e}", file=sys.stderr)
+            return 1
+        engine = "numpy" if np is not None else "pure-Python (pip install numpy for vectorized queries)"
+        print(f"Cache {args.cache}: {cache.rows} rows from {len(cache.meta['sources'])} objects [{engine}]",
+              file=sys.stderr if (dims and args.format != "table" and not args.out) else sys.stdout)
+        report(cache_group_by(cache, dims, args.max_groups, growth) if dims else cache_counts(cache))
+        return 0
+
     try:
+        # 1) List objects
+        if args.use_aws_cli:
+            s3 = None
+            keys = aws_s3_ls_recursive(args.bucket, args.prefix)
+        else:
+            s3 = s3_client(args.region, max_pool_connections=args.workers)
+            objects = list_source_objects(s3, args, since, until)
+            keys = [o["Key"] for o in objects]
+        if not keys:
+            print(f"No objects found in s3://{args.bucket}/{args.prefix}")
+            print("Tip: verify prefix with: aws s3 ls s3://Class_Lab3/ --recursive | head")
+            return 2
+
+        latest_keys = pick_latest(keys, args.latest) if args.latest > 0 else keys
+        # Keep stdout clean for machine-readable --group-by output.
+        progress = sys.stderr if (dims and args.format != "table" and not args.out) else sys.stdout
+        print(f"Found {len(keys)} objects. Analyzing latest {len(latest_keys)}:", file=progress)
+        for k in latest_keys[:20]:
+            print(f"  - s3://{args.bucket}/{k}", file=progress)
+        if len(latest_keys) > 20:
+            print(f"  ... and {len(latest_keys) - 20} more", file=progress)
+
+        # 2) Fetch + parse concurrently, merge partial counts (no temp files)
+        if s3 is not None and args.manifest:
+            wanted = set(latest_keys)
+            manifest = Manifest(args.manifest)
+            try:
+                result, n_cached, n_new = analyze_incremental(
+                    s3, args.bucket, [o for o in objects if o["Key"] in wanted], manifest,
+                    analysis_name(dims, args.max_groups, sketch_capacity, growth), parse_fn, args.workers, args.parse_procs,
+                )
+            finally:
+                manifest.close()
+            print(f"Manifest {args.manifest}: {n_cached} cached, {n_new} fetched", file=progress)
+            report(result)
+            return 0
+
+        if s3 is not None:
+            report(analyze_s3_keys(s3, args.bucket, latest_keys, args.workers, args.parse_procs, parse_fn))
+            return 0
+
+        # 2b) Legacy: download into temp dir
+        tmpdir = tempfile.mkdtemp(prefix="malgus_cf_")
+        downloaded = []
         for k in latest_keys:
             filename = os.path.basename(k) or "log"
             dest = os.path.join(tmpdir, filename)
@@ -193,8 +1672,11 @@ def main() -> int:
             downloaded.append(dest)
 
         # 3) Parse + report
-        counts = count_standard_log_files(downloaded)
-        print_report(counts)
+        result = None
+        for path in downloaded:
+            with open_maybe_gzip(path) as f:
+                result = merge_partial(result, parse_fn(f))
+        report(result)
 
         if args.keep:
             print(f"Kept downloaded files in: {tmpdir}")
@@ -211,7 +1693,7 @@ def main() -> int:
                 pass
 
         return 0
-    except RuntimeError as e:
+    except (RuntimeError,) + AWS_ERRORS as e:
         print(str(e), file=sys.stderr)
         print("\nQuick checks:")
         print("  aws sts get-caller-identity")
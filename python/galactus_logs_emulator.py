@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+# galactus_logs_emulator.py
+#
+# Local stand-in for the AWS calls the evidence pipeline makes, for offline benchmarks and
+# tests: CloudWatch Logs Insights (start_query / get_query_results / stop_query),
+# CloudWatch describe_alarms, SSM get_parameters_by_path, Secrets Manager describe_secret /
+# get_secret_value, plus S3 put_object and SNS publish for ir_reporter.
+#
+# Log groups are loaded from recorded fixtures (python/fixtures/*.jsonl: one CloudWatch
+# event per line, {"timestamp": ms, "message": str}, or a raw WAF record with its own
+# "timestamp") and replayed shifted so the newest event lands `replay_lag` seconds ago.
+# The app group can instead replay a CloudWatch console export of the real app log
+# (LAB1-DELIVERABLES/.../rdsapp_cloudwatch.log, see load_console_export).
+# JSON messages get their fields discovered the way Logs Insights does (httpRequest.clientIp).
+#
+# Queries are evaluated by a small Logs Insights subset: fields [as], filter (like /re/,
+# =, !=, and), stats count/sum/min/max/avg by field / bin(Nm), sort, limit. Latency is
+# modelled per query as query_base + records / scan_rate seconds, during which the query is
+# Running with growing statistics.recordsScanned and partial rows. Every API call sleeps
+# api_latency and is counted in .calls, so serial vs concurrent paths can be compared on
+# wall time and API call volume.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import count
+from typing import Dict, List, Optional
+
+from botocore.exceptions import ClientError
+
+from galactus_logsinsights_runner import _column, _command, _split_top, parse_sort, split_pipeline
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _error(code: str, op: str, msg: str = "") -> ClientError:
+    return ClientError({"Error": {"Code": code, "Message": msg or code}}, op)
+
+def _flatten(obj, prefix="", out=None) -> Dict[str, object]:
+    out = {} if out is None else out
+    for k, v in obj.items():
+        key = f"{prefix}{k}"
+        if isinstance(v, dict):
+            _flatten(v, key + ".", out)
+        else:
+            out[key] = v
+    return out
+
+def _fmt_ts(ms: int) -> str:
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d %H:%M:%S.") + f"{ms % 1000:03d}"
+
+def _fmt_value(v) -> str:
+    if isinstance(v, float):
+        return str(int(v)) if v.is_integer() else repr(v)
+    return str(v)
+
+def load_fixture(path: str) -> List[Dict[str, object]]:
+    """[{"timestamp": ms, "message": str}] from a fixture file, oldest first."""
+    events = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            if "message" in rec:
+                events.append({"timestamp": int(rec["timestamp"]), "message": rec["message"]})
+            else:
+                events.append({"timestamp": int(rec["timestamp"]), "message": line})
+    events.sort(key=lambda e: e["timestamp"])
+    return events
+
+RDSAPP_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "LAB1-DELIVERABLES",
+                          "armageddon-lab1ab-files", "logs", "rdsapp_cloudwatch.log")
+# werkzeug access lines: [25/Jan/2026 14:42:11]; Flask's logger: [2026-01-25 14:42:11,788]
+_EVENT_TIMES = ((re.compile(r"\[(\d{2}/\w{3}/\d{4} \d{2}:\d{2}:\d{2})\]"), "%d/%b/%Y %H:%M:%S"),
+                (re.compile(r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})\]"), "%Y-%m-%d %H:%M:%S,%f"))
+
+def _event_time(message: str) -> Optional[int]:
+    for pattern, fmt in _EVENT_TIMES:
+        hit = pattern.search(message)
+        if hit:
+            return int(datetime.strptime(hit.group(1), fmt).replace(tzinfo=timezone.utc).timestamp() * 1000)
+    return None
+
+def load_console_export(path: str) -> List[Dict[str, object]]:
+    """
+    [{"timestamp": ms, "message": str}] from a log copied out of the CloudWatch console:
+    events are tab-separated and keep their own newlines (tracebacks). Only werkzeug and
+    Flask logger lines carry a time, so every other event takes the last one seen (the
+    first one for events before it), 1 ms apart to keep the recorded order.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        messages = [m.strip("\n") for m in f.read().split("\t") if m.strip()]
+    stamps = [_event_time(m) for m in messages]
+    known = [t for t in stamps if t is not None]
+    if not known:
+        raise ValueError(f"{path}: no timestamped events")
+    events, last = [], known[0]
+    for m, t in zip(messages, stamps):
+        last = max(t if t is not None else last, (events[-1]["timestamp"] + 1) if events else last)
+        events.append({"timestamp": last, "message": m})
+    return events
+
+
+class LogGroup:
+    """Replayed events with discovered fields; timestamps shifted to end `lag` seconds before load."""
+
+    def __init__(self, name: str, events: List[Dict[str, object]], repeat: int = 1, lag: float = 30.0):
+        self.name = name
+        self.records = []
+        if not events:
+            return
+        span = events[-1]["timestamp"] - events[0]["timestamp"] + 1000
+        shift = int((time.time() - lag) * 1000) - events[-1]["timestamp"] - (repeat - 1) * span
+        ptr = count()
+        for r in range(repeat):
+            for e in events:
+                ts = e["timestamp"] + shift + r * span
+                rec = {"@timestamp": ts, "@message": e["message"], "@ptr": f"{name}#{next(ptr)}",
+                       "@log": name}
+                msg = e["message"]
+                if msg.startswith("{"):
+                    try:
+                        rec.update(_flatten(json.loads(msg)))
+                    except ValueError:
+                        pass
+                self.records.append(rec)
+
+
+# ---------------------------
+# Query evaluation (Logs Insights subset)
+# ---------------------------
+
+_COND = re.compile(r"^\s*([\w.@]+)\s*(like|=|!=)\s*(/(?:[^/\\]|\\.)*/|\"[^\"]*\"|'[^']*'|[\w.\-]+)\s*$", re.I)
+
+def _filter_fn(expr: str):
+    conds = []
+    for part in re.split(r"\s+and\s+", expr.strip(), flags=re.I):
+        m = _COND.match(part)
+        if not m:
+            raise ValueError(f"unsupported filter: {part!r}")
+        field, op, value = m.group(1), m.group(2).lower(), m.group(3)
+        if op == "like":
+            if not value.startswith("/"):
+                value = "/" + re.escape(value.strip("\"'")) + "/"
+            pat = re.compile(value[1:-1])
+            conds.append(lambda r, f=field, p=pat: p.search(str(r.get(f, ""))) is not None)
+        else:
+            want = value.strip("\"'")
+            if op == "=":
+                conds.append(lambda r, f=field, w=want: str(r.get(f, "")) == w)
+            else:
+                conds.append(lambda r, f=field, w=want: str(r.get(f, "")) != w)
+    return lambda r: all(c(r) for c in conds)
+
+def _bin(expr: str):
+    m = re.fullmatch(r"bin\((\d+)([smhd])\)", expr.replace(" ", ""))
+    if not m:
+        return None
+    size = int(m.group(1)) * {"s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)] * 1000
+    return lambda r: _fmt_ts(r["@timestamp"] // size * size)
+
+def _sort_value(v):
+    try:
+        return (0, float(v), "")
+    except (TypeError, ValueError):
+        return (1, 0.0, "" if v is None else str(v))
+
+def evaluate(query: str, records: List[Dict[str, object]], limit: Optional[int] = None) -> List[Dict[str, object]]:
+    """Run a Logs Insights query over records; returns result rows as dicts (raw values)."""
+    rows = list(records)
+    projected = False
+    for part in split_pipeline(query):
+        cmd = _command(part)
+        arg = part.split(None, 1)[1] if " " in part else ""
+        if cmd in ("fields", "display"):
+            cols = [_column(c) for c in _split_top(arg)]
+            # Keep @timestamp/@ptr for later sort/bin; real results also always carry @ptr.
+            rows = [dict({"@timestamp": r.get("@timestamp"), "@ptr": r.get("@ptr")},
+                         **{name: r.get(src) for src, name in cols}) for r in rows]
+            projected = True
+        elif cmd == "filter":
+            keep = _filter_fn(arg)
+            rows = [r for r in rows if keep(r)]
+        elif cmd == "stats":
+            m = re.search(r"(?i)\s+by\s+", arg)
+            aggs, by = (arg[:m.start()], arg[m.end():]) if m else (arg, "")
+            keys = []
+            for expr in _split_top(by):
+                src, name = _column(expr)
+                fn = _bin(src)
+                keys.append((name, fn or (lambda r, f=src: r.get(f))))
+            specs = []
+            for expr in _split_top(aggs):
+                src, name = _column(expr)
+                fm = re.fullmatch(r"(\w+)\((.*)\)", src.replace(" ", ""))
+                if not fm or fm.group(1).lower() not in ("count", "sum", "min", "max", "avg"):
+                    raise ValueError(f"unsupported aggregate: {src!r}")
+                specs.append((name, fm.group(1).lower(), fm.group(2)))
+            groups: Dict[tuple, List[Dict[str, object]]] = {}
+            for r in rows:
+                groups.setdefault(tuple(fn(r) for _, fn in keys), []).append(r)
+            out = []
+            for key, members in groups.items():
+                row = {name: v for (name, _), v in zip(keys, key) if v is not None}
+                for name, fn, field in specs:
+                    vals = [float(m[field]) for m in members if field and m.get(field) is not None]
+                    if fn == "count":
+                        row[name] = len(vals) if field else len(members)
+                    elif vals:
+                        row[name] = {"sum": sum, "min": min, "max": max,
+                                     "avg": lambda v: sum(v) / len(v)}[fn](vals)
+                out.append(row)
+            rows = out
+            projected = True
+        elif cmd == "sort":
+            for field, desc in reversed(parse_sort(part)):
+                rows.sort(key=lambda r, f=field: _sort_value(r.get(f)), reverse=desc)
+        elif cmd == "limit":
+            rows = rows[:int(arg)]
+        else:
+            raise ValueError(f"unsupported command: {cmd}")
+    if not projected:
+        rows = [{"@timestamp": r["@timestamp"], "@message": r["@message"], "@ptr": r["@ptr"]} for r in rows]
+    return rows[:limit] if limit else rows
+
+def to_results(rows: List[Dict[str, object]]) -> list:
+    """Rows in get_query_results shape: [[{"field", "value"}...]...] with string values."""
+    out = []
+    for r in rows:
+        out.append([{"field": k, "value": _fmt_ts(v) if k == "@timestamp" and isinstance(v, int) else _fmt_value(v)}
+                    for k, v in r.items() if v is not None])
+    return out
+
+
+# ---------------------------
+# Fake clients
+# ---------------------------
+
+class _Counted:
+    """Shared call counter + simulated round trip for every fake API call."""
+
+    def __init__(self, api_latency: float, calls: Counter, lock: threading.Lock):
+        self.api_latency = api_latency
+        self.calls = calls
+        self._lock = lock
+
+    def _call(self, op: str) -> None:
+        with self._lock:
+            self.calls[op] += 1
+        if self.api_latency:
+            time.sleep(self.api_latency)
+
+
+class FakeLogsInsights(_Counted):
+    def __init__(self, groups: Dict[str, LogGroup], query_base: float = 1.0, scan_rate: float = 50000.0,
+                 max_concurrent: int = 30, api_latency: float = 0.02, calls: Optional[Counter] = None,
+                 lock: Optional[threading.Lock] = None):
+        super().__init__(api_latency, calls if calls is not None else Counter(), lock or threading.Lock())
+        self.groups = groups
+        self.query_base = query_base
+        self.scan_rate = scan_rate
+        self.max_concurrent = max_concurrent
+        self.queries: Dict[str, dict] = {}
+        self.ids = count()
+        self.max_running = 0
+
+    def _running(self) -> int:
+        now = time.monotonic()
+        return sum(1 for q in self.queries.values() if q["status"] == "Running" and q["done_at"] > now)
+
+    def start_query(self, queryString, startTime, endTime, logGroupName=None, logGroupNames=None, limit=1000, **_):
+        self._call("logs.start_query")
+        names = [logGroupName] if logGroupName else list(logGroupNames or [])
+        missing = [n for n in names if n not in self.groups]
+        if missing:
+            raise _error("ResourceNotFoundException", "StartQuery", f"Log group not found: {missing[0]}")
+        with self._lock:
+            if self._running() >= self.max_concurrent:
+                raise _error("LimitExceededException", "StartQuery", "concurrent query limit")
+            records = [r for n in names for r in self.groups[n].records
+                       if startTime * 1000 <= r["@timestamp"] <= endTime * 1000 + 999]
+            try:
+                rows = evaluate(queryString, records, limit)
+            except ValueError as e:
+                raise _error("MalformedQueryException", "StartQuery", str(e))
+            qid = f"emu-{next(self.ids)}"
+            now = time.monotonic()
+            self.queries[qid] = {
+                "status": "Running",
+                "started": now,
+                "done_at": now + self.query_base + len(records) / self.scan_rate,
+                "records": len(records),
+                "rows": rows,
+                "streamable": not any(_command(p) == "stats" for p in split_pipeline(queryString)),
+            }
+            self.max_running = max(self.max_running, self._running())
+        return {"queryId": qid}
+
+    def get_query_results(self, queryId):
+        self._call("logs.get_query_results")
+        q = self.queries.get(queryId)
+        if q is None:
+            raise _error("ResourceNotFoundException", "GetQueryResults", "unknown query")
+        if q["status"] != "Running":
+            return {"status": q["status"], "results": [], "statistics": {}}
+        now = time.monotonic()
+        progress = min(1.0, (now - q["started"]) / max(1e-9, q["done_at"] - q["started"]))
+        scanned = float(int(q["records"] * progress))
+        stats = {"recordsScanned": scanned, "recordsMatched": float(len(q["rows"]) if progress >= 1 else 0),
+                 "bytesScanned": scanned * 400.0}
+        if progress >= 1.0:
+            q["status"] = "Complete"
+            return {"status": "Complete", "results": to_results(q["rows"]), "statistics": stats}
+        partial = q["rows"][:int(len(q["rows"]) * progress)] if q["streamable"] else []
+        return {"status": "Running", "results": to_results(partial), "statistics": stats}
+
+    def stop_query(self, queryId):
+        self._call("logs.stop_query")
+        q = self.queries.get(queryId)
+        if q and q["status"] == "Running":
+            q["status"] = "Cancelled"
+        return {"success": True}
+
+
+class FakeCloudWatch(_Counted):
+    def __init__(self, alarms: List[dict], **kw):
+        super().__init__(**kw)
+        self.alarms = alarms
+
+    def describe_alarms(self, StateValue=None, MaxRecords=100, **_):
+        self._call("cloudwatch.describe_alarms")
+        hits = [a for a in self.alarms if StateValue is None or a.get("StateValue") == StateValue]
+        return {"MetricAlarms": hits[:MaxRecords]}
+
+
+class FakeSSM(_Counted):
+    """get_parameters_by_path paginates page_size parameters per call (the real API caps at 10)."""
+
+    def __init__(self, params: Dict[str, str], page_size: int = 10, **kw):
+        super().__init__(**kw)
+        self.params = params
+        self.page_size = page_size
+
+    def get_parameters_by_path(self, Path, Recursive=False, WithDecryption=False, NextToken=None, MaxResults=None, **_):
+        self._call("ssm.get_parameters_by_path")
+        names = sorted(n for n in self.params if n.startswith(Path))
+        start = int(NextToken or 0)
+        page = names[start:start + self.page_size]
+        resp = {"Parameters": [{"Name": n, "Type": "String", "Value": self.params[n]} for n in page]}
+        if start + self.page_size < len(names):
+            resp["NextToken"] = str(start + self.page_size)
+        return resp
+
+
+class FakeSecrets(_Counted):
+    def __init__(self, secrets: Dict[str, dict], **kw):
+        super().__init__(**kw)
+        self.secrets = secrets
+
+    def _get(self, op, SecretId):
+        if SecretId not in self.secrets:
+            raise _error("ResourceNotFoundException", op, f"Secret {SecretId} not found")
+        return self.secrets[SecretId]
+
+    def describe_secret(self, SecretId):
+        self._call("secretsmanager.describe_secret")
+        sec = self._get("DescribeSecret", SecretId)
+        return {"ARN": f"arn:aws:secretsmanager:local:000000000000:secret:{SecretId}", "Name": SecretId,
+                "RotationEnabled": bool(sec.get("rotation"))}
+
+    def get_secret_value(self, SecretId):
+        self._call("secretsmanager.get_secret_value")
+        sec = self._get("GetSecretValue", SecretId)
+        return {"Name": SecretId, "SecretString": json.dumps(sec.get("value", {}))}
+
+
+class FakeS3(_Counted):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.objects: Dict[tuple, bytes] = {}
+
+    def put_object(self, Bucket, Key, Body, **_):
+        self._call("s3.put_object")
+        self.objects[(Bucket, Key)] = Body.encode("utf-8") if isinstance(Body, str) else Body
+        return {"ETag": '"emu"'}
+
+
+class FakeSNS(_Counted):
+    def __init__(self, **kw):
+        super().__init__(**kw)
+        self.messages: List[dict] = []
+
+    def publish(self, TopicArn, Message, Subject=None, **_):
+        self._call("sns.publish")
+        self.messages.append({"TopicArn": TopicArn, "Subject": Subject, "Message": Message})
+        return {"MessageId": f"emu-{len(self.messages)}"}
+
+
+# ---------------------------
+# Scenario
+# ---------------------------
+
+APP_LOG_GROUP = "/aws/ec2/rdsapp"
+WAF_LOG_GROUP = "aws-waf-logs-galactus-edge"
+SECRET_ID = "lab/rds/mysql"
+
+class Emulator:
+    """
+    A recorded incident: app + WAF log groups from the fixtures (app_log: the app group
+    from a console export instead), two alarms in ALARM, a /lab/db/ parameter tree and the
+    DB secret. .clients() returns the dict shape used by sub_implementation.collect_evidence
+    and the Lambda's client(); .calls counts every API call across all fakes.
+    """
+
+    def __init__(self, query_base: float = 1.0, scan_rate: float = 50000.0, api_latency: float = 0.02,
+                 repeat: int = 1, ssm_params: int = 35, max_concurrent: int = 30, fixtures: str = FIXTURES,
+                 app_log: Optional[str] = None):
+        self.calls: Counter = Counter()
+        lock = threading.Lock()
+        kw = {"api_latency": api_latency, "calls": self.calls, "lock": lock}
+        self.logs = FakeLogsInsights(
+            {
+                APP_LOG_GROUP: LogGroup(APP_LOG_GROUP, load_console_export(app_log) if app_log
+                                        else load_fixture(os.path.join(fixtures, "app_logs.jsonl")), repeat),
+                WAF_LOG_GROUP: LogGroup(WAF_LOG_GROUP, load_fixture(os.path.join(fixtures, "waf_logs.jsonl")), repeat),
+            },
+            query_base=query_base, scan_rate=scan_rate, max_concurrent=max_concurrent, **kw)
+        now = datetime.now(timezone.utc)
+        self.cloudwatch = FakeCloudWatch([
+            {"AlarmName": "lab-db-connection-errors", "StateValue": "ALARM", "Namespace": "Lab/RDSApp",
+             "MetricName": "DBConnectionErrors", "Statistic": "Sum", "Threshold": 3.0,
+             "StateReason": "Threshold Crossed: 1 datapoint [27.0] was >= the threshold (3.0).",
+             "StateUpdatedTimestamp": now},
+            {"AlarmName": "edge-waf-blocks-spike", "StateValue": "ALARM", "Namespace": "AWS/WAFV2",
+             "MetricName": "BlockedRequests", "Statistic": "Sum", "Threshold": 50.0,
+             "StateReason": "Threshold Crossed: 1 datapoint [88.0] was >= the threshold (50.0).",
+             "StateUpdatedTimestamp": now},
+        ], **kw)
+        params = {"/lab/db/endpoint": "lab-db.cluster-abc.ap-northeast-1.rds.amazonaws.com",
+                  "/lab/db/port": "3306", "/lab/db/name": "labdb", "/lab/db/username": "admin"}
+        params.update({f"/lab/db/feature/{i:03d}": "on" for i in range(max(0, ssm_params - len(params)))})
+        self.ssm = FakeSSM(params, **kw)
+        self.secretsmanager = FakeSecrets({SECRET_ID: {"rotation": True, "value": {
+            "host": params["/lab/db/endpoint"], "port": 3306, "dbname": "labdb", "username": "admin",
+            "password": "not-a-real-password"}}}, **kw)
+        self.s3 = FakeS3(**kw)
+        self.sns = FakeSNS(**kw)
+
+    def clients(self) -> Dict[str, object]:
+        return {"cloudwatch": self.cloudwatch, "logs": self.logs, "ssm": self.ssm,
+                "secretsmanager": self.secretsmanager, "s3": self.s3, "sns": self.sns}
+
+
+if __name__ == "__main__":
+    emu = Emulator(query_base=0, api_latency=0)
+    from galactus_queries import QUERIES
+
+    for q in QUERIES.values():
+        group = APP_LOG_GROUP if q.source == "app" else WAF_LOG_GROUP
+        rows = evaluate(q.render(), emu.logs.groups[group].records)
+        print(f"{q.name}: {len(rows)} rows; first: {to_results(rows[:1])}")
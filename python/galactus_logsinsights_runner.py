@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
-import boto3, time, argparse
+import boto3, time, argparse, csv, functools, hashlib, heapq, itertools, json, os, re, sqlite3, sys, threading
+from collections import Counter
 from datetime import datetime, timezone, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
 # Galactus wants answers extracted from chaos—logs.
 
@@ -8,38 +10,1110 @@ from datetime import datetime, timezone, timedelta
 
 # This is an automated Logs Insights runner to standardize incident queries and return
 #  consistent evidence blocks for reports and paging."
+#
+# It is also the shared query executor for galactus_cli (insights, collect-evidence) and
+# galactus_waf_summary: a batch of queries is started at once and their get_query_results
+# polling is multiplexed on one loop, so a batch takes as long as its slowest query.
+# Each query backs off on its own schedule and Running partial rows can be streamed.
 
-logs = boto3.client("logs")
+# Logs Insights allows 30 concurrent queries per account and region, shared by every
+# responder running these tools during an incident; stay well under it by default.
+MAX_CONCURRENT_QUERIES = 10
+POLL_MIN_SECONDS = 0.5
+POLL_MAX_SECONDS = 5.0
+FAILED_STATUSES = ("Failed", "Cancelled", "Timeout", "Unknown")
 
-def run_query(group, query, minutes=15, limit=25):
-    end = int(datetime.now(timezone.utc).timestamp())
-    start = int((datetime.now(timezone.utc) - timedelta(minutes=minutes)).timestamp())
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc)
 
-    qid = logs.start_query(
-        logGroupName=group, startTime=start, endTime=end,
-        queryString=query, limit=limit
-    )["queryId"]
+def epoch(dt: datetime) -> int:
+    return int(dt.timestamp())
 
-    for _ in range(30):
-        r = logs.get_query_results(queryId=qid)
-        if r["status"] == "Complete":
-            return r["results"]
-        if r["status"] in ("Failed", "Cancelled", "Timeout"):
-            raise RuntimeError(f"Query ended: {r['status']}")
-        time.sleep(1)
-    raise TimeoutError("Logs Insights query timed out")
+def window(minutes: int, end: Optional[datetime] = None) -> Tuple[int, int]:
+    """(startTime, endTime) epoch seconds for the last `minutes` up to `end` (default: now)."""
+    end = end or utc_now()
+    return epoch(end - timedelta(minutes=minutes)), epoch(end)
+
+def rows_to_dicts(results) -> List[Dict[str, str]]:
+    # Logs Insights returns list of rows; each row is list of {field,value}
+    return [{x.get("field"): x.get("value") for x in row} for row in results]
+
+
+class InsightsQuery:
+    """One Logs Insights query and, once run_queries returns, its outcome."""
+
+    def __init__(self, name: str, log_group: Union[str, Sequence[str]], query: str,
+                 start: int, end: int, limit: Optional[int] = None, region: Optional[str] = None):
+        self.name = name
+        self.region = region
+        self.log_groups = [log_group] if isinstance(log_group, str) else list(log_group)
+        self.query = query
+        self.start = start
+        self.end = end
+        self.limit = limit
+        self.query_id: Optional[str] = None
+        self.status = "Pending"
+        self.results: list = []
+        self.statistics: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self.polls = 0
+        self.scan_rate = 0.0
+        self.started_at: Optional[float] = None  # time.monotonic() when started (or attached)
+        self.wall_seconds = 0.0
+        self.cached = False
+        self.deduped = False
+        self._seen: set = set()
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "Complete"
+
+    def adopt(self, other: "InsightsQuery") -> None:
+        """Take the outcome of an identical query that ran in our place."""
+        self.query_id, self.status, self.results = other.query_id, other.status, other.results
+        self.statistics, self.error, self.deduped = other.statistics, other.error, True
+
+    def start_kwargs(self) -> dict:
+        kwargs = {"startTime": self.start, "endTime": self.end, "queryString": self.query}
+        if len(self.log_groups) == 1:
+            kwargs["logGroupName"] = self.log_groups[0]
+        else:
+            kwargs["logGroupNames"] = self.log_groups
+        if self.limit:
+            kwargs["limit"] = self.limit
+        return kwargs
+
+    def rows(self) -> List[Dict[str, str]]:
+        """Result rows as dicts; raises if the query did not complete."""
+        if self.status == "Complete":
+            return rows_to_dicts(self.results)
+        if self.status == "Timeout":
+            raise TimeoutError(f"Logs Insights query timed out: {self.name}")
+        raise RuntimeError(f"Logs Insights query {self.name} ended: {self.status}"
+                           + (f" ({self.error})" if self.error else ""))
+
+
+class LogsClients:
+    """
+    boto3 logs clients per region, created on first use. Pass one of these instead of a
+    single client to run a batch whose queries carry different .region values; None means
+    the default region.
+    """
+
+    def __init__(self, default_region: Optional[str] = None, factory=None):
+        self.default_region = default_region
+        self.factory = factory or (lambda region: boto3.client("logs", region_name=region) if region
+                                   else boto3.client("logs"))
+        self.clients: Dict[Optional[str], object] = {}
+
+    def for_region(self, region: Optional[str]):
+        region = region or self.default_region
+        if region not in self.clients:
+            self.clients[region] = self.factory(region)
+        return self.clients[region]
+
+def _client(logs, q: InsightsQuery):
+    return logs.for_region(q.region) if isinstance(logs, LogsClients) else logs
+
+def _is_limit_exceeded(e: Exception) -> bool:
+    code = getattr(e, "response", {}).get("Error", {}).get("Code", "")
+    return code in ("LimitExceededException", "ThrottlingException")
+
+
+class AdaptivePoller:
+    """
+    Per-query poll schedule. While statistics.recordsScanned keeps growing the query is
+    still scanning, so the delay doubles up to max_delay. Once the scan stops growing
+    (only aggregation/sort is left) or new rows show up, completion is close and the
+    delay drops back to min_delay.
+    """
+
+    def __init__(self, min_delay: float = POLL_MIN_SECONDS, max_delay: float = POLL_MAX_SECONDS):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.delay = min_delay
+        self.scanned: Optional[float] = None
+        self.rate = 0.0
+        self._last: Optional[float] = None
+
+    def observe(self, now: float, statistics: Dict[str, float], new_rows: int) -> float:
+        scanned = float(statistics.get("recordsScanned", 0.0))
+        if self._last is not None and now > self._last:
+            self.rate = max(0.0, scanned - self.scanned) / (now - self._last)
+        plateau = self.scanned is not None and scanned > 0 and scanned == self.scanned
+        self.delay = self.min_delay if (new_rows or plateau) else min(self.delay * 2, self.max_delay)
+        self.scanned, self._last = scanned, now
+        return self.delay
+
+
+# Pipeline commands that make Running results provisional: a later record can displace a row
+# already returned (sort/limit keep the best N seen so far, dedup keeps the first per key).
+UNSTABLE_COMMANDS = ("sort", "limit", "dedup")
+
+def streams_partial_rows(query: str) -> bool:
+    """True when rows of a Running query are final and can be handed out before it completes."""
+    return not any(_command(p) in UNSTABLE_COMMANDS for p in split_pipeline(query))
+
+def _take_new_rows(q: InsightsQuery, results: list, final: bool) -> list:
+    """
+    Rows not handed out yet. Running results are partial: rows with an @ptr are final
+    records and are streamed (deduped by @ptr), unless the query sorts, limits or dedups
+    (UNSTABLE_COMMANDS). Rows without an @ptr (stats aggregates) can still change; they,
+    and every row of an unstable query, are only released when the query completes.
+    """
+    if not final and not streams_partial_rows(q.query):
+        return []
+    new = []
+    for row in results:
+        ptr = next((x.get("value") for x in row if x.get("field") == "@ptr"), None)
+        if ptr is None:
+            if final:
+                new.append(row)
+        elif ptr not in q._seen:
+            q._seen.add(ptr)
+            new.append(row)
+    return new
+
+# Called with every query once it settles (Complete, failed, timed out or served from the
+# cache); see QueryStats.
+QUERY_HOOKS: List = []
+
+def _settle(q: InsightsQuery) -> None:
+    if q.started_at is not None:
+        q.wall_seconds = time.monotonic() - q.started_at
+    for hook in list(QUERY_HOOKS):
+        hook(q)
+
+def stream_queries(logs, queries: List[InsightsQuery], max_concurrent: int = MAX_CONCURRENT_QUERIES,
+                   timeout: float = 60.0, on_start: Optional[Callable[[InsightsQuery], None]] = None
+                   ) -> Iterator[Tuple[InsightsQuery, list]]:
+    """
+    Start up to max_concurrent queries per region and poll each on its own AdaptivePoller schedule,
+    sleeping only until the next query is due. Yields (query, new_rows) after every poll,
+    including Running polls with partial rows (new_rows may be empty; query.statistics and
+    query.scan_rate are fresh either way). Queries refused with LimitExceededException go
+    back on the queue. on_start(query) is called as soon as a query has its queryId.
+    Queries still running at `timeout`, or when the consumer closes the generator early, are
+    stopped and marked Timeout / Cancelled; queries attached to another run's queryId
+    (deduped) are only abandoned, never stopped.
+    Never raises for a single failed query: check each query's status / call .rows().
+    """
+    pending = list(queries)
+    running: Dict[InsightsQuery, AdaptivePoller] = {}
+    due: Dict[InsightsQuery, float] = {}
+    active: Counter = Counter()           # running queries per region (the quota is per region)
+    retry_at: Dict[Optional[str], float] = {}
+    start_delay: Dict[Optional[str], float] = {}
+    deadline = time.monotonic() + timeout
+
+    def can_start(q: InsightsQuery, now: float) -> bool:
+        return active[q.region] < max_concurrent and now >= retry_at.get(q.region, 0.0)
+
+    def stop(q: InsightsQuery) -> None:
+        if not q.deduped:  # an attached query is someone else's scan
+            try:
+                _client(logs, q).stop_query(queryId=q.query_id)
+            except Exception:
+                pass
+
+    try:
+        while pending or running:
+            now = time.monotonic()
+            for q in list(pending):
+                if not can_start(q, now):
+                    continue
+                if q.query_id:
+                    # Already started elsewhere (see run_queries_cached): just poll it.
+                    pending.remove(q)
+                    active[q.region] += 1
+                    q.status, q.started_at = "Scheduled", now
+                    running[q] = AdaptivePoller()
+                    due[q] = now
+                    continue
+                try:
+                    q.query_id = _client(logs, q).start_query(**q.start_kwargs())["queryId"]
+                except Exception as e:
+                    if _is_limit_exceeded(e):
+                        delay = start_delay.get(q.region, POLL_MIN_SECONDS)
+                        retry_at[q.region] = now + delay
+                        start_delay[q.region] = min(delay * 2, POLL_MAX_SECONDS)
+                        continue
+                    pending.remove(q)
+                    q.status, q.error = "Failed", str(e)
+                    _settle(q)
+                    continue
+                pending.remove(q)
+                start_delay.pop(q.region, None)
+                active[q.region] += 1
+                q.status, q.started_at = "Scheduled", now
+                poller = AdaptivePoller()
+                running[q] = poller
+                due[q] = now + poller.delay
+                if on_start:
+                    on_start(q)
+
+            if not pending and not running:
+                break
+            if now >= deadline:
+                for q in running:
+                    stop(q)
+                    q.status = "Timeout"
+                    _settle(q)
+                running.clear()
+                for q in pending:
+                    q.status = "Timeout"
+                    _settle(q)
+                return
+
+            waits = list(due.values()) + [max(retry_at.get(q.region, 0.0), now) for q in pending
+                                          if active[q.region] < max_concurrent]
+            wake = min(waits)
+            if wake > now:
+                time.sleep(min(wake, deadline) - now)
+                continue
+
+            for q in [k for k, t in due.items() if t <= now]:
+                poller = running[q]
+                try:
+                    r = _client(logs, q).get_query_results(queryId=q.query_id)
+                except Exception as e:
+                    if not _is_limit_exceeded(e):
+                        r = {"status": "Failed"}
+                        q.error = str(e)
+                    else:
+                        due[q] = time.monotonic() + poller.observe(time.monotonic(), q.statistics, 0)
+                        continue
+                q.polls += 1
+                q.status = r.get("status", "Unknown")
+                q.statistics = r.get("statistics", {}) or {}
+                final = q.status == "Complete"
+                new_rows = _take_new_rows(q, r.get("results", []), final)
+                if final:
+                    q.results = r.get("results", [])
+                q.scan_rate = poller.rate
+                if final or q.status in FAILED_STATUSES:
+                    del running[q], due[q]
+                    active[q.region] -= 1
+                    _settle(q)
+                else:
+                    due[q] = time.monotonic() + poller.observe(time.monotonic(), q.statistics, len(new_rows))
+                    q.scan_rate = poller.rate
+                yield q, new_rows
+    finally:
+        # The consumer stopped early (Ctrl-C, a broken pipe, a raising hook): stop our scans
+        # rather than leave them holding the region's concurrency quota.
+        for q in running:
+            stop(q)
+            q.status = "Cancelled"
+            _settle(q)
+
+def run_queries(logs, queries: List[InsightsQuery], max_concurrent: int = MAX_CONCURRENT_QUERIES,
+                timeout: float = 60.0) -> List[InsightsQuery]:
+    """
+    Run a batch to completion (see stream_queries) and return it. Identical queries in the
+    batch (same query_key) are started once and share the result.
+    """
+    leaders: Dict[str, InsightsQuery] = {}
+    followers: List[Tuple[InsightsQuery, InsightsQuery]] = []
+    for q in queries:
+        k = query_key(q)
+        if k in leaders:
+            followers.append((q, leaders[k]))
+        else:
+            leaders[k] = q
+    for _ in stream_queries(logs, list(leaders.values()), max_concurrent, timeout):
+        pass
+    for q, leader in followers:
+        q.adopt(leader)
+    return queries
+
+# ---------------------------
+# Query statistics
+# ---------------------------
+
+# Logs Insights bills by data scanned (us-east-1 list price; most regions are close).
+INSIGHTS_USD_PER_GB = 0.005
+EMF_NAMESPACE = "Galactus/LogsInsights"
+
+class QueryStats:
+    """
+    Per-query wall time, poll count, scan volume (get_query_results statistics) and
+    estimated cost for every query that settles while installed (see QUERY_HOOKS).
+    Queries served from the cache or attached to another run's queryId cost nothing here:
+    the scan was paid for once, by whoever started it. Thread-safe, so one instance covers
+    the evidence graph's worker threads too.
+    """
+
+    COLUMNS = ("query", "status", "wall_s", "polls", "records", "matched", "scanned_mb", "cost_usd")
+
+    def __init__(self, command: str = "", price_per_gb: float = INSIGHTS_USD_PER_GB):
+        self.command = command
+        self.price_per_gb = price_per_gb
+        self.records: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, q: InsightsQuery) -> None:
+        free = q.cached or q.deduped
+        scanned = 0.0 if free else float(q.statistics.get("bytesScanned", 0.0))
+        rec = {
+            "query": q.name,
+            "log_groups": q.log_groups,
+            "region": q.region,
+            "status": "Cached" if q.cached else q.status,
+            "wall_s": round(q.wall_seconds, 3),
+            "polls": q.polls,
+            "records": 0 if free else int(q.statistics.get("recordsScanned", 0)),
+            "matched": int(q.statistics.get("recordsMatched", 0)),
+            "bytes_scanned": int(scanned),
+            "cost_usd": scanned / 1e9 * self.price_per_gb,
+        }
+        with self._lock:
+            self.records.append(rec)
+
+    def install(self) -> "QueryStats":
+        QUERY_HOOKS.append(self)
+        return self
+
+    def uninstall(self) -> None:
+        if self in QUERY_HOOKS:
+            QUERY_HOOKS.remove(self)
+
+    def totals(self) -> Dict[str, object]:
+        with self._lock:
+            recs = list(self.records)
+        return {
+            "queries": len(recs),
+            "wall_s": round(max((r["wall_s"] for r in recs), default=0.0), 3),
+            "polls": sum(r["polls"] for r in recs),
+            "records": sum(r["records"] for r in recs),
+            "bytes_scanned": sum(r["bytes_scanned"] for r in recs),
+            "cost_usd": sum(r["cost_usd"] for r in recs),
+        }
+
+    def write_table(self, out=None) -> None:
+        """Summary table, most expensive query first (stderr by default, so piped rows stay clean)."""
+        out = out or sys.stderr
+        with self._lock:
+            recs = sorted(self.records, key=lambda r: (-r["bytes_scanned"], -r["wall_s"]))
+        if not recs:
+            return
+        rows = [[r["query"], r["status"], f"{r['wall_s']:.2f}", str(r["polls"]), f"{r['records']:,}",
+                 f"{r['matched']:,}", f"{r['bytes_scanned'] / 1e6:,.1f}", f"{r['cost_usd']:.6f}"] for r in recs]
+        t = self.totals()
+        rows.append(["TOTAL", f"{t['queries']} queries", f"{t['wall_s']:.2f}", str(t["polls"]), f"{t['records']:,}",
+                     "", f"{t['bytes_scanned'] / 1e6:,.1f}", f"{t['cost_usd']:.6f}"])
+        widths = [max(len(c), *(len(r[i]) for r in rows)) for i, c in enumerate(self.COLUMNS)]
+        line = lambda cells: "  ".join(c.ljust(w) if i < 2 else c.rjust(w) for i, (c, w) in enumerate(zip(cells, widths)))
+        title = f"[GALACTUS] Logs Insights usage{f' ({self.command})' if self.command else ''}"
+        out.write("\n".join([title, line(self.COLUMNS), line(["-" * w for w in widths])] + [line(r) for r in rows]) + "\n")
+        out.flush()
+
+    def write_emf(self, out, namespace: str = EMF_NAMESPACE) -> None:
+        """
+        One CloudWatch Embedded Metric Format line per query (dimensions Command, Query).
+        Written to a log stream CloudWatch ingests (Lambda stdout, the CloudWatch agent),
+        these become metrics without any PutMetricData calls.
+        """
+        with self._lock:
+            recs = list(self.records)
+        ts = int(time.time() * 1000)
+        metrics = [{"Name": "WallTime", "Unit": "Seconds"}, {"Name": "Polls", "Unit": "Count"},
+                   {"Name": "RecordsScanned", "Unit": "Count"}, {"Name": "BytesScanned", "Unit": "Bytes"},
+                   {"Name": "EstimatedCostUSD", "Unit": "None"}]
+        for r in recs:
+            out.write(json.dumps({
+                "_aws": {"Timestamp": ts, "CloudWatchMetrics": [
+                    {"Namespace": namespace, "Dimensions": [["Command", "Query"]], "Metrics": metrics}]},
+                "Command": self.command or "galactus",
+                "Query": r["query"],
+                "Status": r["status"],
+                "LogGroups": r["log_groups"],
+                "WallTime": r["wall_s"],
+                "Polls": r["polls"],
+                "RecordsScanned": r["records"],
+                "BytesScanned": r["bytes_scanned"],
+                "EstimatedCostUSD": r["cost_usd"],
+            }, separators=(",", ":")) + "\n")
+        out.flush()
+
+def add_stats_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--no-query-stats", dest="query_stats", action="store_false",
+                    help="Do not print the Logs Insights usage table (wall time, polls, scan volume, cost) on stderr")
+    ap.add_argument("--emf", default=os.environ.get("GALACTUS_EMF"), metavar="PATH",
+                    help="Append per-query CloudWatch EMF metrics to PATH ('-' = stdout; default: $GALACTUS_EMF)")
+
+def report_query_stats(stats: QueryStats, args) -> None:
+    """Print/emit what add_stats_args asked for; commands without those flags get the table."""
+    stats.uninstall()
+    if getattr(args, "query_stats", True):
+        stats.write_table()
+    emf = getattr(args, "emf", None)
+    if emf == "-":
+        stats.write_emf(sys.stdout)
+    elif emf:
+        with open(emf, "a", encoding="utf-8") as f:
+            stats.write_emf(f)
+
+# ---------------------------
+# Result cache
+# ---------------------------
+
+CACHE_TTL_SECONDS = 300            # windows that reach into the last few minutes
+CACHE_CLOSED_TTL_SECONDS = 86400   # windows old enough that no more events will land in them
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# CloudWatch Logs ingestion lag: a window that ended this long ago is treated as closed.
+SETTLE_SECONDS = 300
+
+def aligned_window(minutes: int, end: Optional[datetime] = None) -> Tuple[int, int]:
+    """
+    Like window(), but starting on a whole minute: [hh:mm:00 - minutes, now]. Run through
+    window_queries with a cache, the whole minutes are one cacheable query (responders in
+    the same minute share its key) and the open tail up to now is queried fresh.
+    """
+    end_s = epoch(end or utc_now())
+    return end_s // 60 * 60 - minutes * 60, end_s
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical text for cache keys: one space between tokens, ' | ' between commands.
+    Whitespace inside string and /regex/ literals is part of the query and kept as is.
+    """
+    parts = []
+    for part in split_pipeline(query):
+        buf = []
+        for ch, literal in _scan_literals(part):
+            if literal or not ch.isspace():
+                buf.append(ch)
+            elif buf and buf[-1] != " ":
+                buf.append(" ")
+        parts.append("".join(buf).strip())
+    return " | ".join(parts)
+
+def query_key(q: InsightsQuery) -> str:
+    """Identity of a query's result: region, log groups, normalized text, window and limit."""
+    ident = json.dumps([q.region, sorted(q.log_groups), normalize_query(q.query), q.start, q.end, q.limit])
+    return hashlib.sha256(ident.encode("utf-8")).hexdigest()
+
+class QueryCache:
+    """
+    SQLite cache of completed Logs Insights results keyed by (log groups, normalized query,
+    start, end, limit). Windows that ended more than SETTLE_SECONDS ago are closed and kept
+    for closed_ttl; windows that are still filling expire after ttl. The file is kept under
+    max_bytes by evicting the least recently used entries.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS results (
+            key        TEXT PRIMARY KEY,
+            log_groups TEXT NOT NULL,
+            query      TEXT NOT NULL,
+            start_time INTEGER NOT NULL,
+            end_time   INTEGER NOT NULL,
+            results    TEXT NOT NULL,
+            bytes      INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            last_used  REAL NOT NULL
+        )
+    """
+
+    INFLIGHT_SCHEMA = """
+        CREATE TABLE IF NOT EXISTS inflight (
+            key        TEXT PRIMARY KEY,
+            query_id   TEXT NOT NULL,
+            started_at REAL NOT NULL
+        )
+    """
+
+    def __init__(self, path: str, ttl: float = CACHE_TTL_SECONDS, closed_ttl: float = CACHE_CLOSED_TTL_SECONDS,
+                 max_bytes: int = CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.closed_ttl = closed_ttl
+        self.max_bytes = max_bytes
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute(self.SCHEMA)
+        self.db.execute(self.INFLIGHT_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    key = staticmethod(query_key)
+
+    def get(self, q: InsightsQuery) -> bool:
+        """Fill q from the cache (status Complete, q.cached True) if a live entry exists."""
+        now = time.time()
+        row = self.db.execute("SELECT results, expires_at FROM results WHERE key = ?", (self.key(q),)).fetchone()
+        if not row or row[1] <= now:
+            self.misses += 1
+            return False
+        self.db.execute("UPDATE results SET last_used = ? WHERE key = ?", (now, self.key(q)))
+        self.db.commit()
+        q.status, q.results, q.cached = "Complete", json.loads(row[0]), True
+        self.hits += 1
+        return True
+
+    def put(self, q: InsightsQuery) -> None:
+        now = time.time()
+        if not q.ok or q.cached or q.end >= int(now) // 60 * 60:
+            return  # a window reaching into the current minute is still growing: never reused
+        closed = q.end <= now - SETTLE_SECONDS
+        blob = json.dumps(q.results, separators=(",", ":"))
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.key(q), json.dumps(sorted(q.log_groups)), normalize_query(q.query), q.start, q.end,
+             blob, len(blob), now + (self.closed_ttl if closed else self.ttl), now),
+        )
+        self.evict(now)
+        self.db.commit()
+
+    def inflight(self, q: InsightsQuery, max_age: float) -> Optional[str]:
+        """queryId of an identical query another run started less than max_age seconds ago."""
+        row = self.db.execute("SELECT query_id, started_at FROM inflight WHERE key = ?", (self.key(q),)).fetchone()
+        return row[0] if row and row[1] > time.time() - max_age else None
+
+    def mark_inflight(self, q: InsightsQuery) -> None:
+        self.db.execute("INSERT OR REPLACE INTO inflight VALUES (?, ?, ?)", (self.key(q), q.query_id, time.time()))
+        self.db.commit()
+
+    def clear_inflight(self, q: InsightsQuery) -> None:
+        self.db.execute("DELETE FROM inflight WHERE key = ? AND query_id = ?", (self.key(q), q.query_id))
+        self.db.commit()
+
+    def evict(self, now: Optional[float] = None) -> None:
+        """Drop expired entries, then least recently used ones until under max_bytes."""
+        self.db.execute("DELETE FROM results WHERE expires_at <= ?", (now or time.time(),))
+        total = self.db.execute("SELECT COALESCE(SUM(bytes), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        drop = []
+        for key, size in self.db.execute("SELECT key, bytes FROM results ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            drop.append((key,))
+            total -= size
+        self.db.executemany("DELETE FROM results WHERE key = ?", drop)
+
+def add_cache_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--cache", default=os.environ.get("GALACTUS_INSIGHTS_CACHE"),
+                    help="SQLite result cache (default: $GALACTUS_INSIGHTS_CACHE; unset = no cache). "
+                         "Windows are snapped to whole minutes when caching")
+    ap.add_argument("--cache-ttl", type=float, default=CACHE_TTL_SECONDS,
+                    help=f"Seconds to reuse results for windows that are still filling (default: {CACHE_TTL_SECONDS})")
+
+def cache_from_args(args) -> Optional[QueryCache]:
+    return QueryCache(args.cache, ttl=args.cache_ttl) if args.cache else None
+
+def run_queries_cached(logs, queries: List[InsightsQuery], cache: Optional[QueryCache] = None,
+                       max_concurrent: int = MAX_CONCURRENT_QUERIES, timeout: float = 60.0) -> List[InsightsQuery]:
+    """
+    run_queries, serving cached queries from `cache` and storing the ones that complete.
+    Started queries are registered in the cache's inflight table as soon as they have a
+    queryId, so another responder running the same query (same cache file) polls our
+    queryId instead of starting a second scan; we do the same for theirs.
+    """
+    if cache is None:
+        return run_queries(logs, queries, max_concurrent, timeout)
+    misses = []
+    for q in queries:
+        if cache.get(q):
+            _settle(q)
+        else:
+            misses.append(q)
+    leaders: Dict[str, InsightsQuery] = {}
+    for q in misses:
+        leaders.setdefault(cache.key(q), q)
+    for q in leaders.values():
+        q.query_id = cache.inflight(q, timeout)
+        q.deduped = q.query_id is not None
+    try:
+        for _ in stream_queries(logs, list(leaders.values()), max_concurrent, timeout, on_start=cache.mark_inflight):
+            pass
+    finally:
+        for q in leaders.values():
+            if q.query_id:
+                cache.clear_inflight(q)
+    for q in misses:
+        leader = leaders[cache.key(q)]
+        if q is not leader:
+            q.adopt(leader)
+        cache.put(q)
+    return queries
+
+# ---------------------------
+# Time-sharded queries
+# ---------------------------
+#
+# One query over a wide window hits the 10,000-row result cap and the 60-minute query
+# timeout. A sharded query splits [start, end] into N disjoint sub-ranges, runs them as one
+# batch and merges the shard results locally:
+#   - `stats ... by ...`: shards run without the trailing sort/limit and their groups are
+#     re-aggregated (count/sum add, min/max compare), then sort/limit are applied here.
+#   - otherwise: each shard keeps its sort/limit and the shard results are k-way merged on
+#     the sort keys (e.g. sort @timestamp desc | limit 50) before the limit is re-applied.
+#
+# StartQuery takes whole epoch seconds and documents both ends as inclusive, but events carry
+# millisecond timestamps and it does not say whether endTime=e covers e.999 or stops at
+# e.000. Record shards therefore share their boundary second (end_i == start_{i+1}) and the
+# merge drops the rows seen twice by @ptr, which is exact under either reading. Stats rows
+# cannot be de-duplicated, so stats shards stay disjoint (end_i + 1 == start_{i+1}) and rely
+# on endTime covering its whole second (the emulator's endTime*1000 + 999).
+
+MAX_RESULT_ROWS = 10000
+REAGGREGATABLE = ("count", "sum", "min", "max")
+
+def _scan_literals(text: str) -> Iterator[Tuple[str, bool]]:
+    """(char, inside a quoted string or /regex/ literal) for every character of a query."""
+    quote = None
+    for i, ch in enumerate(text):
+        if quote:
+            yield ch, True
+            if ch == quote and text[i - 1] != "\\":
+                quote = None
+            continue
+        if ch in "\"'`":
+            quote = ch
+        elif ch == "/" and re.search(r"(\blike|=~|[(,])\s*$", text[:i]):
+            quote = "/"
+        yield ch, quote is not None
+
+def split_pipeline(query: str) -> List[str]:
+    """Split a Logs Insights query on top-level `|` (not inside quotes or /regex/ literals)."""
+    parts, buf = [], []
+    for ch, literal in _scan_literals(query):
+        if ch == "|" and not literal:
+            parts.append("".join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+    parts.append("".join(buf).strip())
+    return [p for p in parts if p]
+
+def _split_top(text: str, sep: str = ",") -> List[str]:
+    out, buf, depth = [], [], 0
+    for ch in text:
+        depth += (ch == "(") - (ch == ")")
+        if ch == sep and depth == 0:
+            out.append("".join(buf).strip())
+            buf = []
+        else:
+            buf.append(ch)
+    out.append("".join(buf).strip())
+    return [x for x in out if x]
+
+def _column(expr: str) -> Tuple[str, str]:
+    """(expression, result column name) for `expr [as alias]`."""
+    m = re.match(r"(?is)^(.*?)\s+as\s+([\w.@]+)$", expr.strip())
+    return (m.group(1).strip(), m.group(2)) if m else (expr.strip(), expr.strip())
+
+def _command(part: str) -> str:
+    return part.split(None, 1)[0].lower()
+
+def parse_sort(part: str) -> List[Tuple[str, bool]]:
+    """`sort a desc, b` -> [("a", True), ("b", False)] (descending flag; default ascending)."""
+    keys = []
+    for item in _split_top(part.split(None, 1)[1]):
+        tokens = item.split()
+        keys.append((tokens[0], len(tokens) > 1 and tokens[1].lower() == "desc"))
+    return keys
+
+class ShardPlan:
+    """How a query is split across shards and how the shard results are merged back."""
+
+    def __init__(self, query: str, limit: Optional[int] = None):
+        parts = split_pipeline(query)
+        stats_at = [i for i, p in enumerate(parts) if _command(p) == "stats"]
+        self.aggregates: List[Tuple[str, str]] = []  # (function, column)
+        self.group_by: List[str] = []
+        self.sort: List[Tuple[str, bool]] = []
+        self.limit = limit
+        tail = parts[stats_at[-1] + 1:] if stats_at else parts
+        for p in tail:
+            if _command(p) == "sort":
+                self.sort = parse_sort(p)
+            elif _command(p) == "limit":
+                self.limit = min(int(p.split()[1]), limit or MAX_RESULT_ROWS)
+
+        if not stats_at:
+            self.shard_query = query
+            self.shard_limit = limit
+            return
+        if len(stats_at) > 1:
+            raise ValueError("Cannot shard a query with more than one stats command")
+        bad = [p for p in tail if _command(p) not in ("sort", "limit")]
+        if bad:
+            raise ValueError(f"Cannot shard: only sort/limit may follow stats (found: {bad[0]!r})")
+
+        body = parts[stats_at[0]].split(None, 1)[1]
+        m = re.search(r"(?i)\s+by\s+", body)
+        aggs, by = (body[:m.start()], body[m.end():]) if m else (body, "")
+        for expr in _split_top(aggs):
+            fn_expr, col = _column(expr)
+            fn = fn_expr.split("(", 1)[0].strip().lower()
+            if fn not in REAGGREGATABLE:
+                raise ValueError(f"Cannot shard: {fn}() cannot be re-aggregated across shards "
+                                 f"(supported: {', '.join(REAGGREGATABLE)})")
+            self.aggregates.append((fn, col))
+        self.group_by = [_column(x)[1] for x in _split_top(by)]
+        self.shard_query = " | ".join(parts[:stats_at[0] + 1])
+        self.shard_limit = MAX_RESULT_ROWS
+
+    @property
+    def is_stats(self) -> bool:
+        return bool(self.aggregates)
+
+    def merge(self, shard_rows: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        if self.is_stats:
+            rows = self._reaggregate(shard_rows)
+            if self.sort:
+                rows = _sorted(rows, self.sort)
+        elif self.sort:
+            rows = heapq.merge(*shard_rows, key=_sort_key(self.sort))
+        else:
+            rows = itertools.chain.from_iterable(shard_rows)
+        if not self.is_stats and len(shard_rows) > 1:
+            rows = _unique_records(rows)
+        return list(itertools.islice(rows, self.limit)) if self.limit else list(rows)
+
+    def _reaggregate(self, shard_rows: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        groups: Dict[tuple, Dict[str, object]] = {}
+        for rows in shard_rows:
+            for row in rows:
+                key = tuple(row.get(g) for g in self.group_by)
+                acc = groups.get(key)
+                if acc is None:
+                    groups[key] = {col: _number(row.get(col)) for _, col in self.aggregates}
+                    continue
+                for fn, col in self.aggregates:
+                    v = _number(row.get(col))
+                    if v is None:
+                        continue
+                    if acc[col] is None:
+                        acc[col] = v
+                    elif fn in ("count", "sum"):
+                        acc[col] += v
+                    elif fn == "min":
+                        acc[col] = min(acc[col], v)
+                    else:
+                        acc[col] = max(acc[col], v)
+        out = []
+        for key, acc in groups.items():
+            row = {g: v for g, v in zip(self.group_by, key) if v is not None}
+            row.update({col: _fmt_number(v) for col, v in acc.items()})
+            out.append(row)
+        return out
+
+def _unique_records(rows: Iterable[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+    """Drop records returned by both shards of a shared boundary second (same @ptr)."""
+    seen = set()
+    for row in rows:
+        ptr = row.get("@ptr")
+        if ptr is not None:
+            if ptr in seen:
+                continue
+            seen.add(ptr)
+        yield row
+
+def _number(value: Optional[str]) -> Optional[Union[int, float]]:
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+def _fmt_number(v) -> Optional[str]:
+    if v is None:
+        return None
+    return str(int(v)) if isinstance(v, int) or float(v).is_integer() else repr(float(v))
+
+def _sort_key(keys: List[Tuple[str, bool]]):
+    """heapq.merge key for a multi-column sort with per-column direction."""
+
+    def key(row):
+        out = []
+        for field, desc in keys:
+            v = row.get(field)
+            n = _try_float(v)
+            if n is not None:
+                out.append((0, -n if desc else n, ""))
+            else:
+                s = v or ""
+                out.append((1, 0, _Reversed(s) if desc else s))
+        return tuple(out)
+
+    return key
+
+def _sorted(rows: List[Dict[str, str]], keys: List[Tuple[str, bool]]) -> List[Dict[str, str]]:
+    return sorted(rows, key=_sort_key(keys))
+
+def _try_float(v) -> Optional[float]:
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+class _Reversed(str):
+    """String that sorts in reverse, for descending non-numeric sort keys (e.g. @timestamp)."""
+
+    def __lt__(self, other):
+        return str.__gt__(self, other)
+
+    def __gt__(self, other):
+        return str.__lt__(self, other)
+
+@functools.lru_cache(maxsize=256)
+def shard_plan(query: str, limit: Optional[int] = None) -> ShardPlan:
+    """Parsed ShardPlan, memoized: named queries re-run with the same text skip re-parsing."""
+    return ShardPlan(query, limit)
+
+def shard_window(start: int, end: int, shards: int) -> List[Tuple[int, int]]:
+    """Split inclusive [start, end] epoch seconds into `shards` disjoint inclusive ranges."""
+    shards = max(1, min(shards, end - start + 1))
+    edges = [start + (end - start + 1) * i // shards for i in range(shards + 1)]
+    return [(edges[i], edges[i + 1] - 1) for i in range(shards)]
+
+def minute_shards(start: int, end: int, shards: int) -> List[Tuple[int, int]]:
+    """
+    shard_window on a fixed grid of whole-minute blocks (multiples of the shard size from
+    the epoch), so two windows that overlap produce identical inner shards. The open tail
+    after the window's last whole minute (up to now, see aligned_window) is a shard of its own.
+    """
+    tail = (end + 1) // 60 * 60
+    if tail <= start:
+        return [(start, end)]
+    size = max(60, ((tail - start) // max(1, shards)) // 60 * 60)
+    grid = range((start // size + 1) * size, tail, size) if shards > 1 else []
+    edges = [start] + list(grid) + [tail, end + 1]
+    return [(a, b - 1) for a, b in zip(edges, edges[1:]) if b > a]
+
+def shard_queries(name: str, log_group, query: str, start: int, end: int, shards: int,
+                  limit: Optional[int] = None, region: Optional[str] = None,
+                  aligned: bool = False) -> Tuple[ShardPlan, List[InsightsQuery]]:
+    """The ShardPlan for `query` and its shard queries (not started yet)."""
+    plan = shard_plan(query, limit)
+    ranges = minute_shards(start, end, shards) if aligned else shard_window(start, end, shards)
+    if not plan.is_stats:
+        # share each inner boundary second with the next shard; merge de-duplicates by @ptr
+        ranges = [(s, e + 1) for s, e in ranges[:-1]] + ranges[-1:]
+    return plan, [InsightsQuery(f"{name}[{i}]", log_group, plan.shard_query, s, e, limit=plan.shard_limit,
+                                region=region)
+                  for i, (s, e) in enumerate(ranges)]
+
+def window_queries(name: str, log_group, query: str, start: int, end: int, shards: int = 1,
+                   limit: Optional[int] = None, region: Optional[str] = None,
+                   cached: bool = False) -> Tuple[Optional[ShardPlan], List[InsightsQuery]]:
+    """
+    (plan, queries) covering [start, end]: `shards` shards, and for a cache the whole minutes
+    split from the open tail (see minute_shards). plan is None for a single query; with a
+    cache, a query ShardPlan cannot merge is run whole (and its open window is not cached).
+    """
+    if shards > 1 or cached:
+        try:
+            return shard_queries(name, log_group, query, start, end, shards, limit, region, aligned=cached)
+        except ValueError:
+            if shards > 1:
+                raise
+    return None, [InsightsQuery(name, log_group, query, start, end, limit=limit, region=region)]
+
+def run_sharded(logs, name: str, log_group, query: str, start: int, end: int, shards: int,
+                limit: Optional[int] = None, max_concurrent: int = MAX_CONCURRENT_QUERIES,
+                timeout: float = 60.0, cache: Optional[QueryCache] = None, region: Optional[str] = None
+                ) -> Tuple[List[Dict[str, str]], List[InsightsQuery]]:
+    """
+    Run `query` as `shards` time-disjoint queries in one batch and merge the results
+    (see ShardPlan). Returns (merged rows, shard queries); raises if any shard failed,
+    since a merge over a missing shard would be silently wrong. With a cache, shards are
+    snapped to whole minutes so closed shards of overlapping windows are reused and only
+    the shards that are missing or still filling (and the open tail) get queried; that
+    holds for shards=1 too (see window_queries).
+    """
+    plan, batch = window_queries(name, log_group, query, start, end, shards, limit, region, cached=cache is not None)
+    run_queries_cached(logs, batch, cache, max_concurrent, timeout)
+    return (plan.merge([q.rows() for q in batch]) if plan else batch[0].rows()), batch
+
+# ---------------------------
+# Multi-region / multi-log-group fan-out
+# ---------------------------
+
+REGION_RE = re.compile(r"^[a-z]{2}(-gov)?-[a-z]+-\d+$")
+
+def parse_target(spec: str, default_region: Optional[str] = None) -> Tuple[Optional[str], str]:
+    """'ap-northeast-1:/aws/waf' -> ('ap-northeast-1', '/aws/waf'); a bare log group keeps default_region."""
+    region, sep, name = spec.partition(":")
+    if sep and REGION_RE.match(region) and name:
+        return region, name
+    return default_region, spec
+
+def target_label(region: Optional[str], log_group: str) -> str:
+    return f"{region}:{log_group}" if region else log_group
+
+def run_fanout(logs, targets: List[Tuple[Optional[str], str]], query: str, start: int, end: int,
+               shards: int = 1, limit: Optional[int] = None, max_concurrent: int = MAX_CONCURRENT_QUERIES,
+               timeout: float = 60.0, cache: Optional[QueryCache] = None
+               ) -> Tuple[List[Dict[str, str]], List[InsightsQuery]]:
+    """
+    Run `query` against every (region, log group) target in one batch (`logs` should be a
+    LogsClients when targets span regions) and return one table: each row gets a `source`
+    column, and rows are ordered by the query's own sort across all sources (so a
+    `sort @timestamp desc` becomes one cross-region timeline), then cut to its final limit
+    as ShardPlan.merge does for shards. Stats are not combined across sources. Raises if
+    any target failed, naming it.
+    """
+    per_target = []
+    batch: List[InsightsQuery] = []
+    for region, group in targets:
+        label = target_label(region, group)
+        plan, queries = window_queries(label, group, query, start, end, shards, limit, region,
+                                       cached=cache is not None)
+        per_target.append((label, plan, queries))
+        batch.extend(queries)
+    run_queries_cached(logs, batch, cache, max_concurrent, timeout)
+
+    rows: List[Dict[str, str]] = []
+    for label, plan, queries in per_target:
+        merged = plan.merge([q.rows() for q in queries]) if plan else queries[0].rows()
+        rows.extend(dict({"source": label}, **r) for r in merged)
+    sort = query_sort(query)
+    if sort:
+        rows = _sorted(rows, sort)
+    cap = query_limit(query, limit)
+    return (rows[:cap] if cap else rows), batch
+
+def query_sort(query: str) -> List[Tuple[str, bool]]:
+    """Sort keys of the query's last `sort` command ([] if it has none)."""
+    sorts = [p for p in split_pipeline(query) if _command(p) == "sort"]
+    return parse_sort(sorts[-1]) if sorts else []
+
+def query_limit(query: str, limit: Optional[int] = None) -> Optional[int]:
+    """Row cap of the query's final result: a `limit` after its last stats (capped by `limit`), else `limit`."""
+    cap = limit
+    for p in split_pipeline(query):
+        if _command(p) == "stats":
+            cap = limit
+        elif _command(p) == "limit":
+            cap = min(int(p.split()[1]), limit or MAX_RESULT_ROWS)
+    return cap
+
+# ---------------------------
+# Row output
+# ---------------------------
+
+OUTPUT_FORMATS = ("json", "ndjson", "csv", "table")
+
+class RowWriter:
+    """
+    Incremental result writer. ndjson and csv write (and flush) each row as it arrives, so
+    large result sets stream into jq / DuckDB / a SIEM without being held in memory; json
+    pretty-prints row by row as before. Only table buffers, since it needs column widths.
+    csv takes its header from the first row; later fields that are not in it are dropped
+    (with a warning on stderr). @ptr is kept in json/ndjson and hidden in csv/table.
+    """
+
+    def __init__(self, fmt: str = "json", out=None, hidden: Sequence[str] = ("@ptr",), owns_out: bool = False):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown format {fmt!r} (choose from {', '.join(OUTPUT_FORMATS)})")
+        self.fmt = fmt
+        self.out = out or sys.stdout
+        self.owns_out = owns_out
+        self.hidden = set(hidden) if fmt in ("csv", "table") else set()
+        self.rows = 0
+        self._csv = None
+        self._buffer: List[Dict[str, str]] = []
+        self._dropped: set = set()
+
+    def write(self, row: Dict[str, str]) -> None:
+        row = {k: v for k, v in row.items() if k not in self.hidden}
+        self.rows += 1
+        if self.fmt == "ndjson":
+            self.out.write(json.dumps(row, separators=(",", ":"), default=str) + "\n")
+            self.out.flush()
+        elif self.fmt == "json":
+            self.out.write(json.dumps(row, indent=2, default=str) + "\n")
+            self.out.flush()
+        elif self.fmt == "csv":
+            if self._csv is None:
+                self._csv = csv.DictWriter(self.out, fieldnames=list(row), extrasaction="ignore")
+                self._csv.writeheader()
+            extra = set(row) - set(self._csv.fieldnames) - self._dropped
+            if extra:
+                self._dropped |= extra
+                print(f"[GALACTUS] csv: dropping fields not in the header: {', '.join(sorted(extra))}",
+                      file=sys.stderr)
+            self._csv.writerow(row)
+            self.out.flush()
+        else:
+            self._buffer.append(row)
+
+    def write_all(self, rows: Iterable[Dict[str, str]]) -> None:
+        for row in rows:
+            self.write(row)
+
+    def close(self) -> None:
+        if self.fmt == "table":
+            rows, self._buffer = self._buffer, []
+            cols: List[str] = []
+            for r in rows:
+                cols.extend(k for k in r if k not in cols)
+            widths = {c: max([len(c)] + [len(str(r.get(c, ""))) for r in rows]) for c in cols}
+            self.out.write("  ".join(c.ljust(widths[c]) for c in cols).rstrip() + "\n")
+            self.out.write("  ".join("-" * widths[c] for c in cols) + "\n")
+            for r in rows:
+                self.out.write("  ".join(str(r.get(c, "")).ljust(widths[c]) for c in cols).rstrip() + "\n")
+        if self.owns_out:
+            self.out.close()
+        else:
+            self.out.flush()
+
+def open_row_writer(fmt: str, out_path: Optional[str] = None) -> RowWriter:
+    """RowWriter to out_path (created/truncated) or stdout."""
+    if not out_path:
+        return RowWriter(fmt)
+    return RowWriter(fmt, open(out_path, "w", encoding="utf-8", newline=""), owns_out=True)
+
+def run_query(logs, group, query, minutes=15, limit=25, timeout=60.0):
+    q = InsightsQuery("query", group, query, *window(minutes), limit=limit)
+    run_queries(logs, [q], timeout=timeout)
+    return q.rows()
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--log-group", required=True)
     ap.add_argument("--minutes", type=int, default=15)
     ap.add_argument("--query", required=True)
+    ap.add_argument("--format", choices=OUTPUT_FORMATS, default=None,
+                    help="Stream rows as json/ndjson/csv/table instead of printing dicts")
+    ap.add_argument("--out", default=None, help="Write rows to this file instead of stdout")
+    add_stats_args(ap)
     args = ap.parse_args()
 
-    results = run_query(args.log_group, args.query, args.minutes)
-    for row in results:
-        kv = {x["field"]: x["value"] for x in row}
-        print(kv)
+    stats = QueryStats("logsinsights_runner").install()
+    try:
+        _main(args)
+    finally:
+        report_query_stats(stats, args)
+
+def _main(args):
+    logs = boto3.client("logs")
+    if not args.format:
+        results = run_query(logs, args.log_group, args.query, args.minutes)
+        for kv in results:
+            print(kv)
+        return
+
+    q = InsightsQuery("query", args.log_group, args.query, *window(args.minutes), limit=25)
+    writer = open_row_writer(args.format, args.out)
+    try:
+        for _, rows in stream_queries(logs, [q]):
+            writer.write_all(rows_to_dicts(rows))
+    finally:
+        writer.close()
+    if not q.ok:
+        raise SystemExit(f"Logs Insights query ended: {q.status}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Named, parameterized Logs Insights queries for Galactus.
+
+One place for the incident queries that used to be pasted into collect-evidence,
+galactus_waf_summary and ir_reporter. Each query declares typed parameters; rendering
+validates and coerces them (CLI strings included), and the rendered text is memoized so
+repeated runs of the same (name, params) produce byte-identical query strings -- which is
+what lets the executor dedupe in-flight runs and the result cache hit.
+
+    python ./python/galactus_queries.py                       # list queries
+    python ./python/galactus_cli.py insights --log-group /aws/waf --named waf_top_ips --param limit=5
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from galactus_logsinsights_runner import split_pipeline
+
+
+class Param:
+    """A typed query parameter: int (with optional bounds) or str (with a required pattern)."""
+
+    def __init__(self, name: str, type_: type = int, default=None, minimum: Optional[int] = None,
+                 maximum: Optional[int] = None, pattern: Optional[str] = None, help: str = ""):
+        if type_ is str and not pattern:
+            raise ValueError(f"str parameter {name!r} needs a pattern (values are spliced into query text)")
+        self.name = name
+        self.type = type_
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.pattern = re.compile(pattern) if pattern else None
+        self.help = help
+
+    def coerce(self, value):
+        try:
+            value = self.type(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{self.name}: expected {self.type.__name__}, got {value!r}")
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{self.name}: must be >= {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{self.name}: must be <= {self.maximum}")
+        if self.pattern and not self.pattern.fullmatch(value):
+            raise ValueError(f"{self.name}: {value!r} does not match {self.pattern.pattern}")
+        return value
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.type.__name__}={self.default}"
+
+
+class NamedQuery:
+    """A query template ({param} placeholders) plus its parameters."""
+
+    def __init__(self, name: str, source: str, template: str, params: Sequence[Param] = (), description: str = ""):
+        self.name = name
+        self.source = source  # "app" or "waf": which log group it is written for
+        self.template = template
+        self.params = {p.name: p for p in params}
+        self.description = description
+        placeholders = set(re.findall(r"{(\w+)}", template))
+        if placeholders != set(self.params):
+            raise ValueError(f"{name}: placeholders {sorted(placeholders)} != params {sorted(self.params)}")
+
+    def bind(self, values: Optional[Dict[str, object]] = None) -> Tuple[Tuple[str, object], ...]:
+        """Validated, defaulted parameter values as a hashable tuple."""
+        values = dict(values or {})
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise ValueError(f"{self.name}: unknown parameter(s) {', '.join(sorted(unknown))} "
+                             f"(takes: {', '.join(p.describe() for p in self.params.values()) or 'none'})")
+        return tuple((n, p.coerce(values.get(n, p.default))) for n, p in sorted(self.params.items()))
+
+    def render(self, values: Optional[Dict[str, object]] = None) -> str:
+        return _render(self.name, self.bind(values))
+
+    def signature(self) -> str:
+        return f"{self.name}({', '.join(p.describe() for p in self.params.values())})"
+
+
+def _limit(default: int) -> Param:
+    return Param("limit", int, default, minimum=1, maximum=10000, help="rows to return")
+
+QUERIES: Dict[str, NamedQuery] = {q.name: q for q in (
+    NamedQuery(
+        "app_errors", "app",
+        "fields @timestamp, @message | filter @message like /{pattern}/ | sort @timestamp desc",
+        [Param("pattern", str, "ERROR|Exception", pattern=r"[^/\n]+", help="regex matched against @message")],
+        "Most recent error lines",
+    ),
+    NamedQuery(
+        "app_error_rate", "app",
+        "stats count() as errors by bin({bin})",
+        [Param("bin", str, "1m", pattern=r"\d+[smhd]", help="bin size, e.g. 1m, 5m")],
+        "Error count over time",
+    ),
+    NamedQuery(
+        "app_recent", "app",
+        "fields @timestamp, @message | sort @timestamp desc | limit {limit}",
+        [_limit(50)],
+        "Latest log lines",
+    ),
+    NamedQuery(
+        "waf_actions", "waf",
+        "stats count() as hits by action | sort hits desc",
+        [],
+        "Allow vs block",
+    ),
+    NamedQuery(
+        "waf_top_ips", "waf",
+        "stats count() as hits by httpRequest.clientIp | sort hits desc | limit {limit}",
+        [_limit(10)],
+        "Top client IPs",
+    ),
+    NamedQuery(
+        "waf_top_talkers", "waf",
+        "fields @timestamp, action, httpRequest.clientIp as clientIp, httpRequest.uri as uri "
+        "| stats count() as hits by action, clientIp, uri | sort hits desc | limit {limit}",
+        [_limit(25)],
+        "Top (action, client IP, URI) combinations",
+    ),
+)}
+
+
+@lru_cache(maxsize=None)
+def _render(name: str, bound: Tuple[Tuple[str, object], ...]) -> str:
+    return QUERIES[name].template.format(**dict(bound))
+
+def get(name: str) -> NamedQuery:
+    try:
+        return QUERIES[name]
+    except KeyError:
+        raise ValueError(f"Unknown named query {name!r} (known: {', '.join(sorted(QUERIES))})")
+
+def parse_params(pairs: Iterable[str]) -> Dict[str, str]:
+    """['limit=5', 'bin=5m'] -> {'limit': '5', 'bin': '5m'} (typed later by NamedQuery.bind)."""
+    out = {}
+    for pair in pairs or ():
+        key, sep, value = pair.partition("=")
+        if not sep or not key:
+            raise ValueError(f"--param expects NAME=VALUE, got {pair!r}")
+        out[key.strip()] = value.strip()
+    return out
+
+def render(name: str, params: Optional[Dict[str, object]] = None) -> str:
+    return get(name).render(params)
+
+def _validate_all() -> None:
+    # Fail at import, not mid-incident: every query renders with its defaults and splits cleanly.
+    for q in QUERIES.values():
+        text = q.render()
+        if not split_pipeline(text):
+            raise ValueError(f"{q.name}: empty query")
+
+
+_validate_all()
+
+
+if __name__ == "__main__":
+    for q in QUERIES.values():
+        print(f"{q.signature():45s} [{q.source}] {q.description}")
@@ -1,7 +1,9 @@
 
 #!/usr/bin/env python3
-import boto3, time, json, argparse
-from datetime import datetime, timezone, timedelta
+import boto3, json, argparse
+
+import galactus_queries
+from galactus_logsinsights_runner import InsightsQuery, QueryStats, add_stats_args, report_query_stats, run_queries, window
 
 # Reason why Darth Malgus would be pleased with this script.
 # He enjoys watching attacks get denied at the edge—statistics are trophies.
@@ -10,28 +12,30 @@ from datetime import datetime, timezone, timedelta
 # How you would talk about this script at an interview.
 # "I standardized WAF triage by querying logs and producing an audit-friendly summary."
 
-logs = boto3.client("logs")
-
-def run(group, query, minutes):
-    end = int(datetime.now(timezone.utc).timestamp())
-    start = int((datetime.now(timezone.utc)-timedelta(minutes=minutes)).timestamp())
-    qid = logs.start_query(logGroupName=group, startTime=start, endTime=end, queryString=query, limit=50)["queryId"]
-    for _ in range(30):
-        r = logs.get_query_results(queryId=qid)
-        if r["status"] == "Complete":
-            return [{x["field"]: x["value"] for x in row} for row in r["results"]]
-        time.sleep(1)
-    raise TimeoutError("Query timed out")
+def run(logs, group, queries, minutes):
+    # Both queries are started together; the summary takes as long as the slower one.
+    start, end = window(minutes)
+    batch = [InsightsQuery(name, group, query, start, end, limit=50) for name, query in queries.items()]
+    run_queries(logs, batch)
+    return {q.name: q.rows() for q in batch}
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--log-group", required=True)
     ap.add_argument("--minutes", type=int, default=30)
+    add_stats_args(ap)
     args = ap.parse_args()
 
-    actions = run(args.log_group, "stats count() as hits by action | sort hits desc", args.minutes)
-    top_ips = run(args.log_group, "stats count() as hits by httpRequest.clientIp | sort hits desc | limit 10", args.minutes)
-    print(json.dumps({"actions": actions, "top_ips": top_ips}, indent=2))
+    logs = boto3.client("logs")
+    stats = QueryStats("waf_summary").install()
+    try:
+        summary = run(logs, args.log_group, {
+            "actions": galactus_queries.render("waf_actions"),
+            "top_ips": galactus_queries.render("waf_top_ips", {"limit": 10}),
+        }, args.minutes)
+    finally:
+        report_query_stats(stats, args)
+    print(json.dumps(summary, indent=2))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
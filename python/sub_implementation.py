@@ -1,99 +1,288 @@
 # Collect alarm evidence bundle for IR triage: active alarms, recent log spikes, config metadata, etc.
+#
+# Wired into galactus_cli.py as the `collect-evidence` subcommand (parser: cli_parser.py).
 
-def cmd_collect_evidence(args):
-    cw = boto3.client("cloudwatch", region_name=args.region) if args.region else boto3.client("cloudwatch")
-    logs = boto3.client("logs", region_name=args.region) if args.region else boto3.client("logs")
-    ssm = boto3.client("ssm", region_name=args.region) if args.region else boto3.client("ssm")
-    secrets = boto3.client("secretsmanager", region_name=args.region) if args.region else boto3.client("secretsmanager")
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import timedelta
 
-    incident_id = args.incident_id or f"IR-{utc_now().strftime('%Y%m%d-%H%M%S')}"
-    end = utc_now()
-    start = end - timedelta(minutes=args.minutes)
+import boto3
+from botocore.config import Config
+
+import galactus_queries
+from galactus_logsinsights_runner import aligned_window, cache_from_args, epoch, run_sharded, utc_now
+
+EVIDENCE_QUERIES = {
+    "app": {
+        "app_errors": galactus_queries.render("app_errors"),
+        "app_rate": galactus_queries.render("app_error_rate"),
+    },
+    "waf": {
+        "waf_actions": galactus_queries.render("waf_actions"),
+        "waf_top_ips": galactus_queries.render("waf_top_ips"),
+    },
+}
+
+class EvidenceWriter:
+    """
+    json: sections are collected into one document written on close (the original bundle).
+    ndjson: each section is appended as soon as it is collected, one
+    {"incident_id", "section", "data"} line per row, so SIEM/jq consumers can start early
+    and a large bundle is never held as one document.
+    """
+
+    def __init__(self, path, fmt, incident_id):
+        self.path = path
+        self.fmt = fmt
+        self.incident_id = incident_id
+        self.doc = {"incident_id": incident_id}
+        self.f = open(path, "w", encoding="utf-8") if fmt == "ndjson" else None
+
+    def add(self, section, value):
+        if self.f is None:
+            node = self.doc
+            *parents, leaf = section.split(".")
+            for k in parents:
+                node = node.setdefault(k, {})
+            node[leaf] = value
+            return
+        for item in (value if isinstance(value, list) else [value]):
+            self.f.write(json.dumps({"incident_id": self.incident_id, "section": section, "data": item},
+                                    default=str) + "\n")
+        self.f.flush()
+
+    def checkpoint(self):
+        """json: atomically rewrite the partial bundle so far (ndjson is already on disk)."""
+        if self.f is None:
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.doc, f, indent=2, default=str)
+            os.replace(tmp, self.path)
+
+    def close(self):
+        if self.f is None:
+            self.checkpoint()
+        else:
+            self.f.close()
+
+
+# ---------------------------
+# Evidence tasks (dependency graph)
+# ---------------------------
+
+class EvidenceTask:
+    """
+    One evidence source. fn(results) gets the results of its deps (by task name) and
+    returns the section value. timeout is the task's whole budget, retries included.
+    """
+
+    def __init__(self, name, fn, deps=(), timeout=60.0, retries=1, section=None):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.retries = retries
+        self.section = section or name
+
+def _attempt(fn, results, delay):
+    if delay:
+        time.sleep(delay)
+    return fn(results)
+
+def run_dag(tasks, workers=8, on_done=None):
+    """
+    Run EvidenceTasks on a thread pool as soon as their deps have succeeded. A failed
+    attempt is retried (with backoff) while retries and time remain; a task past its
+    timeout is reported as "timeout" and abandoned (boto3 calls are bounded by the client
+    read timeout, so the thread does finish). Tasks whose deps did not succeed are
+    "skipped". on_done(task, status, value) is called from this thread as each task
+    settles. Returns {name: status dict}.
+    """
+    by_name = {t.name: t for t in tasks}
+    missing = {d for t in tasks for d in t.deps} - set(by_name)
+    if missing:
+        raise ValueError(f"Unknown evidence dependencies: {', '.join(sorted(missing))}")
 
-    evidence = {
-        "incident_id": incident_id,
-        "time_window_utc": {
-            "start": start.isoformat(),
-            "end": end.isoformat()
+    t0 = time.monotonic()
+    pending = dict(by_name)
+    results, status = {}, {}
+    running = {}  # future -> (task, attempt, started, deadline)
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def settle(task, state, started, attempts, value=None, error=None):
+        now = time.monotonic()
+        status[task.name] = {
+            "status": state,
+            "attempts": attempts,
+            "started_ms": int((started - t0) * 1000),
+            "elapsed_ms": int((now - started) * 1000),
         }
-    }
+        if error:
+            status[task.name]["error"] = error
+        if state == "ok":
+            results[task.name] = value
+        if on_done:
+            on_done(task, status[task.name], value)
+
+    try:
+        while pending or running:
+            for name, task in list(pending.items()):
+                states = [status.get(d, {}).get("status") for d in task.deps]
+                if any(st not in (None, "ok") for st in states):
+                    del pending[name]
+                    now = time.monotonic()
+                    settle(task, "skipped", now, 0, error="dependency did not succeed: " +
+                           ", ".join(d for d in task.deps if status.get(d, {}).get("status") != "ok"))
+                elif all(st == "ok" for st in states):
+                    del pending[name]
+                    now = time.monotonic()
+                    deps = {d: results[d] for d in task.deps}
+                    running[pool.submit(_attempt, task.fn, deps, 0)] = (task, 1, now, now + task.timeout)
+            if not running:
+                if pending:
+                    raise ValueError(f"Evidence dependency cycle: {', '.join(sorted(pending))}")
+                break
+
+            next_deadline = min(d for _, _, _, d in running.values())
+            done, _ = wait(list(running), timeout=max(0.0, next_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            for fut in done:
+                task, attempt, started, deadline = running.pop(fut)
+                try:
+                    value = fut.result()
+                except Exception as e:
+                    backoff = min(0.5 * 2 ** (attempt - 1), 4.0)
+                    if attempt <= task.retries and now + backoff < deadline:
+                        deps = {d: results[d] for d in task.deps}
+                        running[pool.submit(_attempt, task.fn, deps, backoff)] = (task, attempt + 1, started, deadline)
+                    else:
+                        settle(task, "failed", started, attempt, error=f"{type(e).__name__}: {e}")
+                    continue
+                settle(task, "ok", started, attempt, value)
+            for fut, (task, attempt, started, deadline) in list(running.items()):
+                if now >= deadline:
+                    del running[fut]
+                    fut.cancel()
+                    settle(task, "timeout", started, attempt, error=f"no result after {task.timeout:g}s")
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return status
+
+def evidence_clients(region, read_timeout):
+    """boto3 clients whose calls give up within the task budget (so abandoned threads end)."""
+    cfg = Config(connect_timeout=5, read_timeout=max(5, int(read_timeout)),
+                 retries={"max_attempts": 3, "mode": "standard"})
+    kw = {"region_name": region} if region else {}
+    return {name: boto3.client(name, config=cfg, **kw) for name in ("cloudwatch", "logs", "ssm", "secretsmanager")}
+
+def build_evidence_tasks(args, clients, start, end):
+    """The evidence graph for one bundle. Every source is independent today, so all start at once."""
+    cw, logs, ssm, secrets = (clients[k] for k in ("cloudwatch", "logs", "ssm", "secretsmanager"))
+    timeout = getattr(args, "task_timeout", 60.0)
+    retries = getattr(args, "retries", 1)
+    tasks = []
 
     # --- Alarms ---
-    alarms = cw.describe_alarms(StateValue="ALARM", MaxRecords=25).get("MetricAlarms", [])
-    evidence["alarms"] = [
-        {
-            "name": a["AlarmName"],
-            "metric": a.get("MetricName"),
-            "namespace": a.get("Namespace"),
-            "reason": a.get("StateReason"),
-            "updated": str(a.get("StateUpdatedTimestamp"))
-        }
-        for a in alarms
-    ]
+    def alarms(_):
+        resp = cw.describe_alarms(StateValue="ALARM", MaxRecords=25)
+        return [
+            {
+                "name": a["AlarmName"],
+                "metric": a.get("MetricName"),
+                "namespace": a.get("Namespace"),
+                "reason": a.get("StateReason"),
+                "updated": str(a.get("StateUpdatedTimestamp"))
+            }
+            for a in resp.get("MetricAlarms", [])
+        ]
+    tasks.append(EvidenceTask("alarms", alarms, timeout=timeout, retries=retries))
 
     # --- Logs ---
-    evidence["logs"] = {}
-
-    if args.app_log_group:
-        evidence["logs"]["app_errors"] = run_logs_query(
-            logs,
-            args.app_log_group,
-            'fields @timestamp, @message | filter @message like /ERROR|Exception/ | sort @timestamp desc',
-            args.minutes
-        )
-
-        evidence["logs"]["app_rate"] = run_logs_query(
-            logs,
-            args.app_log_group,
-            'stats count() as errors by bin(1m)',
-            args.minutes
-        )
-
-    if args.waf_log_group:
-        evidence["logs"]["waf_actions"] = run_logs_query(
-            logs,
-            args.waf_log_group,
-            'stats count() as hits by action',
-            args.minutes
-        )
-
-        evidence["logs"]["waf_top_ips"] = run_logs_query(
-            logs,
-            args.waf_log_group,
-            'stats count() as hits by httpRequest.clientIp | sort hits desc | limit 10',
-            args.minutes
-        )
+    # One task per query; each runs on the shared executor with its own query timeout,
+    # so a slow or failing query only costs its own section.
+    groups = {"app": args.app_log_group, "waf": args.waf_log_group}
+    q_start, q_end = (aligned_window(args.minutes, end) if getattr(args, "cache", None)
+                      else (epoch(start), epoch(end)))
+    for source, queries in EVIDENCE_QUERIES.items():
+        if not groups[source]:
+            continue
+        for name, query in queries.items():
+            def run_one(_, name=name, group=groups[source], query=query):
+                cache = cache_from_args(args)  # sqlite connections are per thread
+                try:
+                    # With a cache: the window's whole minutes cached, the open tail fresh.
+                    rows, _ = run_sharded(logs, name, group, query, q_start, q_end, 1, limit=50,
+                                          timeout=max(1.0, timeout - 1), cache=cache, region=args.region)
+                finally:
+                    if cache:
+                        cache.close()
+                return rows
+            # Logs Insights queries are not retried: a timeout already spent the budget.
+            tasks.append(EvidenceTask(f"logs.{name}", run_one, timeout=timeout, retries=0))
 
     # --- Config sources (metadata only) ---
-    ssm_meta = {}
-    token = None
-    while True:
-        r = ssm.get_parameters_by_path(
-            Path=args.ssm_path,
-            Recursive=True,
-            WithDecryption=False,
-            NextToken=token
-        ) if token else ssm.get_parameters_by_path(
-            Path=args.ssm_path,
-            Recursive=True,
-            WithDecryption=False
-        )
-        for p in r.get("Parameters", []):
-            ssm_meta[p["Name"]] = {"type": p["Type"]}
-        token = r.get("NextToken")
-        if not token:
-            break
-
-    sec = secrets.get_secret_value(SecretId=args.secret_id)
-    sec_meta = {"secret_id": args.secret_id, "has_rotation": bool(sec.get("RotationEnabled"))}
-
-    evidence["config_sources"] = {
-        "ssm_meta": ssm_meta,
-        "secrets_meta": sec_meta
-    }
-
-    # --- Write file ---
-    with open(args.out, "w", encoding="utf-8") as f:
-        json.dump(evidence, f, indent=2)
-
-    print(f"[GALACTUS] Evidence bundle written: {args.out}")
\ No newline at end of file
+    def ssm_meta(_):
+        meta = {}
+        token = None
+        while True:
+            kwargs = {"Path": args.ssm_path, "Recursive": True, "WithDecryption": False}
+            if token:
+                kwargs["NextToken"] = token
+            r = ssm.get_parameters_by_path(**kwargs)
+            for p in r.get("Parameters", []):
+                meta[p["Name"]] = {"type": p["Type"]}
+            token = r.get("NextToken")
+            if not token:
+                return meta
+    tasks.append(EvidenceTask("ssm_meta", ssm_meta, timeout=timeout, retries=retries,
+                              section="config_sources.ssm_meta"))
+
+    def secrets_meta(_):
+        # describe_secret carries RotationEnabled; the secret value is never fetched.
+        sec = secrets.describe_secret(SecretId=args.secret_id)
+        return {"secret_id": args.secret_id, "has_rotation": bool(sec.get("RotationEnabled"))}
+    tasks.append(EvidenceTask("secrets_meta", secrets_meta, timeout=timeout, retries=retries,
+                              section="config_sources.secrets_meta"))
+    return tasks
+
+def collect_evidence(args, clients, log=print):
+    """Run the evidence graph, writing each section (and its status) as soon as it settles."""
+    incident_id = args.incident_id or f"IR-{utc_now().strftime('%Y%m%d-%H%M%S')}"
+    end = utc_now()
+    start = end - timedelta(minutes=args.minutes)
+
+    evidence = EvidenceWriter(args.out, getattr(args, "format", "json"), incident_id)
+    evidence.add("time_window_utc", {
+        "start": start.isoformat(),
+        "end": end.isoformat()
+    })
+    if not (args.app_log_group or args.waf_log_group):
+        evidence.add("logs", {})
+
+    def on_done(task, st, value):
+        if st["status"] == "ok":
+            evidence.add(task.section, value)
+        evidence.add(f"collection.{task.name}", st)
+        evidence.checkpoint()
+        log(f"[GALACTUS] evidence: {task.name} {st['status']} in {st['elapsed_ms']} ms"
+            + (f" ({st['error']})" if st.get("error") else ""))
+
+    tasks = build_evidence_tasks(args, clients, start, end)
+    try:
+        status = run_dag(tasks, workers=getattr(args, "workers", 8), on_done=on_done)
+    finally:
+        evidence.close()
+    return incident_id, status
+
+def cmd_collect_evidence(args):
+    clients = evidence_clients(args.region, getattr(args, "task_timeout", 60.0))
+    _, status = collect_evidence(args, clients, log=lambda m: print(m, file=sys.stderr))
+    bad = sorted(n for n, st in status.items() if st["status"] != "ok")
+    print(f"[GALACTUS] Evidence bundle written: {args.out}"
+          + (f" (incomplete: {', '.join(bad)})" if bad else ""))
+    if bad:
+        sys.exit(1)
@@ -0,0 +1,418 @@
+import io
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from functools import partial
+from typing import Dict, List, Optional
+
+import pytest
+
+import galactus_cloudfront_log_explainer as explainer
+from galactus_cloudfront_log_explainer import (
+    LATENCY_DIMS,
+    LATENCY_GROWTH,
+    TARGETS,
+    CacheWriter,
+    ColumnarCache,
+    HyperLogLog,
+    LogHistogram,
+    Manifest,
+    RollingOutcomes,
+    SpaceSaving,
+    aggregate_log_stream,
+    analysis_name,
+    analyze_incremental,
+    analyze_s3_keys,
+    cache_counts,
+    cache_group_by,
+    columnar_log_stream,
+    count_log_stream,
+    count_standard_log_files,
+    iter_s3_logs,
+    latency_rows,
+    minute_outcomes_log_stream,
+    parse_time_arg,
+    s3_list_time_range,
+    sketch_log_stream,
+    sniff_distribution_id,
+)
+
+
+SAMPLE_LOG = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "LAB3-DELIVERABLES",
+    "E2T6L4WML8KX93.2026-02-09-07.faa4e6a8.gz",
+)
+
+
+class FakeS3:
+    """Minimal stand-in for the boto3 S3 client: get_object returns a streaming body."""
+
+    def __init__(self, path):
+        self.path = path
+        self.calls = []
+
+    def get_object(self, Bucket, Key):
+        self.calls.append((Bucket, Key))
+        return {"Body": open(self.path, "rb")}
+
+
+def reference_count(file_paths: List[str]) -> Dict[str, int]:
+    """The parser as it was before the fast path (full split + get_field per line): the oracle for the fast paths."""
+    counts = Counter()
+    other = Counter()
+    for path in file_paths:
+        field_index: Optional[Dict[str, int]] = None
+        with explainer.open_maybe_gzip(path) as f:
+            for line in f:
+                if line.startswith("#Fields:"):
+                    field_index = {name: idx for idx, name in enumerate(line.split(":", 1)[1].strip().split())}
+                    continue
+                if not line or line.startswith("#"):
+                    continue
+                if not field_index:
+                    other["(missing_fields_header)"] += 1
+                    continue
+                parts = line.rstrip("\n").split("\t")
+
+                def get_field(name: str) -> str:
+                    idx = field_index.get(name)
+                    return parts[idx] if idx is not None and idx < len(parts) else ""
+
+                outcome = get_field("x-edge-result-type") or get_field("x-edge-response-result-type")
+                if not outcome:
+                    other["(missing_outcome)"] += 1
+                elif outcome in TARGETS:
+                    counts[outcome] += 1
+                else:
+                    other[outcome] += 1
+    for k, v in other.items():
+        counts[f"Other:{k}"] += v
+    return dict(counts)
+
+
+def test_count_local_gzip():
+    counts = count_standard_log_files([SAMPLE_LOG])
+    assert counts == {"Miss": 1, "Other:Error": 1}
+
+
+def test_count_streams_s3_bodies():
+    s3 = FakeS3(SAMPLE_LOG)
+    counts = count_standard_log_files(iter_s3_logs(s3, "logs-bucket", ["a.gz", "b.gz"]))
+    assert counts == {"Miss": 2, "Other:Error": 2}
+    assert s3.calls == [("logs-bucket", "a.gz"), ("logs-bucket", "b.gz")]
+
+
+def test_parallel_pipeline_matches_serial():
+    keys = [f"logs/E2T6L4WML8KX93.2026-02-09-07.{i:04d}.gz" for i in range(12)]
+    serial = count_standard_log_files(iter_s3_logs(FakeS3(SAMPLE_LOG), "b", keys))
+    threaded = analyze_s3_keys(FakeS3(SAMPLE_LOG), "b", keys, workers=4, parse_procs=0)
+    multiproc = analyze_s3_keys(FakeS3(SAMPLE_LOG), "b", keys, workers=4, parse_procs=2)
+    assert serial == threaded == multiproc == {"Miss": 12, "Other:Error": 12}
+
+
+def test_fast_path_matches_reference_on_edge_cases(tmp_path):
+    log = tmp_path / "edge.log"
+    log.write_text(
+        "2026-02-09\t07:00:00\tbefore-header\n"
+        "#Version: 1.0\n"
+        "#Fields: date time x-edge-location x-edge-result-type x-edge-response-result-type\n"
+        "2026-02-09\t07:30:13\tSFO53-P1\tHit\tHit\n"
+        "2026-02-09\t07:30:14\tSFO53-P1\t\tRefreshHit\n"
+        "2026-02-09\t07:30:15\tSFO53-P1\tHit\n"
+        "2026-02-09\t07:30:16\n"
+        "\n"
+        "#Fields: date time x-edge-response-result-type\n"
+        "2026-02-09\t07:30:17\tMiss\n"
+        "2026-02-09\t07:30:18\tLimitExceeded\n",
+        encoding="utf-8",
+    )
+    expected = reference_count([str(log)])
+    assert count_standard_log_files([str(log)]) == expected
+    # Text-only streams (no binary buffer) take the str path and must agree too.
+    assert count_standard_log_files([io.StringIO(log.read_text(encoding="utf-8"))]) == expected
+    assert expected == {
+        "Hit": 2,
+        "Miss": 1,
+        "RefreshHit": 1,
+        "Other:(missing_fields_header)": 1,
+        "Other:(missing_outcome)": 2,
+        "Other:LimitExceeded": 1,
+    }
+
+
+def test_log_histogram_percentiles_within_growth():
+    h = LogHistogram(growth=1.05)
+    for ms in range(1, 1001):
+        h.add(ms / 1000.0)
+    for p, exact in ((50, 0.5), (90, 0.9), (99, 0.99)):
+        assert exact <= h.percentile(p) <= exact * 1.05
+    assert h.percentile(100) == 1.0
+
+
+def test_group_by_merges_across_workers_and_caps_groups():
+    keys = [f"k{i}.gz" for i in range(6)]
+    by_status = analyze_s3_keys(
+        FakeS3(SAMPLE_LOG), "b", keys, workers=3, parse_procs=2,
+        parse_fn=partial(aggregate_log_stream, ("status", "result"), 100),
+    )
+    rows = {(r["status"], r["result"]): r for r in by_status.rows()}
+    assert rows[("200", "Miss")]["requests"] == 6
+    assert rows[("200", "Miss")]["sc_bytes_sum"] == 6 * 523
+    assert rows[("404", "Error")]["time_taken_p99"] == 0.436
+
+    capped = analyze_s3_keys(
+        FakeS3(SAMPLE_LOG), "b", keys, workers=3,
+        parse_fn=partial(aggregate_log_stream, ("uri",), 1),
+    )
+    assert sum(r["requests"] for r in capped.rows()) == 12
+    assert len(capped.rows()) == 2
+    assert "(other)" in {r["uri"] for r in capped.rows()}
+
+
+def test_manifest_only_fetches_new_or_changed_objects(tmp_path):
+    db = str(tmp_path / "manifest.sqlite")
+    objects = [{"Key": f"k{i}.gz", "ETag": "e1"} for i in range(3)]
+    dims = ("status",)
+    parse_fn = partial(aggregate_log_stream, dims, 100)
+
+    s3 = FakeS3(SAMPLE_LOG)
+    m = Manifest(db)
+    first, cached, fetched = analyze_incremental(s3, "b", objects, m, analysis_name(dims, 100), parse_fn)
+    m.close()
+    assert (cached, fetched) == (0, 3)
+
+    # One rewritten object (new ETag) plus one brand-new object.
+    objects[0]["ETag"] = "e2"
+    objects.append({"Key": "k3.gz", "ETag": "e1"})
+    s3 = FakeS3(SAMPLE_LOG)
+    m = Manifest(db)
+    second, cached, fetched = analyze_incremental(s3, "b", objects, m, analysis_name(dims, 100), parse_fn)
+    m.close()
+    assert (cached, fetched) == (2, 2)
+    assert sorted(k for _, k in s3.calls) == ["k0.gz", "k3.gz"]
+    assert {r["status"]: r["requests"] for r in second.rows()} == {"200": 4, "404": 4}
+    assert second.rows()[0]["time_taken_p50"] == first.rows()[0]["time_taken_p50"]
+
+    # Plain Hit/Miss counts are journaled separately from the group-by partials.
+    m = Manifest(db)
+    counts, cached, fetched = analyze_incremental(
+        FakeS3(SAMPLE_LOG), "b", objects, m, analysis_name(None, 100), count_log_stream
+    )
+    m.close()
+    assert (cached, fetched) == (0, 4)
+    assert counts == {"Miss": 4, "Other:Error": 4}
+
+
+class FakeListingS3:
+    """Serves list_objects_v2 by prefix over an in-memory key set and records each prefix asked for."""
+
+    def __init__(self, keys):
+        self.keys = sorted(keys)
+        self.prefixes = []
+
+    def list_objects_v2(self, Bucket, Prefix="", MaxKeys=1000):
+        return {"Contents": [{"Key": k, "ETag": '"e"'} for k in self.keys if k.startswith(Prefix)][:MaxKeys]}
+
+    def get_paginator(self, name):
+        s3 = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix=""):
+                s3.prefixes.append(Prefix)
+                yield s3.list_objects_v2(Bucket=Bucket, Prefix=Prefix)
+
+        return Paginator()
+
+
+def test_time_range_lists_only_matching_hours():
+    keys = [f"cf/E2T6L4WML8KX93.2026-02-{d:02d}-{h:02d}.x{i}.gz" for d in (8, 9) for h in range(24) for i in range(3)]
+    s3 = FakeListingS3(keys)
+    since = parse_time_arg("2026-02-09T06:59")
+    until = parse_time_arg("2026-02-09T08:10Z")
+
+    dist = sniff_distribution_id(s3, "b", "cf/")
+    objects = s3_list_time_range(s3, "b", "cf/", dist, since, until, workers=3)
+
+    assert dist == "E2T6L4WML8KX93"
+    assert sorted(s3.prefixes) == [f"cf/E2T6L4WML8KX93.2026-02-09-{h:02d}." for h in (6, 7, 8)]
+    hours = ("2026-02-09-06.", "2026-02-09-07.", "2026-02-09-08.")
+    assert [o["Key"] for o in objects] == [k for k in keys if any(h in k for h in hours)]
+    assert len(objects) == 9
+
+
+def test_parse_time_arg_relative_and_naive_utc():
+    now = datetime(2026, 2, 9, 12, 0, tzinfo=timezone.utc)
+    assert parse_time_arg("90m", now) == datetime(2026, 2, 9, 10, 30, tzinfo=timezone.utc)
+    assert parse_time_arg("2026-02-09 07:00", now) == datetime(2026, 2, 9, 7, 0, tzinfo=timezone.utc)
+
+
+def test_space_saving_keeps_heavy_hitters_after_eviction_and_merge():
+    a, b = SpaceSaving(capacity=10), SpaceSaving(capacity=10)
+    for i in range(2000):
+        a.add(f"/noise/{i}".encode())
+        b.add(f"/noise/b{i}".encode())
+        if i % 4 == 0:
+            a.add(b"/hot")
+            b.add(b"/hot")
+        if i % 10 == 0:
+            b.add(b"/warm")
+    a.merge(b)
+    top = a.top(2)
+    assert [item for item, _, _ in top] == ["/hot", "/warm"]
+    hot_count, hot_err = top[0][1], top[0][2]
+    assert hot_count - hot_err <= 1000 <= hot_count
+
+
+def test_hyperloglog_merge_estimates_union():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(30000):
+        a.add(f"10.0.{i // 256}.{i % 256}".encode())
+    for i in range(20000, 50000):
+        b.add(f"10.0.{i // 256}.{i % 256}".encode())
+    a.merge(b)
+    assert abs(a.estimate() - 50000) < 50000 * 0.03
+
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_hyperloglog_stays_sparse_for_small_partials_and_merges_like_one_sketch(monkeypatch, use_numpy):
+    if use_numpy and explainer.np is None:
+        pytest.skip("numpy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(explainer, "np", None)
+    ips = [f"10.{i // 65536}.{i // 256 % 256}.{i % 256}".encode() for i in range(14000)]
+    whole = HyperLogLog()
+    parts = [HyperLogLog() for _ in range(4)]
+    for n, ip in enumerate(ips):
+        whole.add(ip)
+        parts[n % 4 if n < 8000 else n % 2].add(ip)
+    assert [part.registers is not None for part in parts] == [True, True, False, False]
+    small = HyperLogLog()
+    for ip in ips[:300]:
+        small.add(ip)
+
+    encoded = small.to_dict()
+    assert "registers" not in encoded and len(encoded["sparse"]) < 1300  # vs ~22 KB of base64 registers
+    assert HyperLogLog.from_dict(encoded).estimate() == small.estimate()
+
+    merged = HyperLogLog()
+    for part in [small] + parts:
+        merged.merge(HyperLogLog.from_dict(part.to_dict()))
+    assert merged.registers == whole.registers and merged.estimate() == whole.estimate()
+
+
+def test_sketches_ride_along_with_outcome_counts():
+    keys = [f"k{i}.gz" for i in range(4)]
+    sk = analyze_s3_keys(FakeS3(SAMPLE_LOG), "b", keys, workers=2, parse_procs=2,
+                         parse_fn=partial(sketch_log_stream, 100))
+    assert sk.counts == {"Miss": 4, "Other:Error": 4}
+    assert sk.uris.top(2) == [("/api/public-feed", 4, 0), ("/static/example.txt", 4, 0)]
+    assert sk.clients.top(1) == [("91.196.220.21", 8, 0)]
+    assert sk.ips.estimate() == 1
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_columnar_cache_matches_streaming(tmp_path, monkeypatch, use_numpy):
+    if use_numpy and explainer.np is None:
+        pytest.skip("numpy not installed")
+    if not use_numpy:
+        monkeypatch.setattr(explainer, "np", None)
+
+    keys = [f"k{i}.gz" for i in range(5)]
+    writer = CacheWriter(str(tmp_path / "cache"))
+    for key, chunk in explainer.run_pipeline(FakeS3(SAMPLE_LOG), "b", keys, columnar_log_stream, workers=2):
+        writer.add(key, chunk)
+    writer.close()
+
+    cache = ColumnarCache(str(tmp_path / "cache"))
+    assert cache.rows == 10
+    assert cache_counts(cache) == analyze_s3_keys(FakeS3(SAMPLE_LOG), "b", keys)
+
+    dims = ("edge", "status", "minute")
+    streamed = analyze_s3_keys(FakeS3(SAMPLE_LOG), "b", keys, parse_fn=partial(aggregate_log_stream, dims, 100))
+    assert cache_group_by(cache, dims).rows() == streamed.rows()
+
+
+def test_latency_rows_merge_edges_and_report_tail(tmp_path):
+    header = "#Fields: date time x-edge-location time-taken x-edge-response-result-type\n"
+    parts = []
+    for edge, offset in (("NRT57-C1", 0), ("GRU3-C1", 1000)):
+        log = tmp_path / f"{edge}.log"
+        lines = [f"2026-02-09\t07:30:00\t{edge}\t{(offset + i) / 1000.0:.3f}\tHit\n" for i in range(1, 1001)]
+        lines.append(f"2026-02-09\t07:30:00\t{edge}\t2.500\tMiss\n")
+        log.write_text(header + "".join(lines), encoding="utf-8")
+        with explainer.open_maybe_gzip(str(log)) as f:
+            parts.append(aggregate_log_stream(LATENCY_DIMS, 100, f, growth=LATENCY_GROWTH))
+    agg = parts[0]
+    agg.merge(parts[1])
+
+    rows = {(r["outcome"], r["edge"]): r for r in latency_rows(agg)}
+    all_hits = rows[("Hit", "(all)")]
+    assert all_hits["requests"] == 2000
+    # Exact p50 / p99.9 of 1..2000 ms are 1000 / 1998; histogram buckets are within 1%.
+    assert 1000 <= all_hits["p50_ms"] <= 1010
+    assert 1998 <= all_hits["p99_9_ms"] <= 2000
+    assert rows[("Hit", "NRT57-C1")]["max_ms"] == 1000.0
+    assert rows[("Miss", "(all)")]["requests"] == 2
+
+
+def test_rolling_outcomes_windows_and_deltas(tmp_path):
+    header = "#Fields: date time x-edge-result-type x-edge-response-result-type\n"
+    log = tmp_path / "minutes.log"
+    rows = [f"2026-02-09\t07:{m:02d}:30\tHit\tHit\n" for m in range(0, 60)]
+    rows += ["2026-02-09\t07:59:10\tMiss\tMiss\n", "2026-02-09\t07:58:00\tError\tError\n"]
+    log.write_text(header + "".join(rows), encoding="utf-8")
+    with explainer.open_maybe_gzip(str(log)) as f:
+        part = minute_outcomes_log_stream(f)
+    assert part["2026-02-09T07:59:00Z|Miss"] == 1
+    assert part["2026-02-09T07:58:00Z|Other"] == 1
+
+    rolling = RollingOutcomes()
+    rolling.add(part)
+    first = {c["window"]: c for c in rolling.deltas()}
+    assert first["5m"]["counts"] == {"Hit": 5, "Miss": 1, "RefreshHit": 0, "Other": 1}
+    assert first["15m"]["counts"]["Hit"] == 15
+    assert first["60m"]["counts"]["Hit"] == 60
+
+    # A later object moves the windows forward; nothing unchanged is re-emitted.
+    assert rolling.deltas() == []
+    rolling.add({"2026-02-09T08:00:00Z|Miss": 4})
+    second = {c["window"]: c for c in rolling.deltas()}
+    assert second["5m"]["delta"] == {"Hit": -1, "Miss": 4, "RefreshHit": 0, "Other": 0}
+    assert second["60m"]["counts"]["Hit"] == 59
+    assert min(rolling.minutes).minute == 1
+
+
+def test_follow_survives_s3_errors_and_refetches_failed_keys(monkeypatch, capsys):
+    from botocore.exceptions import ClientError, EndpointConnectionError
+
+    class FlakyS3(FakeS3):
+        def get_object(self, Bucket, Key):
+            if Key == "b.gz" and not any(k == "b.gz" for _, k in self.calls):
+                self.calls.append((Bucket, Key))
+                raise ClientError({"Error": {"Code": "SlowDown", "Message": "Reduce your request rate"}}, "GetObject")
+            return super().get_object(Bucket, Key)
+
+    listings = iter([EndpointConnectionError(endpoint_url="https://s3"), ["a.gz", "b.gz"], ["a.gz", "b.gz"]])
+
+    def list_time_range(*_args):
+        item = next(listings)
+        if isinstance(item, Exception):
+            raise item
+        return [{"Key": k} for k in item]
+
+    monkeypatch.setattr(explainer, "s3_list_time_range", list_time_range)
+    monkeypatch.setattr(explainer.time, "sleep", lambda _s: None)
+    s3 = FlakyS3(SAMPLE_LOG)
+    explainer.follow(s3, "logs-bucket", "", "E2T6L4WML8KX93", 60, 1.0, iterations=3, workers=1, fmt="json")
+    assert [k for _, k in s3.calls] == ["a.gz", "b.gz", "b.gz"]
+    assert capsys.readouterr().err.count("poll failed") == 2
+
+
+if __name__ == "__main__":
+    test_count_local_gzip()
+    test_count_streams_s3_bodies()
+    test_parallel_pipeline_matches_serial()
+    print("OK")
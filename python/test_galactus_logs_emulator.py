@@ -0,0 +1,87 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from botocore.exceptions import ClientError
+
+import galactus_queries
+from galactus_logs_emulator import (
+    APP_LOG_GROUP, RDSAPP_LOG, SECRET_ID, WAF_LOG_GROUP, Emulator, evaluate, load_console_export,
+)
+from galactus_logsinsights_runner import InsightsQuery, epoch, run_queries, utc_now
+from sub_implementation import collect_evidence
+
+
+def records():
+    return [
+        {"@timestamp": 60000 * i, "@message": m, "@ptr": f"p{i}", "action": a, "httpRequest.clientIp": ip}
+        for i, (m, a, ip) in enumerate([
+            ("ERROR db down", "BLOCK", "10.0.0.1"),
+            ("ok", "ALLOW", "10.0.0.2"),
+            ("Exception: boom", "BLOCK", "10.0.0.1"),
+            ("ok", "ALLOW", "10.0.0.1"),
+        ])
+    ]
+
+
+def test_engine_stats_sort_limit_and_filter():
+    top = evaluate("stats count() as hits by httpRequest.clientIp | sort hits desc | limit 1", records())
+    assert top == [{"httpRequest.clientIp": "10.0.0.1", "hits": 3}]
+
+    errors = evaluate("fields @timestamp, @message | filter @message like /ERROR|Exception/ | sort @timestamp desc",
+                      records())
+    assert [r["@ptr"] for r in errors] == ["p2", "p0"]
+
+    blocked = evaluate("filter action = 'BLOCK' and httpRequest.clientIp != '10.0.0.2' | stats count() as n by bin(2m)",
+                       records())
+    assert sorted((r["bin(2m)"], r["n"]) for r in blocked) == [
+        ("1970-01-01 00:00:00.000", 1), ("1970-01-01 00:02:00.000", 1)]
+
+    with pytest.raises(ValueError):
+        evaluate("parse @message 'x=*' as x", records())
+
+
+def test_emulated_insights_runs_registry_queries_and_enforces_quota():
+    emu = Emulator(query_base=0.05, api_latency=0, max_concurrent=1)
+    end = utc_now()
+    q = InsightsQuery("top", WAF_LOG_GROUP, galactus_queries.render("waf_top_ips", {"limit": 3}),
+                      epoch(end) - 3600, epoch(end))
+    run_queries(emu.logs, [q], timeout=10)
+    rows = q.rows()
+    assert len(rows) == 3 and int(rows[0]["hits"]) >= int(rows[-1]["hits"])
+
+    emu.logs.start_query(logGroupName=APP_LOG_GROUP, startTime=0, endTime=epoch(end), queryString="stats count()")
+    with pytest.raises(ClientError) as e:
+        emu.logs.start_query(logGroupName=APP_LOG_GROUP, startTime=0, endTime=epoch(end), queryString="stats count()")
+    assert e.value.response["Error"]["Code"] == "LimitExceededException"
+
+
+def test_collect_evidence_end_to_end_against_emulator(tmp_path):
+    emu = Emulator(query_base=0.2, api_latency=0.01)
+    args = SimpleNamespace(incident_id="IR-EMU", minutes=60, region=None, app_log_group=APP_LOG_GROUP,
+                           waf_log_group=WAF_LOG_GROUP, ssm_path="/lab/db/", secret_id=SECRET_ID,
+                           out=str(tmp_path / "e.json"), format="json", task_timeout=10.0, retries=0,
+                           workers=8, cache=None)
+
+    _, status = collect_evidence(args, emu.clients(), log=lambda m: None)
+    bundle = json.load(open(args.out))
+
+    assert all(st["status"] == "ok" for st in status.values())
+    assert {a["name"] for a in bundle["alarms"]} == {"lab-db-connection-errors", "edge-waf-blocks-spike"}
+    assert set(bundle["logs"]) == {"app_errors", "app_rate", "waf_actions", "waf_top_ips"}
+    assert {r["action"] for r in bundle["logs"]["waf_actions"]} == {"ALLOW", "BLOCK"}
+    assert len(bundle["config_sources"]["ssm_meta"]) == 35
+    assert bundle["config_sources"]["secrets_meta"]["has_rotation"] is True
+    assert emu.calls["logs.start_query"] == 4 and emu.calls["ssm.get_parameters_by_path"] == 4
+    assert emu.logs.max_running == 4  # all four queries were in flight together
+
+
+def test_recorded_console_export_replays_in_order_with_tracebacks_whole():
+    events = load_console_export(RDSAPP_LOG)
+    assert all(a["timestamp"] < b["timestamp"] for a, b in zip(events, events[1:]))
+    tracebacks = [e["message"] for e in events if e["message"].startswith("Traceback")]
+    assert tracebacks and all("\n" in t for t in tracebacks)
+
+    emu = Emulator(query_base=0, api_latency=0, app_log=RDSAPP_LOG)
+    errors = evaluate(galactus_queries.render("app_errors"), emu.logs.groups[APP_LOG_GROUP].records)
+    assert errors and any("ERROR in app: Exception on /init" in r["@message"] for r in errors)
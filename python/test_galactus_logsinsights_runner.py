@@ -0,0 +1,472 @@
+import io
+import itertools
+import json
+
+import pytest
+
+import galactus_logsinsights_runner as runner
+from galactus_logsinsights_runner import AdaptivePoller, InsightsQuery, run_queries, stream_queries
+
+
+class LimitExceeded(Exception):
+    response = {"Error": {"Code": "LimitExceededException"}}
+
+
+class FakeLogs:
+    """Stand-in for the boto3 logs client: query N completes after polls[N] get_query_results calls."""
+
+    def __init__(self, polls, quota=None, fail=()):
+        self.polls = polls
+        self.quota = quota
+        self.fail = set(fail)
+        self.ids = itertools.count()
+        self.running = {}
+        self.started = []
+        self.stopped = []
+        self.max_running = 0
+
+    def start_query(self, **kwargs):
+        if self.quota is not None and len(self.running) >= self.quota:
+            raise LimitExceeded()
+        qid = f"q{next(self.ids)}"
+        self.started.append(kwargs)
+        self.running[qid] = [len(self.started) - 1, 0]
+        self.max_running = max(self.max_running, len(self.running))
+        return {"queryId": qid}
+
+    def get_query_results(self, queryId):
+        state = self.running[queryId]
+        n, state[1] = state[0], state[1] + 1
+        if state[1] < self.polls[n]:
+            return {"status": "Running", "results": self.partial(n, state[1])}
+        del self.running[queryId]
+        if n in self.fail:
+            return {"status": "Failed", "results": []}
+        return {"status": "Complete", "results": [[{"field": "n", "value": str(n)}]],
+                "statistics": {"recordsScanned": 10.0}}
+
+    def partial(self, n, poll):
+        return []
+
+    def stop_query(self, queryId):
+        self.stopped.append(queryId)
+        self.running.pop(queryId, None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fake monotonic clock advanced by time.sleep, so backoff runs instantly."""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(s):
+        sleeps.append(s)
+        now[0] += s
+
+    monkeypatch.setattr(runner.time, "sleep", sleep)
+    monkeypatch.setattr(runner.time, "monotonic", lambda: now[0])
+    return sleeps
+
+
+def batch(n):
+    return [InsightsQuery(f"q{i}", "/aws/app", f"stats count() by f{i}", 0, 60, limit=10) for i in range(n)]
+
+
+def test_batch_runs_concurrently_and_waits_for_slowest(clock):
+    logs = FakeLogs([2, 5, 3, 1])
+    queries = run_queries(logs, batch(4))
+
+    assert logs.max_running == 4
+    assert [q.rows() for q in queries] == [[{"n": str(i)}] for i in range(4)]
+    assert [q.polls for q in queries] == [2, 5, 3, 1]
+    assert queries[0].statistics["recordsScanned"] == 10.0
+    # Polls of all queries share wake-ups: one sleep per poll of the slowest query.
+    assert len(clock) == 5
+
+
+def test_respects_concurrency_and_requeues_on_limit_exceeded(clock):
+    logs = FakeLogs([3] * 6, quota=2)
+    queries = run_queries(logs, batch(6), max_concurrent=4)
+
+    assert logs.max_running == 2
+    assert all(q.ok for q in queries)
+    assert len(logs.started) == 6
+
+
+def test_failed_and_timed_out_queries_are_reported_per_query(clock):
+    logs = FakeLogs([1, 1000, 1], fail={2})
+    queries = run_queries(logs, batch(3), timeout=10)
+
+    assert queries[0].ok
+    assert queries[1].status == "Timeout" and logs.stopped == ["q1"]
+    assert queries[2].status == "Failed"
+    with pytest.raises(TimeoutError):
+        queries[1].rows()
+    with pytest.raises(RuntimeError):
+        queries[2].rows()
+    assert sum(clock) <= 10
+
+
+def test_closing_the_stream_early_stops_the_queries_still_running(clock):
+    logs = FakeLogs([1, 50, 50])
+    queries = batch(3)
+    queries[2].query_id, queries[2].deduped = "theirs", True  # attached to another responder's scan
+    logs.running["theirs"] = [2, 0]
+
+    stream = stream_queries(logs, queries)
+    for q, _ in stream:
+        if q.ok:
+            break
+    stream.close()  # e.g. Ctrl-C or a broken pipe in the consumer
+
+    assert q is queries[0]
+    assert logs.stopped == ["q1"] and [q.status for q in queries[1:]] == ["Cancelled", "Cancelled"]
+
+
+def test_multiple_log_groups_use_log_group_names():
+    q = InsightsQuery("x", ["/a", "/b"], "fields @message", 0, 60)
+    assert q.start_kwargs() == {"startTime": 0, "endTime": 60, "queryString": "fields @message",
+                                "logGroupNames": ["/a", "/b"]}
+
+
+class StreamingLogs(FakeLogs):
+    """Running polls return a growing prefix of @ptr rows, re-sent every time (as Logs Insights does)."""
+
+    def partial(self, n, poll):
+        return [[{"field": "@message", "value": f"m{i}"}, {"field": "@ptr", "value": f"p{i}"}] for i in range(poll)]
+
+
+def test_stream_yields_partial_rows_once_and_stats_only_when_complete(clock):
+    logs = StreamingLogs([4])
+    seen = [(q.status, [r[0]["value"] for r in rows]) for q, rows in stream_queries(logs, batch(1))]
+    assert seen == [("Running", ["m0"]), ("Running", ["m1"]), ("Running", ["m2"]), ("Complete", ["0"])]
+
+
+def test_sorted_or_limited_query_rows_are_held_until_complete(clock):
+    logs = StreamingLogs([4])
+    q = InsightsQuery("q", "/app", "fields @message | sort @timestamp desc | limit 2", 0, 60)
+    seen = [(q.status, [r[0]["value"] for r in rows]) for q, rows in stream_queries(logs, [q])]
+    assert seen == [("Running", []), ("Running", []), ("Running", []), ("Complete", ["0"])]
+    assert runner.streams_partial_rows("fields @message | filter @message like /sort|limit/")
+
+
+def test_adaptive_poller_backs_off_while_scanning_and_snaps_back_on_plateau():
+    p = AdaptivePoller(min_delay=0.5, max_delay=4)
+    assert p.observe(0.0, {"recordsScanned": 100.0}, 0) == 1.0
+    assert p.observe(1.0, {"recordsScanned": 5000.0}, 0) == 2.0
+    assert p.rate == 4900.0
+    assert p.observe(3.0, {"recordsScanned": 9000.0}, 0) == 4.0
+    assert p.observe(7.0, {"recordsScanned": 20000.0}, 0) == 4.0
+    assert p.observe(11.0, {"recordsScanned": 20000.0}, 0) == 0.5
+    assert p.observe(11.5, {"recordsScanned": 20000.0}, 3) == 0.5
+
+
+class EventLogs(FakeLogs):
+    """Answers two query shapes over an in-memory event list, honouring startTime/endTime/limit."""
+
+    def __init__(self, events):
+        super().__init__([])
+        self.events = events
+
+    def start_query(self, **kwargs):
+        self.started.append(kwargs)
+        return {"queryId": f"q{len(self.started) - 1}"}
+
+    def get_query_results(self, queryId):
+        kw = self.started[int(queryId[1:])]
+        hits = [e for e in self.events if kw["startTime"] <= e[0] <= kw["endTime"]]
+        if kw["queryString"].startswith("stats"):
+            counts = {}
+            for _, action in hits:
+                counts[action] = counts.get(action, 0) + 1
+            rows = [[{"field": "action", "value": a}, {"field": "hits", "value": str(n)}] for a, n in counts.items()]
+        else:
+            hits = sorted(hits, reverse=True)[:kw.get("limit")]
+            rows = [[{"field": "@timestamp", "value": f"2026-02-09 07:{t // 60:02d}:{t % 60:02d}.000"},
+                     {"field": "@ptr", "value": f"p{t}"}] for t, _ in hits]
+        return {"status": "Complete", "results": rows[:kw.get("limit")]}
+
+
+EVENTS = [(t, "BLOCK" if t % 7 == 0 else "ALLOW") for t in range(0, 3600, 3)]
+
+
+def test_sharded_stats_reaggregate_then_sort_and_limit(clock):
+    logs = EventLogs(EVENTS)
+    rows, batch = runner.run_sharded(logs, "waf", "/waf", "stats count() as hits by action | sort hits desc | limit 1",
+                                     0, 3599, shards=4, limit=25)
+    assert len(batch) == 4 and all(kw["queryString"] == "stats count() as hits by action" for kw in logs.started)
+    assert [kw["limit"] for kw in logs.started] == [runner.MAX_RESULT_ROWS] * 4
+    allow = sum(1 for _, a in EVENTS if a == "ALLOW")
+    assert rows == [{"action": "ALLOW", "hits": str(allow)}]
+
+
+def test_sharded_sort_timestamp_is_k_way_merged(clock):
+    logs = EventLogs(EVENTS)
+    rows, _ = runner.run_sharded(logs, "app", "/app", "fields @timestamp | sort @timestamp desc | limit 5",
+                                 0, 3599, shards=3, limit=25)
+    assert [r["@ptr"] for r in rows] == ["p3597", "p3594", "p3591", "p3588", "p3585"]
+
+
+class MillisecondLogs(EventLogs):
+    """Record queries over millisecond events, reading endTime as its whole second or as e.000."""
+
+    def __init__(self, events_ms, whole_second):
+        super().__init__(events_ms)
+        self.whole_second = whole_second
+
+    def get_query_results(self, queryId):
+        kw = self.started[int(queryId[1:])]
+        last = kw["endTime"] * 1000 + (999 if self.whole_second else 0)
+        hits = sorted((t for t in self.events if kw["startTime"] * 1000 <= t <= last), reverse=True)
+        return {"status": "Complete", "results": [[{"field": "@timestamp", "value": str(t)},
+                                                   {"field": "@ptr", "value": f"p{t}"}] for t in hits]}
+
+
+@pytest.mark.parametrize("whole_second", [True, False])
+def test_record_shards_share_boundary_seconds_and_drop_duplicates(clock, whole_second):
+    events = [0, 999000, 999500, 1000000, 1000500, 1999999, 2000000, 2999999]
+    logs = MillisecondLogs(events, whole_second)
+    rows, _ = runner.run_sharded(logs, "app", "/app", "fields @timestamp | sort @timestamp desc", 0, 2999, shards=3)
+    assert [(kw["startTime"], kw["endTime"]) for kw in logs.started] == [(0, 1000), (1000, 2000), (2000, 2999)]
+    expected = events if whole_second else [t for t in events if t <= 2999000]
+    assert [r["@ptr"] for r in rows] == [f"p{t}" for t in sorted(expected, reverse=True)]
+
+
+def test_shard_plan_rejects_non_reaggregatable_stats():
+    with pytest.raises(ValueError):
+        runner.ShardPlan("stats avg(latency) by uri")
+    with pytest.raises(ValueError):
+        runner.ShardPlan("stats count() by uri | filter uri like /api/")
+    plan = runner.ShardPlan("filter @message like /ERROR|Exception/ | stats count() as n, max(ms) by bin(1m)")
+    assert plan.shard_query == "filter @message like /ERROR|Exception/ | stats count() as n, max(ms) by bin(1m)"
+    assert plan.group_by == ["bin(1m)"] and plan.aggregates == [("count", "n"), ("max", "max(ms)")]
+
+
+def test_shard_window_is_disjoint_and_covers_range():
+    assert runner.shard_window(100, 199, 4) == [(100, 124), (125, 149), (150, 174), (175, 199)]
+    assert runner.shard_window(0, 2, 10) == [(0, 0), (1, 1), (2, 2)]
+
+
+def test_query_cache_serves_repeats_and_expires_open_windows(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(runner.time, "time", lambda: now[0])
+    cache = runner.QueryCache(str(tmp_path / "c.sqlite"), ttl=60, closed_ttl=3600)
+    closed = InsightsQuery("a", "/app", "stats count()  by x", 0, int(now[0]) - 1000)
+    live = InsightsQuery("b", "/app", "stats count() by x", 0, int(now[0]) - 100)
+    for q in (closed, live):
+        q.status, q.results = "Complete", [[{"field": "x", "value": "1"}]]
+        cache.put(q)
+
+    # Whitespace differences in the query text share one entry.
+    again = InsightsQuery("a2", "/app", "stats count() by   x", 0, int(now[0]) - 1000)
+    assert cache.get(again) and again.cached and again.rows() == [{"x": "1"}]
+
+    now[0] += 120
+    assert cache.get(InsightsQuery("a3", "/app", "stats count() by x", 0, int(now[0]) - 1120))
+    assert not cache.get(InsightsQuery("b2", "/app", "stats count() by x", 0, int(now[0]) - 220))
+
+    # A window reaching into the current minute is still growing and is never stored.
+    tail = InsightsQuery("c", "/app", "stats count() by x", int(now[0]) // 60 * 60, int(now[0]))
+    tail.status, tail.results = "Complete", [[{"field": "x", "value": "1"}]]
+    cache.put(tail)
+    assert not cache.get(InsightsQuery("c2", "/app", "stats count() by x", tail.start, tail.end))
+
+
+def test_normalize_query_keeps_whitespace_inside_literals():
+    assert runner.normalize_query("fields  @message |filter @message like /a  b/") == \
+        "fields @message | filter @message like /a  b/"
+    assert runner.normalize_query("filter @message like /a  b/") != runner.normalize_query("filter @message like /a b/")
+    assert runner.normalize_query("filter  x = 'a  b'  or y =~ /p|q/") == "filter x = 'a  b' or y =~ /p|q/"
+    twins = [InsightsQuery("q", "/app", f"filter @message like /a{gap}b/", 0, 60) for gap in ("  ", " ")]
+    assert runner.query_key(twins[0]) != runner.query_key(twins[1])
+
+
+def test_query_cache_evicts_least_recently_used(tmp_path):
+    cache = runner.QueryCache(str(tmp_path / "c.sqlite"), max_bytes=200)
+    queries = [InsightsQuery(f"q{i}", "/app", f"fields f{i}", 0, 60) for i in range(3)]
+    for q in queries:
+        q.status, q.results = "Complete", [[{"field": "m", "value": "x" * 60}]]
+        cache.put(q)
+        cache.get(queries[0])
+    assert cache.get(InsightsQuery("q", "/app", "fields f0", 0, 60))
+    assert not cache.get(InsightsQuery("q", "/app", "fields f1", 0, 60))
+    assert cache.get(InsightsQuery("q", "/app", "fields f2", 0, 60))
+
+
+def test_sharded_overlapping_windows_reuse_closed_shards(tmp_path, clock):
+    cache = runner.QueryCache(str(tmp_path / "c.sqlite"))
+    logs = EventLogs(EVENTS)
+    query = "stats count() as hits by action | sort hits desc"
+    first, _ = runner.run_sharded(logs, "w", "/waf", query, 0, 2399, shards=4, cache=cache)
+    assert len(logs.started) == 4
+
+    # Same grid, window slid forward by one shard: only the new shard is queried.
+    rows, batch = runner.run_sharded(logs, "w", "/waf", query, 600, 2999, shards=4, cache=cache)
+    assert len(logs.started) == 5 and sum(q.cached for q in batch) == 3
+    expected = sum(1 for t, a in EVENTS if 600 <= t <= 2999 and a == "ALLOW")
+    assert rows[0] == {"action": "ALLOW", "hits": str(expected)}
+
+    # The same log group name in another region is a different log group: nothing is reused.
+    _, batch = runner.run_sharded(logs, "w", "/waf", query, 600, 2999, shards=4, cache=cache, region="sa-east-1")
+    assert len(logs.started) == 9 and not any(q.cached for q in batch)
+    assert {q.region for q in batch} == {"sa-east-1"}
+
+
+def test_cached_window_reuses_whole_minutes_and_always_queries_the_open_tail(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(runner.time, "time", lambda: 3035.0)
+    end = runner.datetime.fromtimestamp(3029, runner.timezone.utc)
+    assert runner.aligned_window(40, end) == (600, 3029)
+    assert runner.minute_shards(600, 3029, 1) == [(600, 2999), (3000, 3029)]
+    assert runner.minute_shards(600, 3029, 4) == [(600, 1199), (1200, 1799), (1800, 2399), (2400, 2999),
+                                                  (3000, 3029)]
+
+    cache = runner.QueryCache(str(tmp_path / "c.sqlite"))
+    logs = EventLogs(EVENTS)
+    query = "stats count() as hits by action | sort hits desc"
+    first, _ = runner.run_sharded(logs, "w", "/waf", query, 600, 3029, shards=1, cache=cache)
+    rows, batch = runner.run_sharded(logs, "w", "/waf", query, 600, 3029, shards=1, cache=cache)
+    assert len(logs.started) == 3 and [q.cached for q in batch] == [True, False]
+    assert logs.started[-1]["startTime"] == 3000 and logs.started[-1]["endTime"] == 3029
+    expected = sum(1 for t, a in EVENTS if 600 <= t <= 3029 and a == "ALLOW")
+    assert rows == first and rows[0] == {"action": "ALLOW", "hits": str(expected)}
+
+    # A query the shards cannot merge runs whole, over the full window, and is not stored.
+    runner.run_sharded(logs, "w", "/waf", "stats avg(x) by action", 600, 3029, shards=1, cache=cache)
+    runner.run_sharded(logs, "w", "/waf", "stats avg(x) by action", 600, 3029, shards=1, cache=cache)
+    assert [(kw["startTime"], kw["endTime"]) for kw in logs.started[3:]] == [(600, 3029)] * 2
+
+
+def test_parse_target_region_prefix():
+    assert runner.parse_target("sa-east-1:/aws/app", "ap-northeast-1") == ("sa-east-1", "/aws/app")
+    assert runner.parse_target("aws-waf-logs-edge", "us-east-1") == ("us-east-1", "aws-waf-logs-edge")
+    assert runner.parse_target("/aws/app") == (None, "/aws/app")
+
+
+def test_fanout_runs_each_region_on_its_own_client_and_merges_with_source(clock):
+    per_region = {
+        "ap-northeast-1": EventLogs([(t, "ALLOW") for t in range(0, 600, 2)]),
+        "sa-east-1": EventLogs([(t, "ALLOW") for t in range(1, 600, 2)]),
+    }
+    clients = runner.LogsClients(factory=per_region.__getitem__)
+    rows, batch = runner.run_fanout(
+        clients, [("ap-northeast-1", "/aws/app"), ("sa-east-1", "/aws/app")],
+        "fields @timestamp | sort @timestamp desc | limit 3", 0, 599, limit=3)
+
+    assert len(per_region["ap-northeast-1"].started) == len(per_region["sa-east-1"].started) == 1
+    # One cross-region timeline: both sources interleaved by @timestamp desc, cut to the query's limit.
+    assert [(r["source"], r["@ptr"]) for r in rows] == [
+        ("sa-east-1:/aws/app", "p599"), ("ap-northeast-1:/aws/app", "p598"), ("sa-east-1:/aws/app", "p597"),
+    ]
+    assert runner.query_limit("stats count() as n by ip | sort n desc | limit 5", 25) == 5
+    assert runner.query_limit("fields ip | limit 5 | stats count() as n by ip", 25) == 25
+
+
+def test_row_writer_streams_ndjson_and_csv():
+    rows = [{"@ptr": "p0", "ip": "1.2.3.4", "hits": "9"}, {"@ptr": "p1", "ip": "5.6.7.8", "hits": "3", "uri": "/x"}]
+
+    out = io.StringIO()
+    w = runner.RowWriter("ndjson", out)
+    w.write(rows[0])
+    assert out.getvalue() == '{"@ptr":"p0","ip":"1.2.3.4","hits":"9"}\n'  # written before the next row arrives
+    w.write(rows[1])
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == rows
+
+    out = io.StringIO()
+    w = runner.RowWriter("csv", out)
+    w.write_all(rows)
+    assert out.getvalue().splitlines() == ["ip,hits", "1.2.3.4,9", "5.6.7.8,3"]
+
+    out = io.StringIO()
+    w = runner.RowWriter("table", out)
+    w.write_all(rows)
+    assert out.getvalue() == ""
+    w.close()
+    assert out.getvalue().splitlines()[0].split() == ["ip", "hits", "uri"]
+
+
+def test_identical_queries_in_a_batch_run_once(clock):
+    logs = FakeLogs([2])
+    twins = [InsightsQuery(f"t{i}", "/aws/app", "stats  count() by x", 0, 60) for i in range(3)]
+    run_queries(logs, twins)
+    assert len(logs.started) == 1
+    assert [q.rows() for q in twins] == [[{"n": "0"}]] * 3
+    assert [q.deduped for q in twins] == [False, True, True]
+
+
+def test_second_responder_attaches_to_inflight_query(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite")
+    first = runner.QueryCache(path)
+    q = InsightsQuery("a", "/aws/app", "fields @message", 0, 60)
+    q.query_id = "q0"
+    first.mark_inflight(q)
+
+    logs = FakeLogs([2])
+    logs.started.append({})  # q0 was started by the other responder
+    logs.running["q0"] = [0, 0]
+    mine = InsightsQuery("b", "/aws/app", "fields  @message", 0, 60)
+    runner.run_queries_cached(logs, [mine], runner.QueryCache(path))
+    assert len(logs.started) == 1 and mine.query_id == "q0" and mine.ok
+    assert first.inflight(q, 60) is None
+
+
+def test_inflight_is_marked_before_the_first_poll(tmp_path, clock):
+    cache = runner.QueryCache(str(tmp_path / "c.sqlite"))
+    seen = []
+
+    class CheckingLogs(FakeLogs):
+        def get_query_results(self, queryId):
+            seen.append(cache.inflight(q, 60))
+            return super().get_query_results(queryId)
+
+    q = InsightsQuery("a", "/aws/app", "fields @message", 0, 60)
+    runner.run_queries_cached(CheckingLogs([2]), [q], cache)
+    assert seen[0] == "q0" and cache.inflight(q, 60) is None
+
+
+def test_timeout_never_stops_an_attached_query(tmp_path, clock):
+    path = str(tmp_path / "c.sqlite")
+    theirs = InsightsQuery("a", "/aws/app", "fields @message", 0, 60)
+    theirs.query_id = "theirs"
+    runner.QueryCache(path).mark_inflight(theirs)
+
+    logs = FakeLogs([1000, 1000])
+    logs.started.append({})  # started by the other responder
+    logs.running["theirs"] = [0, 0]
+    mine = InsightsQuery("b", "/aws/app", "fields @message", 0, 60)
+    own = InsightsQuery("c", "/aws/app", "fields @ptr", 0, 60)
+    runner.run_queries_cached(logs, [mine, own], runner.QueryCache(path), timeout=10)
+    assert mine.deduped and mine.status == own.status == "Timeout"
+    assert logs.stopped == ["q0"]
+
+
+def test_query_stats_records_scan_volume_cost_and_emf(tmp_path, clock):
+    class ScanningLogs(FakeLogs):
+        def get_query_results(self, queryId):
+            r = super().get_query_results(queryId)
+            r["statistics"] = {"recordsScanned": 1000.0, "recordsMatched": 7.0, "bytesScanned": 2e9}
+            return r
+
+    stats = runner.QueryStats("test").install()
+    try:
+        cache = runner.QueryCache(str(tmp_path / "c.sqlite"))
+        runner.run_queries_cached(ScanningLogs([3, 1]), batch(2), cache)
+        runner.run_queries_cached(ScanningLogs([1]), batch(1), cache)  # q0 again: served from cache
+    finally:
+        stats.uninstall()
+
+    assert len(stats.records) == 3
+    by_name = {(r["query"], r["status"]): r for r in stats.records}
+    assert (by_name[("q1", "Complete")]["records"], by_name[("q1", "Complete")]["matched"]) == (1000, 7)
+    assert by_name[("q0", "Complete")]["polls"] == 3 and by_name[("q0", "Complete")]["wall_s"] > 0
+    assert by_name[("q0", "Complete")]["cost_usd"] == pytest.approx(0.01)  # 2 GB at $0.005/GB
+    assert by_name[("q0", "Cached")]["cost_usd"] == 0
+    assert stats.totals()["cost_usd"] == pytest.approx(0.02)
+
+    out = io.StringIO()
+    stats.write_table(out)
+    assert "TOTAL" in out.getvalue() and "0.020000" in out.getvalue()
+    emf = io.StringIO()
+    stats.write_emf(emf)
+    first = json.loads(emf.getvalue().splitlines()[0])
+    assert first["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["Command", "Query"]]
+    assert first["Command"] == "test" and first["BytesScanned"] == 2_000_000_000
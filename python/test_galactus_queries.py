@@ -0,0 +1,39 @@
+import pytest
+
+import galactus_queries
+from galactus_queries import NamedQuery, Param, parse_params, render
+
+
+def test_render_coerces_cli_strings_and_memoizes():
+    text = render("waf_top_ips", parse_params(["limit=5"]))
+    assert text == "stats count() as hits by httpRequest.clientIp | sort hits desc | limit 5"
+    assert render("waf_top_ips", {"limit": 5}) is text
+    assert render("waf_top_ips") == "stats count() as hits by httpRequest.clientIp | sort hits desc | limit 10"
+
+
+def test_parameters_are_validated():
+    with pytest.raises(ValueError):
+        render("waf_top_ips", {"limit": "ten"})
+    with pytest.raises(ValueError):
+        render("waf_top_ips", {"limit": 0})
+    with pytest.raises(ValueError):
+        render("waf_top_ips", {"top": 3})
+    with pytest.raises(ValueError):
+        render("app_errors", {"pattern": "x/ | fields @logStream"})
+    with pytest.raises(ValueError):
+        render("no_such_query")
+    with pytest.raises(ValueError):
+        parse_params(["limit"])
+
+
+def test_templates_must_match_declared_params():
+    with pytest.raises(ValueError):
+        NamedQuery("bad", "app", "fields @message | limit {limit}", [])
+    with pytest.raises(ValueError):
+        Param("uri", str, "/")  # str params need a pattern
+
+
+def test_evidence_queries_come_from_the_registry():
+    import sub_implementation
+
+    assert sub_implementation.EVIDENCE_QUERIES["waf"]["waf_top_ips"] == galactus_queries.render("waf_top_ips")
@@ -0,0 +1,96 @@
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from sub_implementation import EvidenceTask, collect_evidence, run_dag
+
+
+def test_dag_runs_independent_tasks_concurrently_and_respects_deps():
+    order = []
+    lock = threading.Lock()
+
+    def step(name, delay, value):
+        def fn(deps):
+            time.sleep(delay)
+            with lock:
+                order.append(name)
+            return (value, deps)
+        return fn
+
+    tasks = [
+        EvidenceTask("slow", step("slow", 0.3, 1)),
+        EvidenceTask("fast", step("fast", 0.01, 2)),
+        EvidenceTask("after_fast", step("after_fast", 0.01, 3), deps=["fast"]),
+    ]
+    settled = {}
+    t0 = time.monotonic()
+    status = run_dag(tasks, workers=4, on_done=lambda t, st, v: settled.setdefault(t.name, v))
+    elapsed = time.monotonic() - t0
+
+    assert elapsed < 0.5  # max(slow), not the sum
+    assert order == ["fast", "after_fast", "slow"]
+    assert settled["after_fast"] == (3, {"fast": (2, {})})
+    assert all(st["status"] == "ok" for st in status.values())
+
+
+def test_dag_retries_then_times_out_and_skips_dependents():
+    calls = {"flaky": 0}
+
+    def flaky(_):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise RuntimeError("throttled")
+        return "ok"
+
+    def broken(_):
+        raise RuntimeError("AccessDenied")
+
+    tasks = [
+        EvidenceTask("flaky", flaky, retries=1),
+        EvidenceTask("hung", lambda _: time.sleep(1.0), timeout=0.2),
+        EvidenceTask("broken", broken, retries=0),
+        EvidenceTask("needs_broken", lambda deps: deps, deps=["broken"]),
+    ]
+    status = run_dag(tasks, workers=4)
+
+    assert status["flaky"]["status"] == "ok" and status["flaky"]["attempts"] == 2
+    assert status["hung"]["status"] == "timeout" and status["hung"]["elapsed_ms"] < 900
+    assert status["broken"]["status"] == "failed" and "AccessDenied" in status["broken"]["error"]
+    assert status["needs_broken"]["status"] == "skipped"
+
+
+def test_dag_rejects_unknown_deps_and_cycles():
+    with pytest.raises(ValueError):
+        run_dag([EvidenceTask("a", lambda _: 1, deps=["nope"])])
+    with pytest.raises(ValueError):
+        run_dag([EvidenceTask("a", lambda _: 1, deps=["b"]), EvidenceTask("b", lambda _: 1, deps=["a"])])
+
+
+class SlowSecrets:
+    def describe_secret(self, SecretId):
+        time.sleep(1.0)
+
+
+class Clients:
+    cloudwatch = SimpleNamespace(describe_alarms=lambda **kw: {"MetricAlarms": [{"AlarmName": "db-errors"}]})
+    ssm = SimpleNamespace(get_parameters_by_path=lambda **kw: {"Parameters": [{"Name": "/lab/db/port", "Type": "String"}]})
+
+
+def test_partial_bundle_records_per_source_status(tmp_path):
+    args = SimpleNamespace(incident_id="IR-1", minutes=15, app_log_group=None, waf_log_group=None,
+                           ssm_path="/lab/db/", secret_id="lab/db", out=str(tmp_path / "e.json"),
+                           format="json", task_timeout=0.3, retries=0, workers=4, cache=None)
+    clients = {"cloudwatch": Clients.cloudwatch, "logs": None, "ssm": Clients.ssm, "secretsmanager": SlowSecrets()}
+
+    _, status = collect_evidence(args, clients, log=lambda m: None)
+    bundle = json.load(open(args.out))
+
+    assert bundle["alarms"][0]["name"] == "db-errors"
+    assert bundle["config_sources"]["ssm_meta"] == {"/lab/db/port": {"type": "String"}}
+    assert "secrets_meta" not in bundle["config_sources"]
+    assert bundle["collection"]["secrets_meta"]["status"] == "timeout"
+    assert bundle["collection"]["alarms"]["status"] == "ok"
+    assert status["secrets_meta"]["status"] == "timeout"